@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+"""Offline benchmarks for tldv.py against a local TLDV/HLS stand-in server.
+
+    python bench.py                                   # run everything
+    python bench.py --latency-ms 40 --bandwidth-mbps 50 --engines native,async
+    python bench.py --output new.json --baseline old.json
+    python bench.py serve                             # only run the stand-in server
+
+The stand-in serves ``watch-page`` responses and an HLS origin with
+configurable per-request latency and per-connection bandwidth. With a real
+ffmpeg the origin serves a synthetic test pattern encoded by ffmpeg,
+otherwise random bytes (enough for the fetch path, not for a real remux).
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time as time_module
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+import requests
+from rich.table import Table
+from rich import box
+
+import tldv
+from tldv import console
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# ── Stand-in server ───────────────────────────────────────────────────────────
+
+
+def build_media(params, media_dir):
+    """Create the origin's ``media.m3u8`` and segments in ``media_dir``.
+
+    Returns ``"ffmpeg"`` when the segments are real MPEG-TS from ffmpeg's
+    test sources, or ``"synthetic"`` for random bytes.
+    """
+    ffmpeg = params.ffmpeg or shutil.which("ffmpeg")
+    if ffmpeg:
+        command = [
+            ffmpeg, "-v", "error", "-y",
+            "-f", "lavfi", "-i", "testsrc2=size=1280x720:rate=25",
+            "-f", "lavfi", "-i", "sine=frequency=440",
+            "-t", str(params.duration), "-c:v", "mpeg2video", "-b:v", f"{params.bitrate_kbps}k",
+            "-c:a", "mp2", "-f", "hls", "-hls_time", str(params.segment_seconds), "-hls_list_size", "0",
+            "-hls_segment_filename", os.path.join(media_dir, "seg%05d.ts"),
+            os.path.join(media_dir, "media.m3u8"),
+        ]
+        try:
+            subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            if os.path.exists(os.path.join(media_dir, "seg00000.ts")):
+                return "ffmpeg"
+        except OSError:
+            pass
+
+    segment_bytes = params.bitrate_kbps * 1000 * params.segment_seconds // 8
+    block = os.urandom(segment_bytes)
+    count = -(-params.duration // params.segment_seconds)
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3", f"#EXT-X-TARGETDURATION:{params.segment_seconds}",
+             "#EXT-X-MEDIA-SEQUENCE:0"]
+    for i in range(count):
+        with open(os.path.join(media_dir, f"seg{i:05d}.ts"), "wb") as f:
+            f.write(block)
+        lines += [f"#EXTINF:{params.segment_seconds:.3f},", f"seg{i:05d}.ts"]
+    lines.append("#EXT-X-ENDLIST")
+    with open(os.path.join(media_dir, "media.m3u8"), "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return "synthetic"
+
+
+def synthetic_transcript(words, words_per_segment=24, speakers=4):
+    """A transcript in the watch-page ``data`` shape with ``words`` words."""
+    data = []
+    segment = []
+    for i in range(words):
+        start = i * 0.4
+        segment.append({
+            "speaker": f"Speaker {(len(data) % speakers) + 1}",
+            "word": f"word{i % 997}",
+            "startTime": {"seconds": int(start), "nanos": int(start % 1 * 1e9)},
+            "endTime": {"seconds": int(start + 0.35), "nanos": int((start + 0.35) % 1 * 1e9)},
+        })
+        if len(segment) == words_per_segment:
+            data.append(segment)
+            segment = []
+    if segment:
+        data.append(segment)
+    return data
+
+
+class StandInServer(ThreadingMixIn, HTTPServer):
+    """Fake ``gw.tldv.io`` plus HLS origin, with latency and bandwidth shaping."""
+
+    daemon_threads = True
+
+    def __init__(self, address, params, media_dir):
+        super().__init__(address, StandInHandler)
+        self.params = params
+        self.media_dir = media_dir
+        self.base_url = f"http://127.0.0.1:{self.server_address[1]}"
+        self.lock = threading.Lock()
+        self.transcript = synthetic_transcript(params.watch_page_words)
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.stats = {"requests": 0, "segment_requests": 0, "segment_bytes": 0, "first_segment_byte": None}
+
+    def watch_page(self, meeting_id):
+        return json.dumps({
+            "meeting": {"id": meeting_id, "name": f"Bench {meeting_id}",
+                        "createdAt": "2024-01-01T09:00:00Z", "duration": self.params.duration},
+            "video": {"source": f"{self.base_url}/hls/master.m3u8", "transcript": {"data": self.transcript}},
+        }).encode()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        path = self.path.split("?")[0]
+        if path == "/_stats":
+            with server.lock:
+                return self.reply(200, json.dumps(server.stats).encode(), "application/json")
+        if path == "/_reset":
+            server.reset()
+            return self.reply(204)
+
+        with server.lock:
+            server.stats["requests"] += 1
+        if server.params.latency_ms:
+            time_module.sleep(server.params.latency_ms / 1000)
+
+        if path.startswith("/v1/meetings/") and path.endswith("/watch-page"):
+            return self.reply(200, server.watch_page(path.split("/")[3]), "application/json")
+        if path == "/hls/master.m3u8":
+            body = (f"#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH={server.params.bitrate_kbps * 1000},"
+                    f"RESOLUTION=1280x720\nmedia.m3u8\n").encode()
+            return self.reply(200, body, "application/vnd.apple.mpegurl")
+
+        name = os.path.basename(path)
+        file_path = os.path.join(server.media_dir, name)
+        if not path.startswith("/hls/") or not os.path.isfile(file_path):
+            return self.reply(404)
+        with open(file_path, "rb") as f:
+            body = f.read()
+        if name.endswith(".m3u8"):
+            return self.reply(200, body, "application/vnd.apple.mpegurl")
+
+        with server.lock:
+            server.stats["segment_requests"] += 1
+        status, headers = 200, {}
+        byte_range = self.headers.get("Range", "")
+        if byte_range.startswith("bytes="):
+            first, _, last = byte_range[6:].partition("-")
+            first, last = int(first), int(last) if last else len(body) - 1
+            if first >= len(body):
+                return self.reply(416, extra={"Content-Range": f"bytes */{len(body)}"})
+            status, headers = 206, {"Content-Range": f"bytes {first}-{last}/{len(body)}"}
+            body = body[first:last + 1]
+        self.reply(status, body, "video/mp2t", headers, segment=True)
+
+    def reply(self, status, body=b"", content_type="application/octet-stream", extra=None, segment=False):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (extra or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        rate = self.server.params.bandwidth_mbps * 125_000
+        start = time_module.time()
+        view = memoryview(body)
+        for offset in range(0, len(body), 65536):
+            chunk = view[offset:offset + 65536]
+            self.wfile.write(chunk)
+            if segment:
+                with self.server.lock:
+                    stats = self.server.stats
+                    stats["segment_bytes"] += len(chunk)
+                    if stats["first_segment_byte"] is None:
+                        stats["first_segment_byte"] = time_module.time()
+            if rate:
+                ahead = (offset + len(chunk)) / rate - (time_module.time() - start)
+                if ahead > 0:
+                    time_module.sleep(ahead)
+
+
+def serve(params):
+    """Build the media and serve until interrupted, announcing the API base on stdout."""
+    media_dir = tempfile.mkdtemp(prefix="tldv-bench-media-")
+    try:
+        media = build_media(params, media_dir)
+        server = StandInServer(("127.0.0.1", params.port), params, media_dir)
+        print(f"TLDV_API_BASE={server.base_url} media={media}", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    finally:
+        shutil.rmtree(media_dir, ignore_errors=True)
+
+
+def start_server(params):
+    """Run the stand-in in a child process so its CPU is not charged to the client."""
+    command = [sys.executable, os.path.abspath(__file__), "serve", "--port", "0"] + server_argv(params)
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, universal_newlines=True)
+    line = process.stdout.readline()
+    if not line.startswith("TLDV_API_BASE="):
+        process.kill()
+        raise RuntimeError("stand-in server failed to start")
+    base_url, media = line.strip().split(" ")
+    return process, base_url.split("=", 1)[1], media.split("=", 1)[1]
+
+
+# ── Benchmarks ────────────────────────────────────────────────────────────────
+
+
+def cpu_seconds():
+    """CPU time of this process plus its reaped children (ffmpeg, ffprobe)."""
+    if resource is None:
+        return time_module.process_time()
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def bench_metadata(base_url, runs):
+    """Watch-page round trips through :func:`tldv.fetch_watch_page`, uncached."""
+    session = tldv.make_session()
+    times = []
+    for i in range(runs):
+        start = time_module.perf_counter()
+        tldv.fetch_watch_page(f"meta{i}", "Bearer bench", session)
+        times.append((time_module.perf_counter() - start) * 1000)
+    return {"runs": runs, "mean_ms": sum(times) / runs,
+            "p50_ms": percentile(times, 50), "p95_ms": percentile(times, 95)}
+
+
+def bench_download(base_url, engine, params, work_dir):
+    """One meeting end to end: metadata, duration, download and remux."""
+    config = {
+        "token": "Bearer bench", "ffmpeg": params.ffmpeg, "ffprobe": params.ffprobe,
+        "output_dir": work_dir, "engine": engine, "segment_workers": params.segment_workers,
+        "resume": False, "cache": None, "video": True,
+    }
+    session = tldv.make_session(max(10, params.segment_workers))
+    requests.get(base_url + "/_reset")
+
+    cpu_start = cpu_seconds()
+    start = time_module.time()
+    meeting = tldv.prepare_meeting(f"dl-{engine}", config, session)
+    duration, _ = tldv.resolve_duration(meeting, config, session)
+    returncode, _ = tldv.run_download(
+        config, meeting["source"], meeting["output_file"], duration,
+        session=session, playlist=meeting.get("playlist"),
+    )
+    wall = time_module.time() - start
+    cpu = cpu_seconds() - cpu_start
+
+    stats = requests.get(base_url + "/_stats").json()
+    received = stats["segment_bytes"]
+    first_byte = stats["first_segment_byte"]
+    result = {
+        "ok": returncode == 0 and os.path.exists(meeting["output_file"]),
+        "returncode": returncode,
+        "wall_s": wall,
+        "bytes": received,
+        "segment_requests": stats["segment_requests"],
+        "throughput_mbps": received * 8 / wall / 1e6 if wall > 0 else 0,
+        "ttfb_ms": (first_byte - start) * 1000 if first_byte else None,
+        "cpu_s": cpu,
+        "cpu_s_per_gb": cpu / (received / 1e9) if received else None,
+    }
+    tldv.cleanup_parts(meeting["output_file"])
+    if os.path.exists(meeting["output_file"]):
+        os.remove(meeting["output_file"])
+    return result
+
+
+def bench_transcript(words, work_dir):
+    """Export a large synthetic transcript to every format in one pass."""
+    data = synthetic_transcript(words)
+    outputs = {fmt: os.path.join(work_dir, "bench" + suffix) for fmt, suffix in tldv.TRANSCRIPT_SUFFIXES.items()}
+    start = time_module.perf_counter()
+    cues = tldv.export_transcript(data, outputs, "bench")
+    elapsed = time_module.perf_counter() - start
+    size = sum(os.path.getsize(path) for path in outputs.values())
+    for path in outputs.values():
+        os.remove(path)
+    return {"words": words, "cues": cues, "formats": list(outputs), "seconds": elapsed,
+            "words_per_s": words / elapsed if elapsed > 0 else 0, "bytes_written": size}
+
+
+def bench_progress_parser(blocks, chunk_size=4096):
+    """Feed synthetic ffmpeg ``-progress`` output through the parser and reporter."""
+    lines = []
+    for i in range(blocks):
+        lines.append(
+            f"frame={i * 25}\nfps=250.0\nbitrate=2000.0kbits/s\ntotal_size={i * 500_000}\n"
+            f"out_time_us={i * 1_000_000}\nout_time_ms={i * 1_000_000}\nout_time=00:00:00.000000\n"
+            f"dup_frames=0\ndrop_frames=0\nspeed=10.0x\nprogress={'end' if i == blocks - 1 else 'continue'}\n"
+        )
+    data = "".join(lines).encode()
+    chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+
+    calls = []
+    parser = tldv.ProgressParser()
+    handle = tldv.make_ffmpeg_reporter(blocks, calls.append)
+    parsed = 0
+    start = time_module.perf_counter()
+    for chunk in chunks:
+        found = parser.feed(chunk)
+        parsed += len(found)
+        handle(found)
+    elapsed = time_module.perf_counter() - start
+    return {"blocks": parsed, "bytes": len(data), "seconds": elapsed,
+            "us_per_block": elapsed / parsed * 1e6 if parsed else None, "callbacks": len(calls)}
+
+
+def bench_playlist_parser(segments):
+    """Parse a media playlist with ``segments`` entries."""
+    lines = ["#EXTM3U", "#EXT-X-TARGETDURATION:4", "#EXT-X-MEDIA-SEQUENCE:0"]
+    for i in range(segments):
+        lines += ["#EXTINF:4.000,", f"seg{i:05d}.ts?sig=abcdef0123456789"]
+    text = "\n".join(lines + ["#EXT-X-ENDLIST"]) + "\n"
+    start = time_module.perf_counter()
+    playlist = tldv.parse_m3u8(text, "https://cdn.example.com/hls/media.m3u8")
+    elapsed = time_module.perf_counter() - start
+    return {"segments": len(playlist["segments"]), "seconds": elapsed,
+            "us_per_segment": elapsed / segments * 1e6 if segments else None}
+
+
+# ── Reporting ─────────────────────────────────────────────────────────────────
+
+# (section, key, label, unit, higher_is_better)
+_SUMMARY_ROWS = [
+    ("metadata", "p50_ms", "watch-page p50", "ms", False),
+    ("metadata", "p95_ms", "watch-page p95", "ms", False),
+    ("transcript", "seconds", "transcript export", "s", False),
+    ("progress_parser", "us_per_block", "progress parser", "\u00b5s/block", False),
+    ("playlist_parser", "us_per_segment", "m3u8 parser", "\u00b5s/seg", False),
+]
+_DOWNLOAD_ROWS = [
+    ("throughput_mbps", "throughput", "Mbit/s", True),
+    ("ttfb_ms", "time to first byte", "ms", False),
+    ("cpu_s_per_gb", "CPU per GB", "s", False),
+    ("wall_s", "wall time", "s", False),
+]
+
+
+def summary_rows(results):
+    for section, key, label, unit, higher in _SUMMARY_ROWS:
+        yield label, unit, results.get(section, {}).get(key), (section, key), higher
+    for engine, result in results.get("download", {}).items():
+        for key, label, unit, higher in _DOWNLOAD_ROWS:
+            value = result.get(key) if "skipped" not in result else None
+            yield f"{engine}: {label}", unit, value, ("download", engine, key), higher
+
+
+def lookup(results, path):
+    for key in path:
+        results = results.get(key) if isinstance(results, dict) else None
+    return results
+
+
+def show_results(report, baseline=None):
+    table = Table(box=box.SIMPLE_HEAVY, header_style="bold cyan")
+    table.add_column("Metric")
+    table.add_column("Value", justify="right")
+    table.add_column("Unit", style="dim")
+    if baseline:
+        table.add_column("vs baseline", justify="right")
+
+    for label, unit, value, path, higher in summary_rows(report["results"]):
+        row = [label, "[dim]--[/dim]" if value is None else f"{value:,.2f}", unit]
+        if baseline:
+            old = lookup(baseline["results"], path)
+            if value is None or not old:
+                row.append("[dim]--[/dim]")
+            else:
+                change = (value - old) / old * 100
+                better = change > 0 if higher else change < 0
+                style = "green" if better else "red" if abs(change) >= 1 else "dim"
+                row.append(f"[{style}]{change:+.1f}%[/{style}]")
+        table.add_row(*row)
+
+    for engine, result in report["results"].get("download", {}).items():
+        if "skipped" in result:
+            table.add_row(engine, "[yellow]skipped[/yellow]", result["skipped"])
+        elif not result["ok"]:
+            table.add_row(engine, "[red]failed[/red]", f"exit {result['returncode']}")
+    console.print(table)
+
+
+# ── Main ──────────────────────────────────────────────────────────────────────
+
+
+def add_server_args(parser):
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay before every response (default: 0)")
+    parser.add_argument("--bandwidth-mbps", type=float, default=0,
+                        help="Per-connection bandwidth cap in Mbit/s (default: 0, unlimited)")
+    parser.add_argument("--duration", type=int, default=300, help="Meeting length in seconds (default: 300)")
+    parser.add_argument("--segment-seconds", type=int, default=4, help="HLS segment length (default: 4)")
+    parser.add_argument("--bitrate-kbps", type=int, default=4000, help="Video bitrate (default: 4000)")
+    parser.add_argument("--watch-page-words", type=int, default=5000,
+                        help="Transcript words in each watch-page response (default: 5000)")
+    parser.add_argument("--ffmpeg", help="Path to ffmpeg binary (auto-detected if omitted)")
+
+
+def server_argv(params):
+    argv = ["--latency-ms", str(params.latency_ms), "--bandwidth-mbps", str(params.bandwidth_mbps),
+            "--duration", str(params.duration), "--segment-seconds", str(params.segment_seconds),
+            "--bitrate-kbps", str(params.bitrate_kbps), "--watch-page-words", str(params.watch_page_words)]
+    if params.ffmpeg:
+        argv += ["--ffmpeg", params.ffmpeg]
+    return argv
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for tldv.py.")
+    add_server_args(parser)
+    parser.add_argument("--ffprobe", help="Path to ffprobe binary (auto-detected if omitted)")
+    parser.add_argument("--engines", default="ffmpeg,native,async",
+                        help="Comma-separated engines to benchmark (default: ffmpeg,native,async)")
+    parser.add_argument("--segment-workers", type=int, default=8, help="Segment workers for native/async (default: 8)")
+    parser.add_argument("--metadata-runs", type=int, default=20, help="Watch-page round trips (default: 20)")
+    parser.add_argument("--transcript-words", type=int, default=500_000,
+                        help="Words in the transcript export benchmark (default: 500000)")
+    parser.add_argument("--progress-blocks", type=int, default=100_000,
+                        help="ffmpeg -progress blocks fed to the parser (default: 100000)")
+    parser.add_argument("--output", default="bench-results.json", help="Results file (default: bench-results.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+    serve_parser = commands.add_parser("serve", help="Only run the stand-in server")
+    add_server_args(serve_parser)
+    serve_parser.add_argument("--port", type=int, default=8765, help="Port to listen on, 0 for any (default: 8765)")
+    return parser.parse_args()
+
+
+def main():
+    params = parse_args()
+    if params.command == "serve":
+        return serve(params)
+
+    if not params.ffmpeg:
+        params.ffmpeg, auto_ffprobe = tldv.find_ffmpeg()
+        params.ffprobe = params.ffprobe or auto_ffprobe
+    params.ffprobe = params.ffprobe or params.ffmpeg
+
+    process, base_url, media = start_server(params)
+    tldv.WATCH_PAGE_URL = base_url + "/v1/meetings/{meeting_id}/watch-page"
+    work_dir = tempfile.mkdtemp(prefix="tldv-bench-")
+    results = {}
+    try:
+        console.print(f"  [dim]Stand-in server at {base_url} ({media} media)[/dim]")
+
+        console.print("  [cyan]\u25b8[/cyan] metadata latency")
+        results["metadata"] = bench_metadata(base_url, params.metadata_runs)
+
+        results["download"] = {}
+        for engine in [e.strip() for e in params.engines.split(",") if e.strip()]:
+            console.print(f"  [cyan]\u25b8[/cyan] download ({engine})")
+            if not params.ffmpeg:
+                results["download"][engine] = {"skipped": "ffmpeg not found"}
+                continue
+            results["download"][engine] = bench_download(base_url, engine, params, work_dir)
+
+        console.print("  [cyan]\u25b8[/cyan] transcript export")
+        results["transcript"] = bench_transcript(params.transcript_words, work_dir)
+        console.print("  [cyan]\u25b8[/cyan] progress parser")
+        results["progress_parser"] = bench_progress_parser(params.progress_blocks)
+        console.print("  [cyan]\u25b8[/cyan] playlist parser")
+        results["playlist_parser"] = bench_playlist_parser(max(1, params.duration // params.segment_seconds) * 100)
+    finally:
+        process.terminate()
+        process.wait()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "tldv_version": tldv.VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "media": media,
+        "params": {key: value for key, value in vars(params).items() if key != "command"},
+        "results": results,
+    }
+    with open(params.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if params.baseline:
+        with open(params.baseline) as f:
+            baseline = json.load(f)
+    console.print()
+    show_results(report, baseline)
+    console.print(f"  [dim]Results written to {params.output}[/dim]")
+
+
+if __name__ == "__main__":
+    main()
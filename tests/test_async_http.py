@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+import tldv
+
+CLOSE = b"<close>"
+
+
+async def serve(responses):
+    """Start a server that answers the n-th request with ``responses[n]`` (the last one repeats).
+
+    A response ending in ``CLOSE`` closes the connection after the bytes
+    before it. Returns ``(server, url, stats, handlers)``.
+    """
+    stats = {"connections": 0, "requests": 0}
+    handlers = []
+
+    async def on_connect(reader, writer):
+        handlers.append(asyncio.current_task())
+        stats["connections"] += 1
+        try:
+            while True:
+                await reader.readuntil(b"\r\n\r\n")
+                response = responses[min(stats["requests"], len(responses) - 1)]
+                stats["requests"] += 1
+                close = response.endswith(CLOSE)
+                writer.write(response[:-len(CLOSE)] if close else response)
+                await writer.drain()
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(on_connect, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, f"http://127.0.0.1:{port}/x", stats, handlers
+
+
+def fetch(responses, count=1, **kwargs):
+    async def run():
+        server, url, stats, handlers = await serve(responses)
+        client = tldv.AsyncHTTPClient(timeout=5)
+        try:
+            results = [await client.get(url, **kwargs) for _ in range(count)]
+        finally:
+            await client.close()
+            server.close()
+            for handler in handlers:
+                handler.cancel()
+            await asyncio.gather(*handlers, return_exceptions=True)
+        return results, stats
+
+    return tldv.run_coroutine(run())
+
+
+CHUNKED = b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n"
+
+
+def test_chunked_body():
+    [response], _ = fetch([CHUNKED + b"5\r\nhello\r\n6;ext=1\r\n world\r\n0\r\n\r\n"])
+    assert response.status_code == 200
+    assert response.content == b"hello world"
+
+
+def test_chunked_body_with_trailers():
+    [response], _ = fetch([CHUNKED + b"2\r\nok\r\n0\r\nX-Trailer: 1\r\n\r\n"])
+    assert response.content == b"ok"
+
+
+def test_chunked_body_cut_off_before_last_chunk():
+    with pytest.raises(asyncio.IncompleteReadError):
+        fetch([CHUNKED + b"5\r\nhello\r\n<close>"])
+
+
+def test_chunked_body_cut_off_inside_chunk():
+    with pytest.raises(asyncio.IncompleteReadError):
+        fetch([CHUNKED + b"a\r\nhello<close>"])
+
+
+def test_chunk_without_crlf_is_rejected():
+    with pytest.raises(tldv.requests.exceptions.ChunkedEncodingError):
+        fetch([CHUNKED + b"5\r\nhelloXX0\r\n\r\n"])
+
+
+def test_truncated_bodies_are_retryable():
+    with pytest.raises(asyncio.IncompleteReadError) as info:
+        fetch([CHUNKED + b"5\r\nhello\r\n<close>"])
+    assert tldv.is_retryable(info.value)
+
+
+def test_content_length_body_cut_off():
+    with pytest.raises(asyncio.IncompleteReadError):
+        fetch([b"HTTP/1.1 200 OK\r\nContent-Length: 10\r\n\r\nhello<close>"])
+
+
+def test_close_delimited_body():
+    [response], _ = fetch([b"HTTP/1.1 200 OK\r\n\r\nuntil close<close>"])
+    assert response.content == b"until close"
+
+
+def test_keep_alive_reuses_connection():
+    body = b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok"
+    responses, stats = fetch([body], count=3)
+    assert [r.content for r in responses] == [b"ok"] * 3
+    assert stats == {"connections": 1, "requests": 3}
+
+
+def test_connection_close_is_not_reused():
+    body = b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: close\r\n\r\nok<close>"
+    responses, stats = fetch([body], count=2)
+    assert [r.content for r in responses] == [b"ok"] * 2
+    assert stats["connections"] == 2
+
+
+def test_redirect_is_followed():
+    responses = [b"HTTP/1.1 302 Found\r\nLocation: /y\r\nContent-Length: 0\r\n\r\n",
+                 b"HTTP/1.1 200 OK\r\nContent-Length: 4\r\n\r\ndone"]
+    [response], stats = fetch(responses)
+    assert response.content == b"done"
+    assert stats["requests"] == 2
+
+
+def test_body_streams_to_callback():
+    chunks = []
+    [response], _ = fetch([CHUNKED + b"3\r\nabc\r\n3\r\ndef\r\n0\r\n\r\n"],
+                          on_response=lambda status, headers: chunks.append)
+    assert b"".join(chunks) == b"abcdef"
+    assert response.content == b""
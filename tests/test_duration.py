@@ -0,0 +1,25 @@
+import pytest
+
+import tldv
+
+
+@pytest.mark.parametrize("response, expected", [
+    ({"meeting": {"durationMs": 150000}}, 150.0),
+    ({"video": {"durationMs": 5400500}}, 5400.5),
+    ({"meeting": {"duration": 150}}, 150.0),
+    ({"meeting": {"duration": 200000}}, 200000.0),
+    ({"video": {"duration": 90}, "meeting": {"duration": 120}}, 90.0),
+    ({"video": {"duration": 90}, "meeting": {"durationMs": 90250}}, 90.25),
+    ({"meeting": {"duration": 0}, "video": {"duration": None}}, 0),
+    ({"meeting": {"duration": "150"}}, 0),
+    ({"meeting": {"duration": True}}, 0),
+    ({"meeting": None, "video": None}, 0),
+    ({}, 0),
+])
+def test_metadata_duration_unit_comes_from_the_field(response, expected):
+    assert tldv.metadata_duration(response) == pytest.approx(expected)
+
+
+def test_resolve_duration_prefers_metadata():
+    meeting = {"response": {"meeting": {"durationMs": 150000}}, "source": "https://cdn.example/v.m3u8"}
+    assert tldv.resolve_duration(meeting, {"video": True}) == (pytest.approx(150.0), "metadata")
@@ -0,0 +1,67 @@
+import stat
+import sys
+
+import pytest
+
+import tldv
+
+
+@pytest.mark.parametrize("returncode, stderr, transient", [
+    (1, ["[https @ 0x1] HTTP error 503 Service Unavailable"], True),
+    (1, ["Server returned 5XX Server Error reply"], True),
+    (1, ["[tcp @ 0x1] Connection reset by peer", "Error opening input"], True),
+    (1, ["Server returned 403 Forbidden (access denied)"], False),
+    (1, ["HTTP error 404 Not Found"], False),
+    (1, ["Unknown encoder 'libx264'"], False),
+    (1, ["out/x.mp4: No such file or directory"], False),
+    (1, [], False),
+    (-9, ["Connection reset by peer"], False),
+])
+def test_ffmpeg_errors_are_classified(returncode, stderr, transient):
+    assert tldv.is_retryable(tldv.FFmpegError(returncode, stderr)) is transient
+
+
+def test_ffmpeg_error_message_has_the_last_line():
+    assert str(tldv.FFmpegError(1, ["a", "HTTP error 404 Not Found"])) == "ffmpeg exited with code 1: HTTP error 404 Not Found"
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path):
+    """An ffmpeg stand-in that prints ``message`` to stderr and exits 1, counting its runs."""
+    if sys.platform == "win32":
+        pytest.skip("needs a POSIX shell")
+
+    def make(message):
+        script = tmp_path / "ffmpeg"
+        script.write_text(f'#!/bin/sh\necho run >> "{tmp_path}/runs"\necho "{message}" >&2\nexit 1\n')
+        script.chmod(script.stat().st_mode | stat.S_IEXEC)
+        return str(script)
+
+    def runs():
+        path = tmp_path / "runs"
+        return len(path.read_text().splitlines()) if path.exists() else 0
+
+    make.runs = runs
+    return make
+
+
+def download(ffmpeg, tmp_path, retries=3):
+    config = {"ffmpeg": ffmpeg, "engine": "ffmpeg", "retry": tldv.RetryPolicy(retries, base_delay=0.001)}
+    retried = []
+    returncode, _ = tldv.run_download(config, "https://cdn.example/video.mp4", str(tmp_path / "out.mp4"), 60,
+                                      on_retry=lambda attempt, error, delay: retried.append(str(error)))
+    return returncode, retried
+
+
+def test_permanent_ffmpeg_failure_is_not_retried(fake_ffmpeg, tmp_path):
+    returncode, retried = download(fake_ffmpeg("Server returned 404 Not Found"), tmp_path)
+    assert returncode == 1
+    assert retried == []
+    assert fake_ffmpeg.runs() == 1
+
+
+def test_transient_ffmpeg_failure_is_retried(fake_ffmpeg, tmp_path):
+    returncode, retried = download(fake_ffmpeg("Connection timed out"), tmp_path, retries=2)
+    assert returncode == 1
+    assert retried == ["ffmpeg exited with code 1: Connection timed out"] * 2
+    assert fake_ffmpeg.runs() == 3
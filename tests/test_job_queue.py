@@ -0,0 +1,90 @@
+import pytest
+
+import tldv
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return str(tmp_path / "jobs.sqlite")
+
+
+@pytest.fixture
+def queue(queue_path):
+    queue = tldv.JobQueue(queue_path)
+    yield queue
+    queue.close()
+
+
+def test_jobs_are_claimed_in_submission_order(queue):
+    first = queue.submit("m1", {"audio_only": True})
+    second = queue.submit("m2", {})
+    assert first["state"] == "queued"
+    assert first["options"] == {"audio_only": True}
+    assert first["files"] == [] and first["attempts"] == 0
+
+    claimed = queue.claim()
+    assert claimed["id"] == first["id"]
+    assert claimed["state"] == "running" and claimed["attempts"] == 1
+    assert claimed["started_at"] is not None
+    assert queue.claim()["id"] == second["id"]
+    assert queue.claim() is None
+
+
+def test_update_and_list(queue):
+    job = queue.submit("m1", {})
+    queue.submit("m2", {})
+    queue.claim()
+    queue.update(job["id"], state="done", files=["a.mp4", "a.json"], name="Standup")
+    done = queue.get(job["id"])
+    assert done["state"] == "done"
+    assert done["files"] == ["a.mp4", "a.json"]
+    assert done["name"] == "Standup"
+    assert [j["meeting_id"] for j in queue.list()] == ["m2", "m1"]
+    assert [j["meeting_id"] for j in queue.list("done")] == ["m1"]
+    assert queue.counts() == {"done": 1, "queued": 1}
+    assert queue.get(999) is None
+
+
+def test_only_queued_jobs_can_be_cancelled(queue):
+    running = queue.submit("m1", {})
+    queued = queue.submit("m2", {})
+    queue.claim()
+    assert not queue.cancel(running["id"])
+    assert queue.cancel(queued["id"])
+    assert queue.get(queued["id"])["state"] == "cancelled"
+    assert not queue.cancel(queued["id"])
+    assert queue.claim() is None
+
+
+def test_claim_clears_the_wakeup_when_empty(queue):
+    queue.wakeup.set()
+    assert queue.claim() is None
+    assert not queue.wakeup.is_set()
+
+
+def test_running_jobs_are_requeued_on_reopen(queue_path):
+    queue = tldv.JobQueue(queue_path)
+    job = queue.submit("m1", {})
+    queue.claim()
+    queue.update(job["id"], error="interrupted")
+    queue.close()
+
+    queue = tldv.JobQueue(queue_path)
+    try:
+        assert queue.get(job["id"])["state"] == "queued"
+        retried = queue.claim()
+        assert retried["id"] == job["id"]
+        assert retried["attempts"] == 2
+        assert retried["error"] is None
+    finally:
+        queue.close()
+
+
+def test_job_overrides():
+    assert tldv.job_overrides({"audio_only": 1, "max_height": "720"}) == {"audio_only": True, "max_height": 720}
+    assert tldv.job_overrides({"start": "1:30"}) == {"clip": (90.0, None)}
+    assert tldv.job_overrides({"transcript_only": True}) == {"video": False}
+    with pytest.raises(ValueError):
+        tldv.job_overrides({"output_dir": "/tmp"})
+    with pytest.raises(ValueError):
+        tldv.job_overrides({"start": "2:00", "end": "1:00"})
@@ -0,0 +1,83 @@
+import os
+import stat
+import sys
+
+import pytest
+
+import tldv
+
+
+class FakeResponse:
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+
+class FakeSession:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append(headers)
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return tldv.MetadataCache(str(tmp_path / "cache"), ttl=3600)
+
+
+def test_fresh_entry_is_used_without_a_request(cache):
+    cache.put("m1", "Bearer a", '{"v": 1}', etag='"e1"')
+    session = FakeSession()
+    assert tldv.fetch_watch_page("m1", "Bearer a", session, cache) == ('{"v": 1}', True)
+    assert session.requests == []
+
+
+def test_entries_are_per_token(cache):
+    cache.put("m1", "Bearer a", '{"v": 1}')
+    assert cache.get("m1", "Bearer b") is None
+    session = FakeSession(FakeResponse(200, '{"v": 2}'))
+    assert tldv.fetch_watch_page("m1", "Bearer b", session, cache) == ('{"v": 2}', False)
+    assert cache.get("m1", "Bearer a")["body"] == '{"v": 1}'
+
+
+def test_refresh_revalidates_with_validators(cache):
+    cache.put("m1", "Bearer a", '{"v": 1}', etag='"e1"')
+    session = FakeSession(FakeResponse(304))
+    assert tldv.fetch_watch_page("m1", "Bearer a", session, cache, refresh=True) == ('{"v": 1}', True)
+    assert session.requests[0]["If-None-Match"] == '"e1"'
+
+
+@pytest.mark.parametrize("config, revalidate", [
+    ({"video": True}, True),
+    ({"video": False}, False),
+    ({"video": False, "refresh": True}, True),
+])
+def test_media_downloads_revalidate(config, revalidate):
+    assert tldv.revalidate_cache(config) is revalidate
+
+
+def test_stale_entry_is_revalidated(cache):
+    cache.put("m1", "Bearer a", '{"v": 1}', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+    cache.ttl = 0
+    session = FakeSession(FakeResponse(200, '{"v": 2}', {"ETag": '"e2"'}))
+    assert tldv.fetch_watch_page("m1", "Bearer a", session, cache) == ('{"v": 2}', False)
+    assert session.requests[0]["If-Modified-Since"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+    assert cache.get("m1", "Bearer a")["etag"] == '"e2"'
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX permissions")
+def test_cache_is_private(cache):
+    cache.put("m1", "Bearer a", "{}")
+    assert stat.S_IMODE(os.stat(cache.directory).st_mode) == 0o700
+    [name] = os.listdir(cache.directory)
+    assert stat.S_IMODE(os.stat(os.path.join(cache.directory, name)).st_mode) == 0o600
+
+
+def test_entries_over_budget_are_evicted(cache):
+    cache.max_bytes = 0
+    cache.put("m1", "Bearer a", "x" * 100)
+    assert os.listdir(cache.directory) == []
@@ -0,0 +1,63 @@
+import struct
+
+import pytest
+
+import tldv
+
+
+def box(kind, payload):
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def mvhd(timescale, duration, version=0):
+    if version == 1:
+        payload = struct.pack(">B3xQQIQ", 1, 0, 0, timescale, duration)
+    else:
+        payload = struct.pack(">B3xIIII", 0, 0, 0, timescale, duration)
+    return box(b"mvhd", payload + bytes(80))
+
+
+def write_mp4(path, *boxes):
+    path.write_bytes(box(b"ftyp", b"isom\x00\x00\x02\x00") + b"".join(boxes))
+    return str(path)
+
+
+def test_duration_from_mvhd(tmp_path):
+    path = write_mp4(tmp_path / "a.mp4", box(b"mdat", bytes(64)), box(b"moov", box(b"trak", b"") + mvhd(1000, 90500)))
+    assert tldv.mp4_duration(path) == 90.5
+
+
+def test_version_1_mvhd(tmp_path):
+    path = write_mp4(tmp_path / "a.mp4", box(b"moov", mvhd(90000, 90000 * 3600, version=1)))
+    assert tldv.mp4_duration(path) == 3600
+
+
+def test_64_bit_box_size(tmp_path):
+    mdat = struct.pack(">I4sQ", 1, b"mdat", 16 + 32) + bytes(32)
+    path = write_mp4(tmp_path / "a.mp4", mdat, box(b"moov", mvhd(600, 1200)))
+    assert tldv.mp4_duration(path) == 2
+
+
+@pytest.mark.parametrize("boxes", [
+    (box(b"mdat", bytes(64)),),  # Interrupted before moov was written.
+    (box(b"moov", box(b"trak", b"")),),
+    (box(b"moov", mvhd(0, 1200)),),
+    (box(b"moov", mvhd(600, 1200))[:30],),  # Truncated inside mvhd.
+])
+def test_incomplete_files(tmp_path, boxes):
+    assert tldv.mp4_duration(write_mp4(tmp_path / "a.mp4", *boxes)) is None
+
+
+def test_missing_file(tmp_path):
+    assert tldv.mp4_duration(str(tmp_path / "missing.mp4")) is None
+
+
+def test_sample_checksum_detects_changes(tmp_path):
+    path = tmp_path / "a.bin"
+    path.write_bytes(bytes(range(256)) * 4096)
+    checksum = tldv.sample_checksum(str(path))
+    assert tldv.sample_checksum(str(path)) == checksum
+    with open(path, "r+b") as f:
+        f.seek(-1, 2)
+        f.write(b"!")
+    assert tldv.sample_checksum(str(path)) != checksum
@@ -0,0 +1,133 @@
+import pytest
+
+import tldv
+
+
+MASTER = """#EXTM3U
+#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="aac",NAME="en",AUTOSELECT=YES,URI="audio/en.m3u8"
+#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="aac",NAME="main",DEFAULT=YES,URI="audio/main.m3u8"
+#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360,CODECS="avc1.4d401e,mp4a.40.2",AUDIO="aac"
+360p.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=2500000,RESOLUTION=1280x720,CODECS="avc1.4d401f,mp4a.40.2",AUDIO="aac"
+720p.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=5000000,RESOLUTION=1920x1080,CODECS="avc1.640028,mp4a.40.2",AUDIO="aac"
+1080p.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=96000,CODECS="mp4a.40.2"
+audio.m3u8
+"""
+
+MEDIA = """#EXTM3U
+#EXT-X-TARGETDURATION:6
+#EXT-X-MEDIA-SEQUENCE:10
+#EXT-X-MAP:URI="init.mp4",BYTERANGE="720@0"
+#EXTINF:6.0,
+seg10.ts
+#EXT-X-KEY:METHOD=AES-128,URI="key.bin"
+#EXTINF:6.0,
+seg11.ts
+#EXT-X-KEY:METHOD=NONE
+#EXT-X-BYTERANGE:1000@2000
+#EXTINF:4.5,
+media.ts
+#EXT-X-BYTERANGE:500
+#EXTINF:3.0,
+media.ts
+#EXT-X-ENDLIST
+"""
+
+
+def test_master_playlist():
+    playlist = tldv.parse_m3u8(MASTER, "https://cdn.example/v/master.m3u8")
+    assert [v["uri"] for v in playlist["variants"]] == [
+        "https://cdn.example/v/360p.m3u8", "https://cdn.example/v/720p.m3u8",
+        "https://cdn.example/v/1080p.m3u8", "https://cdn.example/v/audio.m3u8"]
+    assert playlist["variants"][1]["CODECS"] == "avc1.4d401f,mp4a.40.2"
+    assert [r["uri"] for r in playlist["renditions"]] == [
+        "https://cdn.example/v/audio/en.m3u8", "https://cdn.example/v/audio/main.m3u8"]
+    assert playlist["segments"] == []
+
+
+def test_media_playlist():
+    playlist = tldv.parse_m3u8(MEDIA, "https://cdn.example/v/720p.m3u8")
+    assert playlist["media_sequence"] == 10
+    assert playlist["target_duration"] == 6
+    assert playlist["init"] == {"key": "init", "uri": "https://cdn.example/v/init.mp4", "byterange": (0, 720)}
+    segments = playlist["segments"]
+    assert [(s["key"], s["duration"], s["byterange"]) for s in segments] == [
+        ("10", 6.0, None), ("11", 6.0, None), ("12", 4.5, (2000, 1000)), ("13", 3.0, (3000, 500))]
+    assert segments[0]["uri"] == "https://cdn.example/v/seg10.ts"
+    assert segments[0]["key_line"] is None
+    assert segments[1]["key_line"] == '#EXT-X-KEY:METHOD=AES-128,URI="https://cdn.example/v/key.bin"'
+    assert segments[2]["key_line"] is None
+
+
+@pytest.mark.parametrize("max_height, max_bitrate, expected", [
+    (None, None, "1080p"),
+    (720, None, "720p"),
+    (None, 1_000_000, "360p"),
+    (240, None, "360p"),  # Nothing fits: the smallest video variant.
+])
+def test_select_variant(max_height, max_bitrate, expected):
+    master = tldv.parse_m3u8(MASTER, "https://cdn.example/v/master.m3u8")
+    variant = tldv.select_variant(master, max_height, max_bitrate)
+    assert variant["uri"].endswith(f"/{expected}.m3u8")
+
+
+def test_select_variant_audio_only():
+    master = tldv.parse_m3u8(MASTER, "https://cdn.example/v/master.m3u8")
+    assert tldv.select_variant(master, audio_only=True)["uri"].endswith("/audio.m3u8")
+    video_only = dict(master, variants=master["variants"][:3])
+    assert tldv.select_variant(video_only, audio_only=True)["uri"].endswith("/360p.m3u8")
+
+
+def test_select_audio_prefers_default_rendition():
+    master = tldv.parse_m3u8(MASTER, "https://cdn.example/v/master.m3u8")
+    variant = tldv.select_variant(master)
+    assert tldv.select_audio(master, variant)["NAME"] == "main"
+    assert tldv.select_audio(master, dict(variant, AUDIO="other")) is None
+    assert tldv.select_audio(master, master["variants"][3]) is None
+
+
+def test_plan_media_playlists():
+    master = tldv.parse_m3u8(MASTER, "https://cdn.example/v/master.m3u8")
+    _, primary, audio = tldv.plan_media_playlists(master, {"max_height": 720})
+    assert primary.endswith("/720p.m3u8")
+    assert audio.endswith("/audio/main.m3u8")
+    _, primary, audio = tldv.plan_media_playlists(master, {"audio_only": True})
+    assert primary.endswith("/audio.m3u8")
+    assert audio is None
+
+
+def test_clip_playlist():
+    playlist = tldv.parse_m3u8(MEDIA, "https://cdn.example/v/720p.m3u8")
+    clipped = tldv.clip_playlist(playlist, 7, 13)
+    assert [s["key"] for s in clipped["segments"]] == ["11", "12"]
+    assert clipped["media_sequence"] == 11
+    assert clipped["clip_start"] == 6.0
+    assert tldv.clip_seeks(clipped, (7, 13)) == [1.0]
+    assert [s["key"] for s in tldv.clip_playlist(playlist, 12)["segments"]] == ["12", "13"]
+    assert len(playlist["segments"]) == 4
+
+
+def test_clip_playlist_past_the_end():
+    playlist = tldv.parse_m3u8(MEDIA, "https://cdn.example/v/720p.m3u8")
+    with pytest.raises(tldv.MeetingError):
+        tldv.clip_playlist(playlist, 20)
+
+
+def test_segment_range():
+    plain = {"byterange": None}
+    assert tldv.segment_range(plain, 0) == {}
+    assert tldv.segment_range(plain, 100) == {"Range": "bytes=100-"}
+    assert tldv.segment_range(plain, 100, 400) == {"Range": "bytes=100-399"}
+    ranged = {"byterange": (2000, 1000)}
+    assert tldv.segment_range(ranged, 0) == {"Range": "bytes=2000-2999"}
+    assert tldv.segment_range(ranged, 250, 1000) == {"Range": "bytes=2250-2999"}
+
+
+def test_in_place_size():
+    assert tldv.in_place_size({"Content-Length": "500"}, 0) == 500
+    assert tldv.in_place_size({"Content-Length": "300"}, 200) == 500
+    assert tldv.in_place_size({}, 0) is None
+    assert tldv.in_place_size({"Content-Length": "500", "Content-Encoding": "gzip"}, 0) is None
+    assert tldv.in_place_size({}, 0, byterange_length=1000) == 1000
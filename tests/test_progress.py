@@ -0,0 +1,18 @@
+import tldv
+
+
+def test_blocks_split_across_reads():
+    parser = tldv.ProgressParser()
+    assert parser.feed(b"frame=10\nout_time_us=1500") == []
+    blocks = parser.feed(b"000\nprogress=continue\nout_time_us=2500000\nprogress=end\n")
+    assert blocks == [
+        {"frame": "10", "out_time_us": "1500000", "progress": "continue"},
+        {"out_time_us": "2500000", "progress": "end"},
+    ]
+
+
+def test_progress_seconds():
+    assert tldv.progress_seconds({"out_time_us": "2500000"}) == 2.5
+    assert tldv.progress_seconds({"out_time_ms": "1000000"}) == 1
+    assert tldv.progress_seconds({"out_time_us": "-5", "out_time_ms": "N/A"}) == 0
+    assert tldv.progress_seconds({"out_time_us": "N/A"}) == 0
@@ -0,0 +1,166 @@
+import asyncio
+
+import pytest
+import requests
+
+import tldv
+
+
+def http_error(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(tldv.time_module, "sleep", slept.append)
+    return slept
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(tldv.time_module, "monotonic", clock)
+    return clock
+
+
+def test_is_retryable():
+    assert tldv.is_retryable(http_error(503))
+    assert tldv.is_retryable(http_error(429))
+    assert not tldv.is_retryable(http_error(404))
+    assert tldv.is_retryable(requests.ConnectionError())
+    assert tldv.is_retryable(requests.Timeout())
+    assert not tldv.is_retryable(requests.exceptions.InvalidURL())
+    assert tldv.is_retryable(ConnectionResetError())
+    assert not tldv.is_retryable(ValueError())
+
+
+def test_retries_until_success(sleeps):
+    attempts = []
+    retried = []
+
+    def func(attempt):
+        attempts.append(attempt)
+        if attempt < 2:
+            raise http_error(503)
+        return "ok"
+
+    policy = tldv.RetryPolicy(retries=3, base_delay=0.5, max_delay=30)
+    assert policy.call(func, on_retry=lambda attempt, error, delay: retried.append(attempt)) == "ok"
+    assert attempts == [0, 1, 2]
+    assert retried == [0, 1]
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 0.5 and 0 <= sleeps[1] <= 1.0
+
+
+def test_gives_up_after_the_last_retry(sleeps):
+    attempts = []
+
+    def func(attempt):
+        attempts.append(attempt)
+        raise requests.ConnectionError("reset")
+
+    with pytest.raises(requests.ConnectionError):
+        tldv.RetryPolicy(retries=2).call(func)
+    assert attempts == [0, 1, 2]
+    assert len(sleeps) == 2
+
+
+def test_permanent_errors_are_not_retried(sleeps):
+    attempts = []
+
+    def func(attempt):
+        attempts.append(attempt)
+        raise http_error(404)
+
+    with pytest.raises(requests.HTTPError):
+        tldv.RetryPolicy(retries=5).call(func)
+    assert attempts == [0]
+    assert sleeps == []
+
+
+def test_delay_is_capped_and_honours_retry_after():
+    policy = tldv.RetryPolicy(retries=10, base_delay=1, max_delay=8)
+    assert all(0 <= policy.delay(attempt) <= 8 for attempt in range(10))
+    assert policy.delay(0, http_error(503, {"Retry-After": "5"})) == 5
+    assert policy.delay(0, http_error(503, {"Retry-After": "120"})) == 8
+
+
+def test_acall(monkeypatch):
+    waits = []
+
+    async def fake_sleep(delay):
+        waits.append(delay)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+
+    async def func(attempt):
+        if attempt == 0:
+            raise asyncio.TimeoutError()
+        return attempt
+
+    assert asyncio.run(tldv.RetryPolicy(retries=2).acall(func)) == 1
+    assert len(waits) == 1
+
+
+def complete_round(limiter, clock, count, seconds=1.0, size=1000):
+    for _ in range(count):
+        clock.now += seconds / count
+        limiter.success(size, 0.1)
+
+
+def test_slow_start_then_throughput_drop(clock):
+    limiter = tldv.AdaptiveConcurrency(maximum=16, initial=4)
+    assert limiter.limit == 4
+    complete_round(limiter, clock, 4)
+    assert limiter.limit == 8
+    complete_round(limiter, clock, 8)
+    assert limiter.limit == 16
+    # Twice the fetches took four times as long: throughput halved.
+    complete_round(limiter, clock, 16, seconds=4)
+    assert limiter.limit == 15
+
+
+def test_additive_increase_after_slow_start(clock):
+    limiter = tldv.AdaptiveConcurrency(maximum=32, initial=4)
+    complete_round(limiter, clock, 4)
+    complete_round(limiter, clock, 8, seconds=2)
+    assert limiter.limit == 8  # Flat throughput ends slow start.
+    complete_round(limiter, clock, 8, seconds=0.5)
+    assert limiter.limit == 9
+
+
+def test_failure_halves_the_limit(clock):
+    limiter = tldv.AdaptiveConcurrency(maximum=16, initial=8, minimum=2)
+    limiter.failure()
+    assert limiter.limit == 4
+    limiter.failure()
+    limiter.failure()
+    assert limiter.limit == 2
+
+
+def test_latency_spike_cuts_the_limit(clock):
+    limiter = tldv.AdaptiveConcurrency(maximum=16, initial=8)
+    for _ in range(6):
+        limiter.success(1000, 0.1)
+    limiter.success(1000, 1.0)
+    assert limiter.limit == 6
+
+
+def test_fixed_limit_without_adaptation(clock):
+    limiter = tldv.AdaptiveConcurrency(maximum=12, initial=4, adaptive=False)
+    assert limiter.limit == 12
+    limiter.failure()
+    complete_round(limiter, clock, 12)
+    assert limiter.limit == 12
@@ -0,0 +1,99 @@
+import json
+import os
+
+import pytest
+
+import tldv
+
+
+def word(text, start, speaker):
+    return {"word": text, "speaker": speaker, "startTime": {"seconds": start, "nanos": 0}}
+
+
+def cue(text, start, speaker="Ann"):
+    return [word(w, start, speaker) for w in text.split()]
+
+
+def save_meeting(path, meeting_id, created_at, cues, name=None):
+    path.write_text(json.dumps({
+        "meeting": {"id": meeting_id, "name": name or meeting_id, "createdAt": created_at},
+        "video": {"transcript": {"data": cues}},
+    }))
+    return str(path)
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    save_meeting(tmp_path / "old.json", "old", "2024-01-01T10:00:00Z", [
+        cue("Quarterly budget review", 5),
+        cue("The budget is approved", 30, "Bob"),
+    ])
+    save_meeting(tmp_path / "new.json", "new", "2024-06-01T10:00:00Z", [
+        cue("Budgeting for the offsite", 12, "Bob"),
+        cue("Approved by finance", 40),
+    ])
+    (tmp_path / "notes.json").write_text("[]")
+    return tmp_path
+
+
+@pytest.fixture
+def index(tmp_path, corpus):
+    index = tldv.SearchIndex(str(tmp_path / "index.sqlite"))
+    yield index
+    index.close()
+
+
+def hits(results):
+    return [(meeting_id, start) for meeting_id, _, _, start, _, _ in results]
+
+
+def test_tokenize():
+    assert tldv.tokenize("Hello, World! it's Q3") == ["hello", "world", "it", "s", "q3"]
+
+
+def test_every_word_must_match(index, corpus):
+    assert index.update(tldv.transcript_json_files(str(corpus))) == (3, 0)
+    assert index.stats()[:2] == (2, 4)
+    assert hits(index.search("budget")) == [("old", 5), ("old", 30)]
+    assert hits(index.search("budget approved")) == [("old", 30)]
+    assert hits(index.search("APPROVED")) == [("new", 40), ("old", 30)]
+    assert index.search("nothing") == []
+    assert index.search("!!") == []
+
+
+def test_prefix_phrase_and_speaker(index, corpus):
+    index.update(tldv.transcript_json_files(str(corpus)))
+    assert hits(index.search("budget*")) == [("new", 12), ("old", 5), ("old", 30)]
+    assert hits(index.search('"budget review"')) == [("old", 5)]
+    assert hits(index.search("budget*", speaker="bob")) == [("new", 12), ("old", 30)]
+    assert hits(index.search("budget*", limit=1)) == [("new", 12)]
+
+
+def test_incremental_update(index, corpus):
+    paths = list(tldv.transcript_json_files(str(corpus)))
+    index.update(paths)
+    assert index.update(paths) == (0, 0)
+
+    save_meeting(corpus / "new.json", "new", "2024-06-01T10:00:00Z", [cue("Offsite moved to Friday", 3)])
+    os.utime(corpus / "new.json", ns=(0, 10**18))
+    os.remove(corpus / "old.json")
+    assert index.update(tldv.transcript_json_files(str(corpus))) == (1, 1)
+    assert index.search("budget*") == []
+    assert hits(index.search("friday")) == [("new", 3)]
+    assert index.stats()[:2] == (1, 1)
+
+
+def test_clip_copies_are_reported_once(index, corpus):
+    save_meeting(corpus / "old_clip.json", "old", "2024-01-01T10:00:00Z", [cue("Quarterly budget review", 5)])
+    index.update(tldv.transcript_json_files(str(corpus)))
+    assert hits(index.search("quarterly")) == [("old", 5)]
+
+
+def test_staging_and_manifest_files_are_skipped(corpus):
+    (corpus / "meeting.mp4.manifest.json").write_text("{}")
+    (corpus / "meeting.parts").mkdir()
+    (corpus / "meeting.parts" / "x.json").write_text("{}")
+    (corpus / ".hidden").mkdir()
+    (corpus / ".hidden" / "y.json").write_text("{}")
+    names = sorted(os.path.basename(p) for p in tldv.transcript_json_files(str(corpus)))
+    assert names == ["new.json", "notes.json", "old.json"]
@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+import tldv
+
+
+PLAYLIST = tldv.parse_m3u8(
+    "#EXTM3U\n#EXT-X-MEDIA-SEQUENCE:5\n#EXTINF:4.0,\na.ts\n#EXTINF:4.0,\nb.ts\n#EXTINF:2.5,\nc.ts\n",
+    "https://cdn.example/v/720p.m3u8",
+)
+
+in_place = pytest.mark.skipif(not hasattr(os, "pwrite"), reason="needs os.pwrite")
+
+
+def test_segment_filenames():
+    assert tldv.segment_filename({"key": "7"}) == "seg_000007.bin"
+    assert tldv.segment_filename({"key": "init"}) == "init.bin"
+    assert tldv.segment_filename({"key": "audio:12"}) == "audio_seg_000012.bin"
+    assert tldv.track_filename("7") == "track.bin"
+    assert tldv.track_filename("audio:12") == "audio_track.bin"
+
+
+@in_place
+def test_out_of_order_segments_land_at_their_offsets(tmp_path):
+    store = tldv.SegmentStore(str(tmp_path))
+    assert store.reserve("6", 3) == 0
+    assert store.reserve("5", 4) == 3
+    assert store.reserve("audio:5", 2) == 0
+    store.write("5", 0, b"AA")
+    store.write("5", 2, b"aa")
+    store.write("6", 0, b"BBB")
+    store.write("audio:5", 0, b"xy")
+    store.close()
+    assert (tmp_path / "track.bin").read_bytes() == b"BBBAAaa"
+    assert (tmp_path / "audio_track.bin").read_bytes() == b"xy"
+    assert store.written == {"5": 4, "6": 3, "audio:5": 2}
+    assert store.size("5") == 4 and store.size("7") is None
+
+
+@in_place
+def test_retried_segment_keeps_its_region_unless_resized(tmp_path):
+    store = tldv.SegmentStore(str(tmp_path))
+    store.reserve("5", 4)
+    store.write("5", 0, b"AB")
+    assert store.reserve("5", 4) == 0
+    assert store.written["5"] == 2
+    assert store.reserve("5", 6) == 4
+    assert "5" not in store.written
+    store.close()
+
+
+def test_buffers_are_reused(tmp_path):
+    store = tldv.SegmentStore(str(tmp_path))
+    with store.buffer() as first:
+        assert len(first) == tldv.SEGMENT_BUFFER_SIZE
+    with store.buffer() as second:
+        assert second is first
+    store.close()
+
+
+def test_manifest_round_trip_with_segment_files(tmp_path):
+    output = str(tmp_path / "meeting.mp4")
+    parts = tmp_path / "parts"
+    parts.mkdir()
+    (parts / "seg_000005.bin").write_bytes(b"x" * 10)
+    (parts / "seg_000006.bin").write_bytes(b"x" * 3)  # Shorter than recorded: refetched.
+    tldv.save_manifest(output, PLAYLIST, {"5": 10, "6": 8})
+    assert not os.path.exists(tldv.manifest_path(output) + ".tmp")
+    completed, extents = tldv.load_manifest(output, PLAYLIST, str(parts))
+    assert completed == {"5": 10}
+    assert extents == {}
+
+
+def test_manifest_round_trip_with_extents(tmp_path):
+    output = str(tmp_path / "meeting.mp4")
+    parts = tmp_path / "parts"
+    parts.mkdir()
+    (parts / "track.bin").write_bytes(b"x" * 12)
+    tldv.save_manifest(output, PLAYLIST, {"5": 8, "6": 4, "7": 4}, {"5": (0, 8), "6": (8, 4), "7": (12, 4)})
+    completed, extents = tldv.load_manifest(output, PLAYLIST, str(parts))
+    # Segment 7's region lies past the end of the track file.
+    assert completed == {"5": 8, "6": 4}
+    assert extents == {"5": (0, 8), "6": (8, 4)}
+
+
+def test_manifest_is_ignored_for_another_playlist(tmp_path):
+    output = str(tmp_path / "meeting.mp4")
+    parts = tmp_path / "parts"
+    parts.mkdir()
+    (parts / "seg_000005.bin").write_bytes(b"x" * 10)
+    tldv.save_manifest(output, PLAYLIST, {"5": 10})
+    changed = dict(PLAYLIST, segments=PLAYLIST["segments"][:2])
+    assert tldv.load_manifest(output, changed, str(parts)) == ({}, {})
+
+
+def test_fingerprint_ignores_signed_urls():
+    resigned = tldv.parse_m3u8(
+        "#EXTM3U\n#EXT-X-MEDIA-SEQUENCE:5\n#EXTINF:4.0,\na.ts?sig=2\n#EXTINF:4.0,\nb.ts?sig=2\n"
+        "#EXTINF:2.5,\nc.ts?sig=2\n",
+        "https://other.example/v/720p.m3u8",
+    )
+    assert tldv.playlist_fingerprint(resigned) == tldv.playlist_fingerprint(PLAYLIST)
+
+
+def test_missing_or_corrupt_manifest(tmp_path):
+    output = str(tmp_path / "meeting.mp4")
+    assert tldv.load_manifest(output, PLAYLIST, str(tmp_path)) == ({}, {})
+    with open(tldv.manifest_path(output), "w") as f:
+        f.write("{not json")
+    assert tldv.load_manifest(output, PLAYLIST, str(tmp_path)) == ({}, {})
@@ -0,0 +1,60 @@
+import json
+
+import tldv
+
+
+def word(text, start, end=None, speaker="Ann"):
+    entry = {"word": text, "speaker": speaker, "startTime": {"seconds": int(start), "nanos": int(start % 1 * 1e9)}}
+    if end is not None:
+        entry["endTime"] = {"seconds": int(end), "nanos": int(end % 1 * 1e9)}
+    return entry
+
+
+TRANSCRIPT = [
+    [word("Hello", 1), word("there", 1.5, 2.25)],
+    [word("Hi", 3, speaker="Bob")],
+    [word("Bye", 65.5, 66, speaker="Bob")],
+]
+
+
+def export(tmp_path, transcript, formats=("txt", "srt", "vtt", "jsonl"), clip=None):
+    outputs = {fmt: str(tmp_path / f"out.{fmt}") for fmt in formats}
+    count = tldv.export_transcript(transcript, outputs, "m1", clip)
+    return count, {fmt: open(path, encoding="utf-8").read() for fmt, path in outputs.items()}
+
+
+def test_cue_ends_fall_back_to_the_next_start():
+    cues = list(tldv.iter_transcript_cues(TRANSCRIPT))
+    assert [(round(s, 3), round(e, 3), speaker) for s, e, speaker, _ in cues] == [
+        (1.0, 2.25, "Ann"), (3.0, 65.5, "Bob"), (65.5, 66.0, "Bob")]
+
+
+def test_all_formats_in_one_pass(tmp_path):
+    count, files = export(tmp_path, TRANSCRIPT)
+    assert count == 3
+    assert files["txt"].splitlines()[0] == "[00:01] Ann: Hello there"
+    assert files["srt"].startswith("1\n00:00:01,000 --> 00:00:02,250\nAnn: Hello there\n\n2\n")
+    assert files["vtt"].startswith("WEBVTT\n\n00:00:01.000 --> 00:00:02.250\n<v Ann>Hello there\n\n")
+    records = [json.loads(line) for line in files["jsonl"].splitlines()]
+    assert records[2] == {"meeting_id": "m1", "index": 3, "start": 65.5, "end": 66.0, "speaker": "Bob", "text": "Bye"}
+
+
+def test_clip_keeps_overlapping_cues_retimed(tmp_path):
+    count, files = export(tmp_path, TRANSCRIPT, ("srt",), clip=(2.0, 10.0))
+    assert count == 2
+    assert "1\n00:00:00,000 --> 00:00:00,250\nAnn: Hello there" in files["srt"]
+    assert "2\n00:00:01,000 --> 00:00:08,000\nBob: Hi" in files["srt"]
+
+
+def test_vtt_escapes_speaker_and_text(tmp_path):
+    transcript = [[word("a<b & c>d", 0, 1, speaker="Ann <PM>\n& Co")]]
+    _, files = export(tmp_path, transcript, ("vtt",))
+    assert files["vtt"] == "WEBVTT\n\n00:00:00.000 --> 00:00:01.000\n<v Ann &lt;PM&gt; &amp; Co>a&lt;b &amp; c&gt;d\n\n"
+
+
+def test_vtt_cue_text_never_contains_a_blank_line(tmp_path):
+    transcript = [[word("one\n\ntwo", 0, 1)], [word("-->", 1, 2)]]
+    _, files = export(tmp_path, transcript, ("vtt",))
+    cues = files["vtt"].split("\n\n")
+    assert cues[1] == "00:00:00.000 --> 00:00:01.000\n<v Ann>one\ntwo"
+    assert cues[2] == "00:00:01.000 --> 00:00:02.000\n<v Ann>--&gt;"
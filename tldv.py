@@ -4,24 +4,83 @@
 import argparse
 import sys
 from datetime import datetime
+from email.utils import parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
 import subprocess
 import shutil
+import signal
 import requests
+import urllib3
+import hashlib
 import json
 import re
 import os
+import multiprocessing
+import queue
+import random
+import socket
+import sqlite3
+import ssl
+import struct
+import threading
 import time as time_module
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from importlib import import_module
+from types import SimpleNamespace
+from urllib.parse import parse_qsl, quote, urljoin, urlparse
 
-from rich.console import Console, Group
-from rich.panel import Panel
-from rich.table import Table
-from rich.live import Live
-from rich.text import Text
-from rich.rule import Rule
-from rich.prompt import Prompt
-from rich import box
+from requests.structures import CaseInsensitiveDict
 
-console = Console()
+
+class LazyImport:
+    """Stand-in for a module-level name whose import is deferred until first use.
+
+    rich and asyncio are a large part of start-up time, and ``--headless``
+    runs of the thread-based engines need neither. On first use the global is
+    rebound to the real object, so later lookups go straight to it.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, name, module, attr=None, call=False):
+        self.__dict__.update(_name=name, _module=module, _attr=attr, _call=call, _target=None)
+
+    def _load(self):
+        with self._lock:
+            if self._target is None:
+                target = import_module(self._module)
+                if self._attr:
+                    target = getattr(target, self._attr)
+                if self._call:
+                    target = target()
+                self.__dict__["_target"] = target
+                if globals().get(self._name) is self:
+                    globals()[self._name] = target
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+
+asyncio = LazyImport("asyncio", "asyncio")
+Group = LazyImport("Group", "rich.console", "Group")
+Panel = LazyImport("Panel", "rich.panel", "Panel")
+Table = LazyImport("Table", "rich.table", "Table")
+Live = LazyImport("Live", "rich.live", "Live")
+Text = LazyImport("Text", "rich.text", "Text")
+Rule = LazyImport("Rule", "rich.rule", "Rule")
+Prompt = LazyImport("Prompt", "rich.prompt", "Prompt")
+box = LazyImport("box", "rich.box")
+
+console = LazyImport("console", "rich.console", "Console", call=True)
 
 VERSION = "2"
 
@@ -39,15 +98,6 @@ _LOGO = [
 # ── Utility functions ─────────────────────────────────────────────────────────
 
 
-def parse_time_to_seconds(time_str):
-    """Parse ffmpeg time string like '00:14:51.95' to total seconds."""
-    match = re.match(r"(\d+):(\d+):(\d+)\.(\d+)", time_str)
-    if match:
-        h, m, s, ms = match.groups()
-        return int(h) * 3600 + int(m) * 60 + int(s) + int(ms) / 100
-    return 0
-
-
 def format_duration(total_seconds):
     """Format seconds into a human-readable string."""
     total_seconds = int(total_seconds)
@@ -59,6 +109,29 @@ def format_duration(total_seconds):
     return f"{minutes}m {seconds}s"
 
 
+def clip_length(clip, duration=0):
+    """Seconds a ``(start, end)`` clip covers of a ``duration``-second video (0: unknown).
+
+    Without a clip this is ``duration``; an open-ended clip runs to the end.
+    """
+    if not clip:
+        return duration
+    start, end = clip
+    if end is None or (duration and end > duration):
+        end = duration
+    return max(0.0, end - start) if end else 0.0
+
+
+def clip_suffix(clip):
+    """File name suffix for a clip, e.g. ``_clip-00-05-00-00-10-00``."""
+    def stamp(seconds):
+        seconds = int(seconds)
+        return f"{seconds // 3600:02d}-{(seconds % 3600) // 60:02d}-{seconds % 60:02d}"
+    if not clip:
+        return ""
+    return f"_clip-{stamp(clip[0])}-{stamp(clip[1]) if clip[1] is not None else 'end'}"
+
+
 def format_time_short(seconds):
     """Format seconds to MM:SS or HH:MM:SS."""
     seconds = int(seconds)
@@ -67,6 +140,13 @@ def format_time_short(seconds):
     return f"{seconds // 60:02d}:{seconds % 60:02d}"
 
 
+def format_rate(rate_kbs):
+    """Format a transfer rate given in KB/s."""
+    if rate_kbs >= 1024:
+        return f"{rate_kbs / 1024:.1f} MB/s"
+    return f"{rate_kbs:.0f} KB/s"
+
+
 def get_duration(ffprobe_path, source_url):
     """Get video duration in seconds using ffprobe."""
     try:
@@ -81,6 +161,55 @@ def get_duration(ffprobe_path, source_url):
         return 0
 
 
+# Watch-page duration fields as ``(container, field, seconds per unit)``, most precise first.
+# The unit comes from the field; guessing it from the size of the number misreads short meetings.
+METADATA_DURATION_FIELDS = (
+    ("video", "durationMs", 0.001),
+    ("meeting", "durationMs", 0.001),
+    ("video", "duration", 1),
+    ("meeting", "duration", 1),
+)
+
+
+def metadata_duration(response):
+    """Duration in seconds from watch-page metadata, or 0 if absent."""
+    for container, field, unit in METADATA_DURATION_FIELDS:
+        value = (response.get(container) or {}).get(field)
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0:
+            return value * unit
+    return 0
+
+
+def resolve_duration(meeting, config, session=None, on_retry=None):
+    """Resolve a meeting's duration without a remote ffprobe where possible.
+
+    Watch-page metadata is tried first, then the ``#EXTINF`` entries of the
+    HLS playlist (which is kept on the meeting for the native engine).
+    Returns ``(seconds, source)``; ``(0, None)`` means ffprobe is needed.
+    """
+    duration = metadata_duration(meeting["response"])
+    if duration:
+        return duration, "metadata"
+    source = meeting.get("source")
+    if not config["video"] or not source or not urlparse(source).path.endswith(".m3u8"):
+        return 0, None
+    try:
+        playlist = retry_policy(config).call(
+            lambda attempt: fetch_media_playlist(session or requests, source, playlist_selection(config)), on_retry)
+    except Exception:
+        return 0, None
+    meeting["playlist"] = playlist
+    return sum(s["duration"] for s in playlist["segments"]), "playlist"
+
+
+def start_duration_probe(ffprobe_path, source_url, metrics=None):
+    """Run :func:`get_duration` in the background and return its Future."""
+    pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tldv-probe")
+    future = pool.submit(timed, metrics, "probe", get_duration, ffprobe_path, source_url)
+    pool.shutdown(wait=False)
+    return future
+
+
 # ── Progress UI ───────────────────────────────────────────────────────────────
 
 
@@ -134,437 +263,5425 @@ def make_progress_panel(pct, elapsed, speed, eta, current_time, total_time, dl_s
     )
 
 
-def download_video(ffmpeg_path, source_url, output_file, total_duration):
-    """Download video with a rich live progress panel."""
-    cmd = [ffmpeg_path, "-v", "quiet", "-stats", "-i", source_url,
-           "-c", "copy", output_file]
+class ProgressParser:
+    """Incremental parser for ffmpeg's ``-progress`` ``key=value`` output.
+
+    Feed raw bytes as they arrive; every completed block (terminated by a
+    ``progress=continue`` or ``progress=end`` line) is returned as a dict.
+    """
+
+    def __init__(self):
+        self._pending = b""
+        self._block = {}
+
+    def feed(self, data):
+        lines = (self._pending + data).split(b"\n")
+        self._pending = lines.pop()
+        blocks = []
+        for line in lines:
+            key, sep, value = line.partition(b"=")
+            if not sep:
+                continue
+            key = key.strip().decode("ascii", "replace")
+            self._block[key] = value.strip().decode("utf-8", "replace")
+            if key == "progress":
+                blocks.append(self._block)
+                self._block = {}
+        return blocks
+
+
+def progress_seconds(block):
+    """Media position of a ``-progress`` block in seconds."""
+    # out_time_ms is historically misnamed and also carries microseconds.
+    for key in ("out_time_us", "out_time_ms"):
+        value = block.get(key, "")
+        if value.lstrip("-").isdigit():
+            return max(int(value), 0) / 1_000_000
+    return 0
+
+
+def make_ffmpeg_reporter(total_duration, on_progress, refresh_per_second=4, start_time=None):
+    """Return a ``handle(blocks)`` callback turning ``-progress`` blocks into stats.
+
+    Shared by the blocking and asyncio ffmpeg runners. ``on_progress``
+    receives a dict with ``pct``, ``elapsed``, ``speed``, ``eta``,
+    ``current_time``, ``total_time`` and ``dl_speed`` display strings, at most
+    ``refresh_per_second`` times a second.
+    """
+    total_time_str = format_time_short(total_duration) if total_duration > 0 else "?"
+    start_time = start_time or time_module.time()
+    min_interval = 1.0 / refresh_per_second
+    state = {"last_emit": 0.0, "last_size": 0, "last_size_time": start_time, "dl_speed": "--"}
+
+    def handle(blocks):
+        if not blocks or not on_progress:
+            return
+
+        block = blocks[-1]
+        now = time_module.time()
+        if now - state["last_emit"] < min_interval and block.get("progress") != "end":
+            return
+        state["last_emit"] = now
+
+        current_seconds = progress_seconds(block)
+        speed = block.get("speed", "")
+        speed_str = speed if speed.endswith("x") else "--.-x"
+
+        elapsed = now - start_time
+        elapsed_str = format_time_short(elapsed)
+
+        pct = (current_seconds / total_duration * 100) if total_duration > 0 else 0
+        current_time_str = format_time_short(current_seconds)
+
+        total_size = block.get("total_size", "")
+        if total_size.isdigit():
+            current_size_kb = int(total_size) / 1024
+            dt = now - state["last_size_time"]
+            if dt >= 0.5:
+                rate_kbs = (current_size_kb - state["last_size"]) / dt
+                state["last_size"] = current_size_kb
+                state["last_size_time"] = now
+                state["dl_speed"] = format_rate(rate_kbs)
+
+        if total_duration > 0 and current_seconds > 0:
+            remaining_video = total_duration - current_seconds
+            rate = current_seconds / elapsed if elapsed > 0 else 1
+            eta_seconds = remaining_video / rate if rate > 0 else 0
+            eta_str = format_time_short(eta_seconds)
+        else:
+            eta_str = "--:--"
+
+        on_progress({
+            "pct": pct,
+            "elapsed": elapsed_str,
+            "speed": speed_str,
+            "eta": eta_str,
+            "current_time": current_time_str,
+            "total_time": total_time_str,
+            "dl_speed": state["dl_speed"],
+        })
+
+    return handle
+
+
+# Clips are re-encoded so they can start and end on any frame, not just on keyframes.
+TRIM_CODEC_ARGS = ["-c:v", "libx264", "-preset", "veryfast", "-crf", "20", "-c:a", "aac", "-b:a", "160k"]
+
+
+# Containers ffmpeg can write to a pipe: fragmented MP4 needs no seeking back.
+STREAM_FORMATS = {
+    "mp4": ["-f", "mp4", "-movflags", "frag_keyframe+empty_moov+default_base_moof"],
+    "ts": ["-f", "mpegts"],
+}
+
+
+def output_args(inputs, output_file, audio_only=False, duration=0, trimmed=False, format_args=()):
+    """ffmpeg stream maps, codecs and output options for ``inputs`` inputs."""
+    args = stream_maps(inputs, audio_only)
+    if duration:
+        args += ["-t", f"{duration:.3f}"]
+    return args + (TRIM_CODEC_ARGS if trimmed else ["-c", "copy"]) + list(format_args) + ["-y", output_file]
+
+
+def ffmpeg_copy_command(ffmpeg_path, source_url, output_file, playlist=None, audio_only=False, clip=None,
+                        stream_format=None):
+    """ffmpeg stream-copy command reporting machine-readable progress on stdout.
+
+    Given a resolved ``playlist``, ffmpeg reads the selected media playlists
+    directly instead of choosing from the master playlist itself. A ``clip``
+    seeks each input to its start, so ffmpeg skips the segments before it, and
+    trims precisely by re-encoding. With a ``stream_format`` the media is
+    written to stdout in that container and progress moves to stderr.
+    """
+    inputs = [source_url]
+    if playlist:
+        inputs = [track["url"] for track in playlist_tracks(playlist)]
+        audio_only = audio_only or playlist["audio_only"]
+    # Streaming reports progress on stderr, so errors are only printed when stderr is free.
+    command = [ffmpeg_path, "-v", "quiet" if stream_format else "error", "-nostats",
+               "-progress", "pipe:2" if stream_format else "pipe:1"]
+    for url in inputs:
+        if clip:
+            command += ["-ss", f"{clip[0]:.3f}"]
+        command += ["-i", url]
+    if stream_format:
+        return command + output_args(len(inputs), "pipe:1", audio_only, clip_length(clip), bool(clip),
+                                     STREAM_FORMATS[stream_format])
+    return command + output_args(len(inputs), output_file, audio_only, clip_length(clip), bool(clip))
+
 
+FFMPEG_STDERR_LINES = 20
+
+
+def run_ffmpeg(ffmpeg_path, source_url, output_file, total_duration, on_progress=None,
+               refresh_per_second=4, playlist=None, audio_only=False, clip=None, stderr_tail=None):
+    """Run an ffmpeg stream copy, reporting progress stats through ``on_progress``.
+
+    Progress comes from ffmpeg's machine-readable ``-progress`` channel, read
+    in buffered chunks; see :func:`make_ffmpeg_reporter` for the stats dict.
+    The last error lines are appended to the ``stderr_tail`` list, if given.
+    Returns a ``(returncode, elapsed_seconds)`` tuple.
+    """
     process = subprocess.Popen(
-        cmd, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL,
-        universal_newlines=True, bufsize=1
+        ffmpeg_copy_command(ffmpeg_path, source_url, output_file, playlist, audio_only, clip),
+        stdout=subprocess.PIPE, stdin=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL if stderr_tail is None else subprocess.PIPE,
     )
+    stderr_reader = None
+    if stderr_tail is not None:
+        def read_stderr():
+            for line in process.stderr:
+                stderr_tail.append(line.decode("utf-8", "replace").strip())
+                del stderr_tail[:-FFMPEG_STDERR_LINES]
+        stderr_reader = threading.Thread(target=read_stderr, name="tldv-ffmpeg-stderr", daemon=True)
+        stderr_reader.start()
 
-    total_time_str = format_time_short(total_duration) if total_duration > 0 else "?"
     start_time = time_module.time()
+    parser = ProgressParser()
+    handle = make_ffmpeg_reporter(total_duration, on_progress, refresh_per_second, start_time)
+    read = process.stdout.read1
 
-    panel = make_progress_panel(0, "00:00", "--.-x", "--:--", "00:00", total_time_str)
+    while True:
+        chunk = read(65536)
+        if not chunk:
+            break
+        handle(parser.feed(chunk))
 
-    with Live(panel, console=console, refresh_per_second=4, transient=True) as live:
-        buffer = ""
-        last_size = 0
-        last_size_time = start_time
-        dl_speed_str = "--"
+    process.wait()
+    if stderr_reader:
+        stderr_reader.join()
+    return process.returncode, time_module.time() - start_time
+
+
+def run_ffmpeg_stream(ffmpeg_path, source_url, sink, total_duration, on_progress=None, stream_format="mp4",
+                      playlist=None, audio_only=False, clip=None, throttle=None):
+    """Run ffmpeg with its output piped to ``sink`` in bounded chunks.
 
+    Progress is parsed from stderr on a helper thread. Reads are paced by the
+    ``throttle`` share; ffmpeg blocks on the full pipe and so reads the
+    network no faster. Returns a ``(returncode, elapsed_seconds)`` tuple.
+    """
+    process = subprocess.Popen(
+        ffmpeg_copy_command(ffmpeg_path, source_url, None, playlist, audio_only, clip, stream_format),
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.DEVNULL,
+    )
+    start_time = time_module.time()
+    parser = ProgressParser()
+    handle = make_ffmpeg_reporter(total_duration, on_progress, start_time=start_time)
+
+    def read_progress():
+        for chunk in iter(lambda: process.stderr.read1(65536), b""):
+            handle(parser.feed(chunk))
+
+    reader = threading.Thread(target=read_progress, name="tldv-progress", daemon=True)
+    reader.start()
+    try:
         while True:
-            char = process.stderr.read(1)
-            if not char:
+            chunk = process.stdout.read(SINK_CHUNK_SIZE)
+            if not chunk:
                 break
-            buffer += char
-            if char == "\r" or char == "\n":
-                line = buffer.strip()
-                buffer = ""
-                if not line:
-                    continue
+            sink.write(chunk)
+            if throttle:
+                throttle.consume(len(chunk))
+    except BaseException:
+        process.kill()
+        raise
+    finally:
+        process.wait()
+        reader.join()
+    return process.returncode, time_module.time() - start_time
 
-                time_match = re.search(r"time=(\d+:\d+:\d+\.\d+)", line)
-                speed_match = re.search(r"speed=\s*([\d.]+)x", line)
-                size_match = re.search(r"size=\s*(\d+)\s*[kK]i?B", line)
-
-                if time_match:
-                    current_seconds = parse_time_to_seconds(time_match.group(1))
-                    speed_str = f"{speed_match.group(1)}x" if speed_match else "--.-x"
-
-                    elapsed = time_module.time() - start_time
-                    elapsed_str = format_time_short(elapsed)
-
-                    pct = (current_seconds / total_duration * 100) if total_duration > 0 else 0
-                    current_time_str = format_time_short(current_seconds)
-
-                    if size_match:
-                        current_size_kb = int(size_match.group(1))
-                        now = time_module.time()
-                        dt = now - last_size_time
-                        if dt >= 0.5:
-                            rate_kbs = (current_size_kb - last_size) / dt
-                            last_size = current_size_kb
-                            last_size_time = now
-                            if rate_kbs >= 1024:
-                                dl_speed_str = f"{rate_kbs / 1024:.1f} MB/s"
-                            else:
-                                dl_speed_str = f"{rate_kbs:.0f} KB/s"
-
-                    if total_duration > 0 and current_seconds > 0:
-                        remaining_video = total_duration - current_seconds
-                        rate = current_seconds / elapsed if elapsed > 0 else 1
-                        eta_seconds = remaining_video / rate if rate > 0 else 0
-                        eta_str = format_time_short(eta_seconds)
-                    else:
-                        eta_str = "--:--"
-
-                    panel = make_progress_panel(
-                        pct, elapsed_str, speed_str, eta_str,
-                        current_time_str, total_time_str, dl_speed=dl_speed_str
-                    )
-                    live.update(panel)
 
-        process.wait()
+def average_rate(output_file, elapsed):
+    """Return the average download rate string for a finished output file."""
+    final_size_kb = 0
+    if os.path.exists(output_file):
+        final_size_kb = os.path.getsize(output_file) / 1024
+    avg_speed = final_size_kb / elapsed if elapsed > 0 else 0
+    return f"{format_rate(avg_speed)} avg"
 
-        final_size_kb = 0
-        if os.path.exists(output_file):
-            final_size_kb = os.path.getsize(output_file) / 1024
-        elapsed = time_module.time() - start_time
-        elapsed_str = format_time_short(elapsed)
-        avg_speed = final_size_kb / elapsed if elapsed > 0 else 0
-        if avg_speed >= 1024:
-            final_dl = f"{avg_speed / 1024:.1f} MB/s avg"
-        else:
-            final_dl = f"{avg_speed:.0f} KB/s avg"
 
-        panel = make_progress_panel(
-            100, elapsed_str, "---", "00:00",
-            total_time_str, total_time_str, dl_speed=final_dl, finished=True
-        )
-        live.update(panel)
-        time_module.sleep(1)
+# ── Resume manifest ───────────────────────────────────────────────────────────
 
-    return process.returncode
 
+def manifest_path(output_file):
+    """Sidecar manifest path for a resumable download."""
+    return output_file + ".manifest.json"
 
-# ── Step indicators ───────────────────────────────────────────────────────────
 
+def playlist_fingerprint(playlist):
+    """Identify a media playlist independently of its (signed) segment URLs."""
+    fingerprint = {
+        "media_sequence": playlist["media_sequence"],
+        "segments": len(playlist["segments"]),
+        "duration": round(sum(s["duration"] for s in playlist["segments"]), 3),
+        "init": bool(playlist["init"]),
+    }
+    if playlist.get("audio"):
+        fingerprint["audio"] = playlist_fingerprint(playlist["audio"])
+    return fingerprint
 
-def step(number, total, msg, style="green"):
-    console.print(f"  [{style}]\u2502[/{style}]")
-    console.print(f"  [{style}]\u251c\u2500[/{style}] [{style}]Step {number}/{total}[/{style}] {msg}")
 
+def load_manifest(output_file, playlist, parts_dir):
+    """Return ``({key: size}, {key: (offset, size)})`` for segments a previous run finished.
 
-def step_done(msg):
-    console.print(f"  [green]\u2502[/green]  [green]\u2714[/green] {msg}")
+    Entries are only trusted when the playlist still matches and the staged
+    data on disk is large enough: the segment's own file has the recorded
+    size, or its region lies within the track file it was assembled into.
+    """
+    try:
+        with open(manifest_path(output_file)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}, {}
+    if manifest.get("playlist") != playlist_fingerprint(playlist):
+        return {}, {}
 
+    completed, extents = {}, {}
+    stored = manifest.get("extents", {})
+    for key, size in manifest.get("completed", {}).items():
+        if key in stored:
+            offset, length = stored[key]
+            path = os.path.join(parts_dir, track_filename(key))
+            if length == size and os.path.exists(path) and os.path.getsize(path) >= offset + size:
+                completed[key] = size
+                extents[key] = (offset, size)
+            continue
+        path = os.path.join(parts_dir, segment_filename({"key": key}))
+        if os.path.exists(path) and os.path.getsize(path) == size:
+            completed[key] = size
+    return completed, extents
 
-def step_warn(msg):
-    console.print(f"  [yellow]\u2502[/yellow]  [yellow]\u26a0[/yellow] {msg}")
 
+def save_manifest(output_file, playlist, completed, extents=None):
+    """Atomically write the resume manifest next to ``output_file``."""
+    path = manifest_path(output_file)
+    tmp_path = path + ".tmp"
+    extents = extents or {}
+    with open(tmp_path, "w") as f:
+        json.dump({
+            "version": 1,
+            "output_file": os.path.basename(output_file),
+            "playlist": playlist_fingerprint(playlist),
+            "completed": completed,
+            "extents": {key: list(extents[key]) for key in completed if key in extents},
+            "updated_at": datetime.now().isoformat(),
+        }, f)
+    os.replace(tmp_path, path)
 
-# ── Configuration helpers ─────────────────────────────────────────────────────
 
+# ── Bandwidth scheduling ──────────────────────────────────────────────────────
 
-def extract_meeting_id(url):
-    """Extract the meeting ID from a TLDV meeting URL."""
-    if url.startswith("http"):
-        return url.rstrip("/").split("/")[-1]
-    return url.strip()
 
+class BandwidthScheduler:
+    """Global byte-rate cap shared fairly between active downloads.
 
-def find_ffmpeg():
-    """Locate ffmpeg and ffprobe on the system."""
-    ffmpeg_path = shutil.which("ffmpeg")
-    if not ffmpeg_path:
-        common_paths = []
-        if sys.platform == "win32":
-            common_paths = [
-                os.path.expandvars(r"%LOCALAPPDATA%\Programs\ffmpeg\bin\ffmpeg.exe"),
-                os.path.expandvars(r"%ProgramFiles%\ffmpeg\bin\ffmpeg.exe"),
-                os.path.expandvars(r"%ProgramFiles(x86)%\ffmpeg\bin\ffmpeg.exe"),
-            ]
-        else:
-            common_paths = [
-                "/usr/local/bin/ffmpeg",
-                "/usr/bin/ffmpeg",
-                "/opt/homebrew/bin/ffmpeg",
-            ]
-        for path in common_paths:
-            if os.path.isfile(path):
-                ffmpeg_path = path
-                break
+    Each download takes a :class:`BandwidthShare`; the rate is split evenly
+    between the shares currently registered, so the sum never exceeds
+    ``rate`` and a download that finishes hands its share to the others.
+    """
 
-    if not ffmpeg_path:
-        return None, None
+    def __init__(self, rate, burst_seconds=0.25):
+        self.rate = float(rate)
+        self.burst_seconds = burst_seconds
+        self.lock = threading.Lock()
+        self.active = []
 
-    ffprobe_path = shutil.which("ffprobe")
-    if not ffprobe_path:
-        ffmpeg_dir = os.path.dirname(ffmpeg_path)
-        ext = ".exe" if sys.platform == "win32" else ""
-        candidate = os.path.join(ffmpeg_dir, f"ffprobe{ext}")
-        ffprobe_path = candidate if os.path.isfile(candidate) else None
+    def share(self):
+        share = BandwidthShare(self)
+        with self.lock:
+            self.active.append(share)
+        return share
 
-    return ffmpeg_path, ffprobe_path
 
+class BandwidthShare:
+    """One download's token bucket within a :class:`BandwidthScheduler`."""
 
-# ── Banner & UI ───────────────────────────────────────────────────────────────
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.tokens = 0.0
+        self.updated = time_module.monotonic()
 
+    @property
+    def fraction(self):
+        """This download's current share of the global rate (0 once released)."""
+        with self.scheduler.lock:
+            active = self.scheduler.active
+            return 1.0 / len(active) if self in active else 0.0
 
-def show_banner():
-    """Display the application banner."""
-    console.clear()
-    console.print()
-    for line in _LOGO:
-        console.print(f"  [bold cyan]{line}[/bold cyan]")
-    console.print()
-    console.print(f"  [dim]Video Downloader v{VERSION}[/dim]")
-    console.print(f"  [dim]     By[/dim] [bold cyan]Aliza Ali[/bold cyan]")
-    console.print()
-    console.print(Rule(style="cyan"))
-    console.print()
+    def reserve(self, count):
+        """Take ``count`` bytes of budget; return the seconds to wait before reading on."""
+        scheduler = self.scheduler
+        with scheduler.lock:
+            rate = scheduler.rate / max(1, len(scheduler.active))
+            now = time_module.monotonic()
+            # Tokens may go negative: concurrent readers queue up behind the debt.
+            self.tokens = min(rate * scheduler.burst_seconds, self.tokens + (now - self.updated) * rate)
+            self.updated = now
+            self.tokens -= count
+            return -self.tokens / rate if self.tokens < 0 else 0.0
 
+    def consume(self, count):
+        delay = self.reserve(count)
+        if delay:
+            time_module.sleep(delay)
 
-# ── CLI argument parsing ──────────────────────────────────────────────────────
+    def release(self):
+        """Return this share to the pool; safe to call more than once."""
+        with self.scheduler.lock:
+            if self in self.scheduler.active:
+                self.scheduler.active.remove(self)
 
 
-def parse_args():
-    parser = argparse.ArgumentParser(
-        description="TLDV Video Downloader by Aliza Ali — download meeting recordings with transcripts.",
-        epilog="Example: python tldv.py --url https://tldv.io/app/meetings/abc123 --token 'Bearer eyJ...'",
-    )
-    parser.add_argument("-u", "--url", help="TLDV meeting URL")
-    parser.add_argument("-t", "--token", help="Authorization token (Bearer token from browser dev tools)")
-    parser.add_argument("-o", "--output-dir", default=".", help="Directory to save files (default: current directory)")
-    parser.add_argument("--ffmpeg", help="Path to ffmpeg binary (auto-detected if omitted)")
-    parser.add_argument("--ffprobe", help="Path to ffprobe binary (auto-detected if omitted)")
-    return parser.parse_args()
+def bandwidth_share(config):
+    """A fresh share of the ``--max-rate`` budget, or None when uncapped."""
+    scheduler = config.get("bandwidth")
+    return scheduler.share() if scheduler else None
 
 
-def get_config(args):
-    """Build config from CLI args → env vars → interactive prompts."""
+class HostLimiter:
+    """Caps concurrent segment connections per host across all downloads."""
 
-    # ── Meeting URL ───────────────────────────────────────────────────────
-    url = args.url or os.environ.get("TLDV_URL")
-    if not url:
-        console.print("  [bold cyan]Enter meeting details[/bold cyan]")
-        console.print()
-        url = Prompt.ask("  [cyan]Meeting URL[/cyan]")
+    def __init__(self, limit):
+        self.limit = limit
+        self.lock = threading.Lock()
+        self.slots = {}
 
-    # ── Auth token ────────────────────────────────────────────────────────
-    token = args.token or os.environ.get("TLDV_TOKEN")
-    if not token:
-        console.print()
-        token = Prompt.ask("  [cyan]Bearer token[/cyan]")
+    def slot(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.slots:
+                self.slots[host] = threading.BoundedSemaphore(self.limit)
+            return self.slots[host]
 
-    token = token.strip()
-    if not token.lower().startswith("bearer "):
-        token = f"Bearer {token}"
 
-    # ── FFmpeg / FFprobe ──────────────────────────────────────────────────
-    ffmpeg_path = args.ffmpeg or os.environ.get("FFMPEG_PATH")
-    ffprobe_path = args.ffprobe or os.environ.get("FFPROBE_PATH")
+# ── Retries and adaptive concurrency ─────────────────────────────────────────
 
-    if not ffmpeg_path:
-        ffmpeg_path, auto_ffprobe = find_ffmpeg()
-        if not ffprobe_path:
-            ffprobe_path = auto_ffprobe
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
 
-    if not ffmpeg_path:
-        console.print()
-        console.print(Panel(
-            "[bold red]FFmpeg not found![/bold red]\n\n"
-            "Install FFmpeg and make sure it's on your PATH:\n"
-            "  [cyan]Windows:[/cyan]  winget install ffmpeg\n"
-            "  [cyan]macOS:[/cyan]    brew install ffmpeg\n"
-            "  [cyan]Linux:[/cyan]    sudo apt install ffmpeg\n\n"
-            "Or provide the path with [bold]--ffmpeg /path/to/ffmpeg[/bold]",
-            border_style="red",
-            box=box.HEAVY,
-            title="[bold red] Missing Dependency [/bold red]",
-            title_align="left",
-        ))
-        sys.exit(1)
+# ffmpeg error output that points at a network hiccup rather than a permanent failure.
+FFMPEG_TRANSIENT_RE = re.compile(
+    r"(?:Server returned|HTTP error) (?:408|429|5\d\d|5XX)|Connection (?:reset|refused|timed out)|"
+    r"Operation timed out|Network is unreachable|Temporary failure in name resolution|"
+    r"End of file|I/O error|Broken pipe",
+    re.IGNORECASE,
+)
 
-    if not ffprobe_path:
-        ffprobe_path = ffmpeg_path
 
-    # ── Output directory ──────────────────────────────────────────────────
-    output_dir = args.output_dir
-    if not os.path.isdir(output_dir):
-        os.makedirs(output_dir, exist_ok=True)
+class FFmpegError(RuntimeError):
+    """A failed ffmpeg run, with the tail of its error output."""
 
-    return {
-        "url": url,
-        "token": token,
-        "ffmpeg": ffmpeg_path,
-        "ffprobe": ffprobe_path,
-        "output_dir": output_dir,
-    }
+    def __init__(self, returncode, stderr=()):
+        self.returncode = returncode
+        self.stderr = list(stderr)
+        detail = f": {self.stderr[-1]}" if self.stderr else ""
+        super().__init__(f"ffmpeg exited with code {returncode}{detail}")
 
+    @property
+    def transient(self):
+        # Signals (negative codes) are interrupts or kills, not network trouble.
+        return self.returncode > 0 and any(FFMPEG_TRANSIENT_RE.search(line) for line in self.stderr)
 
-# ── Main ──────────────────────────────────────────────────────────────────────
 
+def is_retryable(error):
+    """Whether a failed request or ffmpeg run is worth retrying (network errors, 429 and 5xx)."""
+    if isinstance(error, FFmpegError):
+        return error.transient
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code in RETRY_STATUSES
+    if isinstance(error, requests.RequestException):
+        return isinstance(error, (requests.ConnectionError, requests.Timeout,
+                                  requests.exceptions.ChunkedEncodingError))
+    if isinstance(error, (ConnectionError, TimeoutError, socket.gaierror)):
+        return True
+    # Only the async engine raises asyncio errors; don't import asyncio to check for them.
+    loaded = sys.modules.get("asyncio")
+    return loaded is not None and isinstance(error, (loaded.TimeoutError, loaded.IncompleteReadError))
 
-def main():
-    args = parse_args()
-    show_banner()
-    config = get_config(args)
 
-    meeting_id = extract_meeting_id(config["url"])
-    console.print()
+def retry_after_seconds(error):
+    """The server's ``Retry-After`` hint for an HTTP error, in seconds, or None."""
+    response = getattr(error, "response", None)
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time_module.time())
+    except (TypeError, ValueError):
+        return None
 
-    # ── Step 1: Fetch metadata ────────────────────────────────────────────
-    step(1, 3, "[bold]Fetching meeting metadata...[/bold]", "cyan")
 
-    with console.status("  [dim]Connecting to TLDV servers...[/dim]", spinner="dots"):
-        data = requests.get(
-            f"https://gw.tldv.io/v1/meetings/{meeting_id}/watch-page",
-            headers={"Authorization": config["token"]},
-        )
+class RetryPolicy:
+    """Retries with full-jitter exponential backoff.
 
-    if data.status_code == 401:
-        console.print()
-        console.print(Panel(
-            "[bold red]Authentication failed![/bold red]\n\n"
-            "[dim]Your token may be expired or invalid.\n"
-            "Get a fresh token from your browser developer tools (F12 → Network tab).[/dim]",
-            border_style="red", box=box.HEAVY,
-            title="[bold red] Auth Error (401) [/bold red]", title_align="left",
-        ))
-        sys.exit(1)
+    Attempt ``n`` waits a random time up to ``base_delay * 2**n`` (capped at
+    ``max_delay``), or longer if the server asked for it with ``Retry-After``.
+    ``func(attempt)`` is called with the zero-based attempt number so callers
+    can resume partial work; ``on_retry(attempt, error, delay)`` is told about
+    each retry before the wait.
+    """
 
-    if data.status_code == 404:
-        console.print()
-        console.print(Panel(
-            "[bold red]Meeting not found![/bold red]\n\n"
-            f"[dim]Meeting ID: {meeting_id}\n"
-            "Check that the URL is correct and you have access to this meeting.[/dim]",
-            border_style="red", box=box.HEAVY,
-            title="[bold red] Not Found (404) [/bold red]", title_align="left",
-        ))
-        sys.exit(1)
+    def __init__(self, retries=4, base_delay=0.5, max_delay=30.0):
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
 
-    try:
-        response = json.loads(data.text)
+    def delay(self, attempt, error=None):
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        hint = retry_after_seconds(error)
+        return min(self.max_delay, max(backoff, hint)) if hint is not None else backoff
 
-        meeting = response.get("meeting", {})
-        name = meeting.get("name", "No name")
-        createdAt = meeting.get("createdAt", datetime.now().isoformat())
-        source = response.get("video", {}).get("source", None)
+    def call(self, func, on_retry=None):
+        for attempt in range(self.retries + 1):
+            try:
+                return func(attempt)
+            except Exception as e:
+                if attempt == self.retries or not is_retryable(e):
+                    raise
+                delay = self.delay(attempt, e)
+                if on_retry:
+                    on_retry(attempt, e, delay)
+                time_module.sleep(delay)
 
-        if not source:
-            console.print()
-            console.print(Panel(
-                "[bold red]No video source found![/bold red]\n\n"
-                "[dim]The meeting may still be processing or the video is unavailable.[/dim]",
-                border_style="red", box=box.HEAVY,
-                title="[bold red] Error [/bold red]", title_align="left",
-            ))
-            sys.exit(1)
+    async def acall(self, func, on_retry=None):
+        """asyncio counterpart of :meth:`call`; ``func(attempt)`` returns an awaitable."""
+        for attempt in range(self.retries + 1):
+            try:
+                return await func(attempt)
+            except Exception as e:
+                if attempt == self.retries or not is_retryable(e):
+                    raise
+                delay = self.delay(attempt, e)
+                if on_retry:
+                    on_retry(attempt, e, delay)
+                await asyncio.sleep(delay)
 
-        date = datetime.fromisoformat(createdAt.replace("Z", "+00:00"))
-        normalised_date = date.strftime("%Y-%m-%d-%H-%M-%S")
-        display_date = date.strftime("%b %d, %Y  %I:%M %p")
 
-        safe_name = re.sub(r'[<>:"/\\|?*]', '-', name)
-        filename = f"{normalised_date}_{safe_name}"
-        output_file = os.path.join(config["output_dir"], f"{filename}.mp4")
+def retry_policy(config):
+    """The run's :class:`RetryPolicy`; no retries if none was configured."""
+    return config.get("retry") or RetryPolicy(0)
 
-        # Get total duration via ffprobe
-        with console.status("  [dim]Probing video duration...[/dim]", spinner="dots"):
-            total_duration = get_duration(config["ffprobe"], source)
 
-        step_done("Metadata fetched successfully")
+class AdaptiveConcurrency:
+    """AIMD limit on parallel segment fetches for one download.
 
-        # ── Meeting info card ─────────────────────────────────────────────
-        duration_str = format_duration(total_duration) if total_duration > 0 else "Unknown"
+    The limit starts low and doubles (slow start), then grows by one, while
+    each round of completed segments beats the previous round's throughput.
+    It steps back by one when throughput drops, and is cut multiplicatively
+    on a failed fetch (halved) or a latency spike (a fetch taking over three
+    times the running average). With ``adaptive=False`` the limit stays at
+    ``maximum``.
+    """
 
-        info_table = Table(box=None, show_header=False, show_edge=False, padding=(0, 1))
-        info_table.add_column("Key", style="dim cyan", width=14)
-        info_table.add_column("Value", style="white")
-        info_table.add_row("  Meeting", f"[bold bright_white]{name}[/bold bright_white]")
-        info_table.add_row("  Date", display_date)
-        info_table.add_row("  Duration", f"[bold]{duration_str}[/bold]" if total_duration > 0 else "[dim]Unknown[/dim]")
-        info_table.add_row("  Meeting ID", f"[dim]{meeting_id}[/dim]")
-        info_table.add_row("  Output", f"[dim]{os.path.basename(output_file)}[/dim]")
+    def __init__(self, maximum, initial=4, minimum=1, adaptive=True):
+        self.maximum = max(1, maximum)
+        self.minimum = min(minimum, self.maximum)
+        self.adaptive = adaptive
+        self.limit = min(initial, self.maximum) if adaptive else self.maximum
+        self.lock = threading.Lock()
+        self._latency = None
+        self._samples = 0
+        self._previous = 0.0
+        self._slow_start = True
+        self._reset_window()
 
-        console.print()
-        console.print(Panel(
-            info_table,
-            border_style="bright_blue", box=box.HEAVY,
-            title="[bold bright_blue] Meeting Info [/bold bright_blue]",
-            title_align="left", padding=(1, 1),
-        ))
+    def _reset_window(self):
+        self._window_start = time_module.monotonic()
+        self._window_bytes = 0
+        self._window_count = 0
 
-        # ── Step 2: Save files ────────────────────────────────────────────
-        step(2, 3, "[bold]Saving meeting data...[/bold]", "cyan")
+    def _decrease(self, factor):
+        self.limit = max(self.minimum, int(self.limit * factor))
+        self._slow_start = False
+        self._previous = 0.0
+        self._reset_window()
 
-        json_filename = os.path.join(config["output_dir"], f"{filename}.json")
-        with open(json_filename, "w") as f:
-            f.write(data.text)
-        step_done(f"Metadata  \u2192  [bold]{os.path.basename(json_filename)}[/bold]")
+    def success(self, size, seconds):
+        """Record a completed fetch of ``size`` bytes that took ``seconds``."""
+        if not self.adaptive:
+            return
+        with self.lock:
+            self._samples += 1
+            spike = self._samples > 5 and seconds > 3 * self._latency
+            self._latency = seconds if self._latency is None else 0.8 * self._latency + 0.2 * seconds
+            if spike:
+                self._decrease(0.75)
+                return
 
-        transcript_data = response.get("video", {}).get("transcript", {}).get("data", [])
-        transcript_filename = None
+            self._window_bytes += size
+            self._window_count += 1
+            elapsed = time_module.monotonic() - self._window_start
+            # A round is one completion per slot, and long enough to measure.
+            if self._window_count < self.limit or elapsed < 0.2:
+                return
+            throughput = self._window_bytes / elapsed
+            if throughput > self._previous * 1.05:
+                self.limit = min(self.maximum, self.limit * 2 if self._slow_start else self.limit + 1)
+            else:
+                self._slow_start = False
+                if throughput < self._previous * 0.9:
+                    self.limit = max(self.minimum, self.limit - 1)
+            self._previous = throughput
+            self._reset_window()
 
-        if transcript_data:
-            transcript_filename = os.path.join(config["output_dir"], f"{filename}_transcript.txt")
-            with open(transcript_filename, "w", encoding="utf-8") as f:
-                for segment in transcript_data:
-                    if not segment:
-                        continue
-                    first_word = segment[0]
-                    speaker = first_word.get("speaker", "Unknown")
-                    start_time = first_word.get("startTime", {})
-                    seconds_total = int(start_time.get("seconds", 0))
-                    minutes = seconds_total // 60
-                    seconds = seconds_total % 60
-                    timestamp = f"{minutes:02d}:{seconds:02d}"
-                    text = " ".join(word.get("word", "") for word in segment)
-                    f.write(f"[{timestamp}] {speaker}: {text}\n")
-            step_done(f"Transcript \u2192  [bold]{os.path.basename(transcript_filename)}[/bold]")
-        else:
-            step_warn("No transcript available for this meeting")
+    def failure(self):
+        """Record a failed fetch attempt."""
+        if self.adaptive:
+            with self.lock:
+                self._decrease(0.5)
 
-        # ── Step 3: Download video ────────────────────────────────────────
-        step(3, 3, "[bold]Downloading video...[/bold]", "cyan")
-        console.print("  [green]\u2502[/green]")
-        console.print()
 
-        return_code = download_video(config["ffmpeg"], source, output_file, total_duration)
+# ── Streaming sinks ───────────────────────────────────────────────────────────
 
-        if return_code == 0 and os.path.exists(output_file):
-            file_size_mb = os.path.getsize(output_file) / (1024 * 1024)
+SINK_CHUNK_SIZE = 1024 * 1024
 
-            files_table = Table(box=None, show_header=True, show_edge=False, padding=(0, 2), expand=True)
-            files_table.add_column("Type", style="dim", width=12, header_style="dim bold")
-            files_table.add_column("File", style="bold white", header_style="dim bold")
-            files_table.add_column("Size", style="dim", justify="right", header_style="dim bold")
 
-            files_table.add_row("[bold cyan]Video[/bold cyan]", os.path.basename(output_file), f"{file_size_mb:.1f} MB")
-            files_table.add_row("[bold yellow]Metadata[/bold yellow]", os.path.basename(json_filename), f"{os.path.getsize(json_filename) / 1024:.0f} KB")
-            if transcript_filename:
-                files_table.add_row("[bold magenta]Transcript[/bold magenta]", os.path.basename(transcript_filename), f"{os.path.getsize(transcript_filename) / 1024:.0f} KB")
+class StdoutSink:
+    """Write the stream to standard output."""
 
-            console.print()
-            console.print(Panel(
-                Group(
-                    Text(""),
-                    Text.from_markup("  [bold green]\u2714 All tasks completed successfully![/bold green]"),
-                    Text(""),
-                    files_table,
-                    Text(""),
-                ),
-                border_style="green", box=box.HEAVY,
-                title="[bold green] Download Complete [/bold green]",
-                title_align="left",
-                subtitle=f"[dim]Files saved to {os.path.abspath(config['output_dir'])}[/dim]",
-                subtitle_align="right",
-                padding=(0, 1),
-            ))
-            console.print()
-        else:
-            console.print()
-            console.print(Panel(
-                f"[bold red]ffmpeg exited with code {return_code}[/bold red]\n"
-                "[dim]Try running the ffmpeg command manually to see detailed errors.[/dim]",
-                border_style="red", box=box.HEAVY,
-                title="[bold red] Error [/bold red]", title_align="left",
-            ))
-            sys.exit(1)
+    def __init__(self, target=None):
+        self.stream = sys.stdout.buffer
 
-    except Exception as e:
-        console.print()
-        console.print(Panel(
-            f"[bold red]{e}[/bold red]\n\n[dim]{data.text[:300]}[/dim]",
-            border_style="red", box=box.HEAVY,
-            title="[bold red] Error [/bold red]", title_align="left",
-        ))
-        sys.exit(1)
+    def write(self, chunk):
+        self.stream.write(chunk)
+
+    def close(self):
+        self.stream.flush()
+
+    def abort(self):
+        self.stream.flush()
+
+
+class FileSink:
+    """Write the stream to a path (``file:PATH``), e.g. a named pipe."""
+
+    def __init__(self, target):
+        self.path = target[len("file:"):] if target.startswith("file:") else target
+        if self.path.startswith("//"):
+            self.path = urlparse(target).path
+        self.file = open(self.path, "wb")
+
+    def write(self, chunk):
+        self.file.write(chunk)
+
+    def close(self):
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+
+class HTTPSink:
+    """Upload the stream with one chunked ``PUT`` from a background thread.
+
+    The length is not known up front, so the body is sent with
+    ``Transfer-Encoding: chunked``. Servers that need a ``Content-Length``,
+    such as S3 presigned URLs, reject it; plug in a multipart uploader with
+    :func:`register_sink` for those. At most ``depth`` chunks are buffered, so
+    a slow upload slows the download down instead of growing memory.
+    :meth:`abort` breaks the connection so the server never sees a complete body.
+    """
+
+    _ABORT = object()
+
+    def __init__(self, target, depth=8):
+        self.url = target
+        self.chunks = queue.Queue(maxsize=depth)
+        self.response = None
+        self.error = None
+        self.thread = threading.Thread(target=self._upload, name="tldv-sink", daemon=True)
+        self.thread.start()
+
+    def _body(self):
+        while True:
+            chunk = self.chunks.get()
+            if chunk is None:
+                return
+            if chunk is self._ABORT:
+                raise IOError("upload aborted")
+            yield chunk
+
+    def _upload(self):
+        try:
+            self.response = requests.put(self.url, data=self._body(), timeout=(10, 300),
+                                         headers={"Content-Type": "application/octet-stream"})
+        except Exception as e:
+            self.error = e
+
+    def _failure(self, message):
+        """The error to raise once the upload thread has stopped."""
+        response = self.response
+        if response is None or response.status_code < 300:
+            return MeetingError("Upload Error", message, str(self.error or ""))
+        detail = f"HTTP {response.status_code}: {response.text[:300]}"
+        if response.status_code in (411, 501):
+            detail += ("\nThe server does not accept chunked uploads without a Content-Length "
+                       "(S3 presigned URLs do not). Use a server that does, or register a multipart sink.")
+        return MeetingError("Upload Error", f"{self.url} rejected the upload", detail)
+
+    def _put(self, item):
+        while True:
+            try:
+                self.chunks.put(item, timeout=1)
+                return
+            except queue.Full:
+                if not self.thread.is_alive():
+                    raise self._failure(f"Upload to {self.url} stopped")
+
+    def write(self, chunk):
+        if not self.thread.is_alive():
+            raise self._failure(f"Upload to {self.url} stopped")
+        self._put(chunk)
+
+    def close(self):
+        self._put(None)
+        self.thread.join()
+        if self.error is not None or self.response.status_code >= 300:
+            raise self._failure(f"Upload to {self.url} failed")
+
+    def abort(self):
+        if self.thread.is_alive():
+            try:
+                self.chunks.put(self._ABORT, timeout=5)
+            except queue.Full:
+                pass
+            self.thread.join(timeout=10)
+
+
+# URL scheme -> sink factory taking the target string; see :func:`register_sink`.
+SINKS = {
+    "file": FileSink,
+    "http": HTTPSink,
+    "https": HTTPSink,
+}
+
+
+def register_sink(scheme, factory):
+    """Make ``--sink SCHEME:...`` targets open ``factory(target)``.
+
+    A sink has ``write(chunk)``, ``close()`` (which raises if the data did not
+    arrive) and ``abort()``.
+    """
+    SINKS[scheme] = factory
+
+
+def is_stdout_sink(target):
+    return target in ("-", "stdout")
+
+
+def open_sink(target, filename):
+    """Open the sink for ``target``, with ``{filename}`` replaced by the output file name."""
+    if is_stdout_sink(target):
+        return StdoutSink()
+    scheme = urlparse(target).scheme
+    if scheme not in SINKS:
+        raise MeetingError("Error", f"Unknown sink: {target}",
+                           f"Use -, file:PATH or one of: {', '.join(s + '://' for s in SINKS if s != 'file')}")
+    return SINKS[scheme](target.replace("{filename}", quote(filename) if scheme.startswith("http") else filename))
+
+
+def stream_download(config, source_url, output_file, total_duration, on_progress=None, session=None,
+                    playlist=None, on_retry=None):
+    """Stream the download to ``config["sink"]`` instead of writing ``output_file``.
+
+    Only the file name of ``output_file`` is used, for ``{filename}`` in the
+    sink target. A stream cannot be rewound, so a failed run is not retried.
+    """
+    selection = playlist_selection(config)
+    if playlist is None and any(selection.values()) and urlparse(source_url).path.endswith(".m3u8"):
+        playlist = retry_policy(config).call(
+            lambda attempt: fetch_media_playlist(session or requests, source_url, selection), on_retry)
+    sink = open_sink(config["sink"], os.path.basename(output_file))
+    throttle = bandwidth_share(config)
+    try:
+        returncode, elapsed = run_ffmpeg_stream(
+            config["ffmpeg"], source_url, sink, total_duration, on_progress, config.get("stream_format", "mp4"),
+            playlist, config.get("audio_only", False), config.get("clip"), throttle,
+        )
+    except BaseException:
+        sink.abort()
+        raise
+    finally:
+        if throttle:
+            throttle.release()
+    if returncode != 0:
+        sink.abort()
+    else:
+        sink.close()
+    return returncode, elapsed
+
+
+def output_ready(config, output_file):
+    """True once a finished download has been streamed to the sink or saved at ``output_file``."""
+    return bool(config.get("sink")) or os.path.exists(output_file)
+
+
+# ── HLS segment engine ────────────────────────────────────────────────────────
+
+_HLS_ATTR_RE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+def parse_hls_attributes(value):
+    """Parse an HLS attribute list like ``BANDWIDTH=1280000,CODECS="avc1"``."""
+    return {key: val.strip('"') for key, val in _HLS_ATTR_RE.findall(value)}
+
+
+def parse_m3u8(text, base_url):
+    """Parse a master or media playlist into a dict.
+
+    Master playlists fill ``variants`` and ``renditions`` (``#EXT-X-MEDIA``);
+    media playlists fill ``segments`` with absolute URIs, durations, optional
+    byte ranges, sequence numbers and the manifest ``key`` of each segment.
+    """
+    playlist = {
+        "url": base_url,
+        "variants": [],
+        "renditions": [],
+        "variant": None,
+        "audio": None,
+        "audio_only": False,
+        "segments": [],
+        "init": None,
+        "media_sequence": 0,
+        "target_duration": 0,
+        "key_lines": [],
+    }
+    pending_duration = None
+    pending_variant = None
+    pending_range = None
+    next_offset = 0
+    key_line = None
+
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        if line.startswith("#EXT-X-STREAM-INF:"):
+            pending_variant = parse_hls_attributes(line.split(":", 1)[1])
+        elif line.startswith("#EXT-X-MEDIA:"):
+            attrs = parse_hls_attributes(line.split(":", 1)[1])
+            if "URI" in attrs:
+                attrs["uri"] = urljoin(base_url, attrs["URI"])
+            playlist["renditions"].append(attrs)
+        elif line.startswith("#EXT-X-MEDIA-SEQUENCE:"):
+            playlist["media_sequence"] = int(line.split(":", 1)[1])
+        elif line.startswith("#EXT-X-TARGETDURATION:"):
+            playlist["target_duration"] = float(line.split(":", 1)[1])
+        elif line.startswith("#EXTINF:"):
+            pending_duration = float(line.split(":", 1)[1].split(",", 1)[0])
+        elif line.startswith("#EXT-X-BYTERANGE:"):
+            length, _, offset = line.split(":", 1)[1].partition("@")
+            start = int(offset) if offset else next_offset
+            pending_range = (start, int(length))
+            next_offset = start + int(length)
+        elif line.startswith("#EXT-X-MAP:"):
+            attrs = parse_hls_attributes(line.split(":", 1)[1])
+            init_range = None
+            if "BYTERANGE" in attrs:
+                length, _, offset = attrs["BYTERANGE"].partition("@")
+                init_range = (int(offset or 0), int(length))
+            playlist["init"] = {"key": "init", "uri": urljoin(base_url, attrs["URI"]), "byterange": init_range}
+        elif line.startswith("#EXT-X-KEY:"):
+            attrs = parse_hls_attributes(line.split(":", 1)[1])
+            if attrs.get("METHOD", "NONE") == "NONE":
+                key_line = None
+            else:
+                # Keep the key line for the local remux playlist, with an absolute URI.
+                key_line = re.sub(
+                    r'URI="([^"]*)"',
+                    lambda m: f'URI="{urljoin(base_url, m.group(1))}"',
+                    line,
+                )
+        elif line.startswith("#"):
+            continue
+        elif pending_variant is not None:
+            pending_variant["uri"] = urljoin(base_url, line)
+            pending_variant["index"] = len(playlist["variants"])
+            playlist["variants"].append(pending_variant)
+            pending_variant = None
+        else:
+            index = len(playlist["segments"])
+            sequence = playlist["media_sequence"] + index
+            playlist["segments"].append({
+                "index": index,
+                "sequence": sequence,
+                "key": str(sequence),
+                "uri": urljoin(base_url, line),
+                "duration": pending_duration or 0.0,
+                "byterange": pending_range,
+                "key_line": key_line,
+            })
+            pending_duration = None
+            pending_range = None
+
+    return playlist
+
+
+_VIDEO_CODECS = ("avc", "hvc", "hev", "dvh", "vp8", "vp08", "vp9", "vp09", "av01", "mp4v")
+
+
+def variant_height(variant):
+    """Vertical resolution of a variant, or None when it is not advertised."""
+    _, _, height = variant.get("RESOLUTION", "").partition("x")
+    return int(height) if height.isdigit() else None
+
+
+def variant_bandwidth(variant):
+    return int(variant.get("BANDWIDTH", 0) or 0)
+
+
+def is_audio_variant(variant):
+    """True for a variant whose codecs are all audio and that has no resolution."""
+    codecs = [c.strip().lower() for c in variant.get("CODECS", "").split(",") if c.strip()]
+    return bool(codecs) and "RESOLUTION" not in variant and not any(c.startswith(_VIDEO_CODECS) for c in codecs)
+
+
+def select_variant(playlist, max_height=None, max_bitrate=None, audio_only=False):
+    """Pick the variant to download from a master playlist.
+
+    The highest-bandwidth variant within ``max_height`` and ``max_bitrate``
+    wins; when none fits, the smallest one does. With ``audio_only`` an
+    audio-only variant is preferred, else the smallest variant overall.
+    """
+    variants = playlist["variants"]
+    if audio_only:
+        variants = [v for v in variants if is_audio_variant(v)] or [min(variants, key=variant_bandwidth)]
+    else:
+        variants = [v for v in variants if not is_audio_variant(v)] or variants
+    eligible = [
+        v for v in variants
+        if (not max_height or (variant_height(v) or 0) <= max_height)
+        and (not max_bitrate or variant_bandwidth(v) <= max_bitrate)
+    ]
+    if eligible:
+        return max(eligible, key=variant_bandwidth)
+    return min(variants, key=variant_bandwidth)
+
+
+def select_audio(playlist, variant=None):
+    """Pick the separate audio rendition for ``variant``, or None if its audio is muxed in.
+
+    Without a variant any audio group qualifies. ``DEFAULT=YES`` renditions
+    win over ``AUTOSELECT=YES`` ones, then playlist order decides.
+    """
+    group = variant.get("AUDIO") if variant else None
+    if variant and not group:
+        return None
+    candidates = [
+        r for r in playlist["renditions"]
+        if r.get("TYPE") == "AUDIO" and r.get("uri") and (group is None or r.get("GROUP-ID") == group)
+    ]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda r: (r.get("DEFAULT") == "YES", r.get("AUTOSELECT") == "YES"))
+
+
+def plan_media_playlists(master, selection=None):
+    """Decide which media playlists of a master playlist to fetch.
+
+    Returns ``(variant, primary_uri, audio_uri)``. ``primary_uri`` is the
+    video playlist, or the audio playlist with ``audio_only``; ``audio_uri`` is
+    a separate audio rendition to fetch alongside the video, if any.
+    """
+    selection = selection or {}
+    audio_only = selection.get("audio_only", False)
+    variant = select_variant(master, selection.get("max_height"), selection.get("max_bitrate"), audio_only)
+    rendition = select_audio(master, variant)
+    if audio_only:
+        if rendition is None and not is_audio_variant(variant):
+            rendition = select_audio(master)
+        return variant, (rendition or variant)["uri"], None
+    return variant, variant["uri"], rendition["uri"] if rendition else None
+
+
+def playlist_selection(config):
+    """The rendition options of ``config``, as taken by :func:`fetch_media_playlist`."""
+    return {key: config.get(key) for key in ("audio_only", "max_height", "max_bitrate")}
+
+
+def check_media_playlist(playlist):
+    if not playlist["segments"]:
+        raise MeetingError("Error", "The video source is not a segmented HLS stream.")
+    return playlist
+
+
+def combine_playlists(playlist, audio=None, variant=None, audio_only=False):
+    """Attach the chosen ``variant`` and a separate ``audio`` track to ``playlist``.
+
+    Audio segment keys get an ``audio:`` prefix so both tracks can share one
+    staging directory and manifest.
+    """
+    playlist["variant"] = variant
+    playlist["audio_only"] = bool(audio_only)
+    if audio:
+        check_media_playlist(audio)
+        for item in audio["segments"] + ([audio["init"]] if audio["init"] else []):
+            item["key"] = "audio:" + item["key"]
+        playlist["audio"] = audio
+    return check_media_playlist(playlist)
+
+
+def playlist_tracks(playlist):
+    """The main media playlist followed by its separate audio track, if any."""
+    return [playlist] + ([playlist["audio"]] if playlist.get("audio") else [])
+
+
+def playlist_segments(playlist):
+    """Segments of every track of ``playlist``."""
+    return [segment for track in playlist_tracks(playlist) for segment in track["segments"]]
+
+
+def clip_playlist(playlist, start, end=None):
+    """Copy of ``playlist`` keeping only the segments that overlap ``[start, end)``.
+
+    A separate audio track is clipped on its own segment timeline. Each kept
+    track records ``clip_start``, the media time its first segment starts at.
+    """
+    def clip(track):
+        kept = []
+        clip_start = position = 0.0
+        for segment in track["segments"]:
+            segment_end = position + segment["duration"]
+            if segment_end > start and (end is None or position < end):
+                if not kept:
+                    clip_start = position
+                kept.append(segment)
+            position = segment_end
+        if not kept:
+            raise MeetingError("Error", f"The clip starts after the end of the video ({format_duration(position)}).")
+        return dict(track, segments=kept, media_sequence=kept[0]["sequence"], clip_start=clip_start)
+
+    clipped = clip(playlist)
+    if playlist.get("audio"):
+        clipped["audio"] = clip(playlist["audio"])
+    return clipped
+
+
+def clip_seeks(playlist, clip):
+    """Per-track offsets of ``clip``'s start within a clipped playlist's local segments."""
+    if not clip:
+        return None
+    return [clip[0] - track["clip_start"] for track in playlist_tracks(playlist)]
+
+
+def fetch_playlist(session, url):
+    """GET and parse one playlist."""
+    response = session.get(url, timeout=30)
+    response.raise_for_status()
+    return parse_m3u8(response.text, response.url)
+
+
+def fetch_media_playlist(session, source_url, selection=None):
+    """Fetch ``source_url`` and follow a master playlist to the selected renditions.
+
+    ``selection`` holds the ``audio_only``, ``max_height`` and ``max_bitrate``
+    options; see :func:`plan_media_playlists`.
+    """
+    selection = selection or {}
+    playlist = fetch_playlist(session, source_url)
+    variant = audio = None
+    if playlist["variants"]:
+        variant, primary_uri, audio_uri = plan_media_playlists(playlist, selection)
+        playlist = fetch_playlist(session, primary_uri)
+        audio = fetch_playlist(session, audio_uri) if audio_uri else None
+    return combine_playlists(playlist, audio, variant, selection.get("audio_only"))
+
+
+def segment_filename(segment):
+    """Local file name for a downloaded segment or init section, from its key."""
+    track, _, name = segment["key"].rpartition(":")
+    name = "init.bin" if name == "init" else f"seg_{int(name):06d}.bin"
+    return f"{track}_{name}" if track else name
+
+
+def track_filename(key):
+    """Staging file that a track's segments are assembled into, from a segment key."""
+    track = key.rpartition(":")[0]
+    return f"{track}_track.bin" if track else "track.bin"
+
+
+SEGMENT_BUFFER_SIZE = 256 * 1024
+
+
+class SegmentStore:
+    """Assembles a download's segments in place, one staging file per track.
+
+    Segments arrive out of order, so each reserves a region of its track file
+    as soon as its size is known (from the playlist byte range or the
+    response's ``Content-Length``). The region is preallocated and the body is
+    read into a reusable buffer and written at its offset with ``os.pwrite``,
+    so memory stays at one buffer per connection however long the recording.
+    The local playlists then address the regions by byte range and the remux
+    reads them where they are.
+
+    Segments of unknown or encoded length, and every segment where
+    ``os.pwrite`` is unavailable (Windows), get a file of their own instead.
+    """
+
+    def __init__(self, parts_dir, extents=None):
+        self.parts_dir = parts_dir
+        self.extents = dict(extents or {})
+        self.written = {}
+        self.in_place = hasattr(os, "pwrite")
+        self.lock = threading.Lock()
+        self._fds = {}
+        self._ends = {}
+        self._buffers = []
+
+    def path(self, segment):
+        """Own file for a segment that is not assembled in place."""
+        return os.path.join(self.parts_dir, segment_filename(segment))
+
+    def _fd(self, name):
+        # Called with ``lock`` held.
+        if name not in self._fds:
+            flags = os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0)
+            fd = os.open(os.path.join(self.parts_dir, name), flags, 0o666)
+            self._fds[name] = fd
+            self._ends[name] = os.fstat(fd).st_size
+        return self._fds[name]
+
+    def size(self, key):
+        """Size of the region reserved for ``key``, or None."""
+        extent = self.extents.get(key)
+        return extent[1] if extent else None
+
+    def reserve(self, key, size):
+        """Offset of a preallocated ``size``-byte region for ``key``.
+
+        A retried segment of unchanged size keeps its region.
+        """
+        name = track_filename(key)
+        with self.lock:
+            fd = self._fd(name)
+            extent = self.extents.get(key)
+            if extent and extent[1] == size:
+                return extent[0]
+            offset = self._ends[name]
+            self._ends[name] = offset + size
+            self.extents[key] = (offset, size)
+            self.written.pop(key, None)
+        if size and hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(fd, offset, size)
+            except OSError:
+                pass  # Not supported by this filesystem; pwrite extends the file anyway.
+        return offset
+
+    def write(self, key, position, data):
+        """Write ``data`` at ``position`` within the region of ``key``."""
+        offset, size = self.extents[key]
+        fd = self._fds[track_filename(key)]
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(fd, view, offset + position)
+            position += written
+            view = view[written:]
+        self.written[key] = position
+
+    @contextmanager
+    def buffer(self):
+        """Borrow a reusable ``memoryview`` read buffer."""
+        with self.lock:
+            buffer = self._buffers.pop() if self._buffers else memoryview(bytearray(SEGMENT_BUFFER_SIZE))
+        try:
+            yield buffer
+        finally:
+            with self.lock:
+                self._buffers.append(buffer)
+
+    def close(self):
+        with self.lock:
+            for fd in self._fds.values():
+                os.close(fd)
+            self._fds.clear()
+            self._buffers.clear()
+
+
+def in_place_size(headers, have, byterange_length=None):
+    """Total segment size if a response can be written in place, else None."""
+    if byterange_length is not None:
+        return byterange_length
+    if headers.get("Content-Encoding", "identity").lower() != "identity":
+        return None
+    length = headers.get("Content-Length", "")
+    return have + int(length) if length.isdigit() else None
+
+
+def segment_range(segment, have, size=None):
+    """``Range`` headers continuing a segment after ``have`` bytes."""
+    start, length = segment["byterange"] or (0, None)
+    if length is not None:
+        return {"Range": f"bytes={start + have}-{start + length - 1}"}
+    if have:
+        return {"Range": f"bytes={have}-" + (f"{size - 1}" if size else "")}
+    return {}
+
+
+def fetch_segment_in_place(session, segment, store, on_bytes=None, resume=False, throttle=None):
+    """Download one segment into its region of the ``store`` and return its size.
+
+    Falls back to :func:`fetch_segment` when the size is not known up front.
+    With ``resume`` a segment interrupted earlier in this run continues with a
+    ``Range`` request.
+    """
+    key = segment["key"]
+    size = store.size(key)
+    have = store.written.get(key, 0) if resume and size is not None else 0
+    if size is not None and have >= size:
+        return size
+
+    with session.get(segment["uri"], headers=segment_range(segment, have, size), stream=True,
+                     timeout=(10, 60)) as response:
+        response.raise_for_status()
+        if have and response.status_code != 206:
+            have = 0
+        size = in_place_size(response.headers, have, (segment["byterange"] or (0, None))[1])
+        if size is None:
+            path = store.path(segment)
+            size = save_response(response, path + ".part", 0, on_bytes, throttle)
+            os.replace(path + ".part", path)
+            return size
+
+        store.reserve(key, size)
+        position = have
+        with store.buffer() as buffer:
+            while position < size:
+                try:
+                    count = response.raw.readinto(buffer[:min(len(buffer), size - position)])
+                except urllib3.exceptions.HTTPError as e:
+                    raise requests.ConnectionError(e)
+                if not count:
+                    break
+                store.write(key, position, buffer[:count])
+                position += count
+                if on_bytes:
+                    on_bytes(count)
+                if throttle:
+                    throttle.consume(count)
+    if position < size:
+        raise requests.exceptions.ChunkedEncodingError(f"Segment {key} ended after {position} of {size} bytes")
+    return size
+
+
+def fetch_segment(session, segment, path, on_bytes=None, resume=False, throttle=None, hosts=None, store=None):
+    """Download one segment (or byte range) to ``path`` and return its size.
+
+    Data is written to ``path + ".part"`` and renamed once complete. With
+    ``resume`` an existing partial file is continued with a ``Range`` request.
+    Reads are paced by the ``throttle`` share and the connection is counted
+    against the ``hosts`` limiter, when given. With a :class:`SegmentStore`
+    the segment is assembled in place instead, where possible.
+    """
+    if hosts:
+        with hosts.slot(segment["uri"]):
+            return fetch_segment(session, segment, path, on_bytes, resume, throttle, store=store)
+    if store is not None and store.in_place:
+        return fetch_segment_in_place(session, segment, store, on_bytes, resume, throttle)
+
+    part_path = path + ".part"
+    have = os.path.getsize(part_path) if resume and os.path.exists(part_path) else 0
+    start, length = segment["byterange"] or (0, None)
+    headers = {}
+    if length is not None:
+        if have >= length:
+            os.replace(part_path, path)
+            return length
+        headers["Range"] = f"bytes={start + have}-{start + length - 1}"
+    elif have:
+        headers["Range"] = f"bytes={have}-"
+
+    with session.get(segment["uri"], headers=headers, stream=True, timeout=(10, 60)) as response:
+        if response.status_code == 416 and have:
+            # The partial file already holds the whole resource.
+            os.replace(part_path, path)
+            return have
+        response.raise_for_status()
+        if have and response.status_code != 206:
+            have = 0
+        size = save_response(response, part_path, have, on_bytes, throttle)
+    os.replace(part_path, path)
+    return size
+
+
+def save_response(response, part_path, have=0, on_bytes=None, throttle=None):
+    """Append a streamed response body to the ``have`` bytes already in ``part_path``."""
+    size = have
+    with open(part_path, "ab" if have else "wb") as f:
+        for chunk in response.iter_content(64 * 1024):
+            f.write(chunk)
+            size += len(chunk)
+            if on_bytes:
+                on_bytes(len(chunk))
+            if throttle:
+                throttle.consume(len(chunk))
+    return size
+
+
+def write_local_playlist(playlist, parts_dir, name="local.m3u8", extents=None):
+    """Write an m3u8 that points ffmpeg at the downloaded segment files.
+
+    Segments with an entry in ``extents`` are addressed by byte range within
+    the track file they were assembled into.
+    """
+    extents = extents or {}
+    target = max([playlist["target_duration"]] + [s["duration"] for s in playlist["segments"]])
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:7",
+        f"#EXT-X-TARGETDURATION:{int(target + 0.999)}",
+        f"#EXT-X-MEDIA-SEQUENCE:{playlist['media_sequence']}",
+        "#EXT-X-PLAYLIST-TYPE:VOD",
+    ]
+    init = playlist["init"]
+    if init and init["key"] in extents:
+        offset, size = extents[init["key"]]
+        lines.append(f'#EXT-X-MAP:URI="{track_filename(init["key"])}",BYTERANGE="{size}@{offset}"')
+    elif init:
+        lines.append(f'#EXT-X-MAP:URI="{segment_filename(init)}"')
+    key_line = None
+    for segment in playlist["segments"]:
+        if segment["key_line"] != key_line:
+            key_line = segment["key_line"]
+            lines.append(key_line or "#EXT-X-KEY:METHOD=NONE")
+        lines.append(f"#EXTINF:{segment['duration']:.6f},")
+        if segment["key"] in extents:
+            offset, size = extents[segment["key"]]
+            lines.append(f"#EXT-X-BYTERANGE:{size}@{offset}")
+            lines.append(track_filename(segment["key"]))
+        else:
+            lines.append(segment_filename(segment))
+    lines.append("#EXT-X-ENDLIST")
+
+    path = os.path.join(parts_dir, name)
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+def write_local_playlists(playlist, parts_dir, extents=None):
+    """Write local playlists for the main track and any separate audio track."""
+    paths = [write_local_playlist(playlist, parts_dir, extents=extents)]
+    if playlist.get("audio"):
+        paths.append(write_local_playlist(playlist["audio"], parts_dir, "local_audio.m3u8", extents))
+    return paths
+
+
+def stream_maps(inputs, audio_only=False):
+    """ffmpeg ``-map`` options for a main input plus an optional audio input."""
+    if audio_only:
+        return ["-map", "0:a", "-vn"]
+    if inputs > 1:
+        return ["-map", "0:v", "-map", "1:a"]
+    return []
+
+
+def remux_command(ffmpeg_path, playlist_paths, output_file, audio_only=False, seeks=None, duration=0):
+    """ffmpeg command that stream-copies local segment playlists into one file.
+
+    With ``seeks`` (one offset per playlist) and ``duration`` the output is
+    trimmed precisely, re-encoding only the clip.
+    """
+    command = [ffmpeg_path, "-v", "error"]
+    for index, path in enumerate(playlist_paths):
+        command += ["-allowed_extensions", "ALL", "-protocol_whitelist", "file,crypto,data,http,https,tcp,tls"]
+        if seeks:
+            command += ["-ss", f"{seeks[index]:.3f}"]
+        command += ["-i", path]
+    return command + output_args(len(playlist_paths), output_file, audio_only, duration, bool(seeks))
+
+
+def remux_segments(ffmpeg_path, playlist_paths, output_file, audio_only=False, seeks=None, duration=0):
+    """Stream-copy the local segment playlists into ``output_file``."""
+    result = subprocess.run(remux_command(ffmpeg_path, playlist_paths, output_file, audio_only, seeks, duration),
+                            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, universal_newlines=True)
+    return result.returncode
+
+
+class SegmentProgress:
+    """Bookkeeping shared by the segment engines.
+
+    Tracks bytes and segments completed, checkpoints the resume manifest at
+    most once a second, and turns the counters into the same stats dict as
+    :func:`make_ffmpeg_reporter`, throttled to the panel refresh rate.
+    """
+
+    def __init__(self, output_file, playlist, completed, on_progress=None, refresh_per_second=4,
+                 throttle=None, extents=None):
+        self.output_file = output_file
+        self.throttle = throttle
+        self.extents = extents
+        self.playlist = playlist
+        self.completed = completed
+        self.on_progress = on_progress
+        self.min_interval = 1.0 / refresh_per_second
+        self.lock = threading.Lock()
+
+        segments = playlist_segments(playlist)
+        self.tracks = len(playlist_tracks(playlist))
+        self.total_segments = len(segments)
+        self.playlist_duration = sum(s["duration"] for s in segments)
+        self.resumed_media = sum(s["duration"] for s in segments if s["key"] in completed)
+        self.segments = sum(1 for s in segments if s["key"] in completed)
+        self.media = self.resumed_media
+        self.bytes = 0
+
+        self.start_time = time_module.time()
+        self._last_bytes = 0
+        self._last_time = self.start_time
+        self._last_emit = 0.0
+        self._saved_at = 0.0
+        self._dl_speed = "--"
+
+    def pending(self):
+        """Segments not yet recorded as completed."""
+        return [s for s in playlist_segments(self.playlist) if s["key"] not in self.completed]
+
+    def add_bytes(self, count):
+        with self.lock:
+            self.bytes += count
+
+    def segment_done(self, segment, size):
+        with self.lock:
+            self.completed[segment["key"]] = size
+            self.segments += 1
+            self.media += segment["duration"]
+            self._checkpoint()
+        self.report(final=self.segments == self.total_segments)
+
+    def checkpoint(self):
+        with self.lock:
+            self._checkpoint(force=True)
+
+    def _checkpoint(self, force=False):
+        # Called with ``lock`` held; throttled so long playlists stay cheap.
+        now = time_module.time()
+        if force or now - self._saved_at >= 1.0:
+            save_manifest(self.output_file, self.playlist, self.completed, self.extents)
+            self._saved_at = now
+
+    def report(self, final=False):
+        if not self.on_progress:
+            return
+        now = time_module.time()
+        elapsed = now - self.start_time
+        with self.lock:
+            if not final and now - self._last_emit < self.min_interval:
+                return
+            self._last_emit = now
+            dt = now - self._last_time
+            if dt >= 0.5:
+                self._dl_speed = format_rate((self.bytes - self._last_bytes) / 1024 / dt)
+                self._last_bytes = self.bytes
+                self._last_time = now
+            done, media, dl_speed = self.segments, self.media, self._dl_speed
+
+        if self.playlist_duration:
+            pct = media / self.playlist_duration * 100
+        else:
+            pct = done / self.total_segments * 100
+        rate = (media - self.resumed_media) / elapsed if elapsed > 0 else 0
+        eta = format_time_short((self.playlist_duration - media) / rate) if rate > 0 else "--:--"
+        # A separate audio track adds media time without adding playback time.
+        speed = rate / self.tracks
+        self.on_progress({
+            "pct": pct,
+            "elapsed": format_time_short(elapsed),
+            "speed": f"{speed:.1f}x" if speed else "--.-x",
+            "eta": eta,
+            "current_time": str(done),
+            "total_time": f"{self.total_segments} seg",
+            "dl_speed": dl_speed,
+            "share": f"{self.throttle.fraction * 100:.0f}%" if self.throttle else "--",
+        })
+
+
+def prepare_parts_dir(output_file, playlist, resume):
+    """Create the staging directory and return ``(store, completed)``."""
+    parts_dir = output_file + ".parts"
+    if not resume:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+    os.makedirs(parts_dir, exist_ok=True)
+    completed, extents = load_manifest(output_file, playlist, parts_dir) if resume else ({}, {})
+    return SegmentStore(parts_dir, extents), completed
+
+
+def cleanup_parts(output_file):
+    """Remove the staging directory and manifest after a successful remux."""
+    shutil.rmtree(output_file + ".parts", ignore_errors=True)
+    try:
+        os.remove(manifest_path(output_file))
+    except OSError:
+        pass
+
+
+def run_native(ffmpeg_path, source_url, output_file, total_duration, on_progress=None,
+               session=None, workers=8, resume=False, playlist=None, throttle=None, hosts=None,
+               retry=None, on_retry=None, adaptive=True, selection=None, clip=None):
+    """Fetch HLS segments in parallel, then remux them locally with ffmpeg.
+
+    Reports the same stats dict as :func:`run_ffmpeg`, driven by bytes and
+    segments completed. With ``resume`` the staged segments and manifest of an
+    earlier run are reused so only missing data is fetched. A ``playlist``
+    already parsed while resolving the duration is reused instead of being
+    fetched again. ``throttle`` and ``hosts`` pace reads and cap connections
+    per host (see :class:`BandwidthScheduler` and :class:`HostLimiter`); the
+    bandwidth share is released before the remux. Failed fetches are retried
+    under ``retry`` and up to ``workers`` segments are fetched at once, as
+    decided by :class:`AdaptiveConcurrency`. ``selection`` picks the renditions
+    of a master playlist (see :func:`fetch_media_playlist`); a separate audio
+    track is fetched alongside the video and muxed in. With a ``(start, end)``
+    ``clip`` only the overlapping segments are fetched and the remux trims
+    them precisely. Returns a ``(returncode, elapsed_seconds)`` tuple.
+    """
+    own_session = session is None
+    if own_session:
+        session = make_session(workers)
+    retry = retry or RetryPolicy(0)
+    start_time = time_module.time()
+
+    try:
+        if playlist is None:
+            playlist = retry.call(lambda attempt: fetch_media_playlist(session, source_url, selection), on_retry)
+        if clip:
+            playlist = clip_playlist(playlist, *clip)
+        store, completed = prepare_parts_dir(output_file, playlist, resume)
+        progress = SegmentProgress(output_file, playlist, completed, on_progress, throttle=throttle,
+                                   extents=store.extents)
+
+        concurrency = AdaptiveConcurrency(workers, adaptive=adaptive)
+
+        def on_segment_retry(attempt, error, delay):
+            concurrency.failure()
+            if on_retry:
+                on_retry(attempt, error, delay)
+
+        def fetch(segment):
+            started = time_module.monotonic()
+            # Retries continue the partial segment with a Range request.
+            size = retry.call(lambda attempt: fetch_segment(
+                session, segment, store.path(segment), progress.add_bytes, resume or attempt > 0, throttle, hosts,
+                store,
+            ), on_segment_retry)
+            concurrency.success(size, time_module.monotonic() - started)
+            return size
+
+        try:
+            for track in playlist_tracks(playlist):
+                init = track["init"]
+                if init and init["key"] not in completed:
+                    completed[init["key"]] = fetch(init)
+
+            progress.report(final=True)
+
+            pending = progress.pending()[::-1]
+            in_flight = {}
+            try:
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tldv-segment") as pool:
+                    while pending or in_flight:
+                        while pending and len(in_flight) < concurrency.limit:
+                            segment = pending.pop()
+                            in_flight[pool.submit(fetch, segment)] = segment
+                        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            segment = in_flight.pop(future)
+                            try:
+                                size = future.result()
+                            except Exception as e:
+                                for waiting in in_flight:
+                                    waiting.cancel()
+                                raise MeetingError("Download Error", f"Segment {segment['index']} failed: {e}")
+                            progress.segment_done(segment, size)
+            finally:
+                progress.checkpoint()
+                if throttle:
+                    throttle.release()
+        finally:
+            store.close()
+
+        local_playlists = write_local_playlists(playlist, store.parts_dir, store.extents)
+        returncode = remux_segments(ffmpeg_path, local_playlists, output_file, playlist["audio_only"],
+                                    clip_seeks(playlist, clip), clip_length(clip))
+        if returncode == 0:
+            cleanup_parts(output_file)
+    finally:
+        if own_session:
+            session.close()
+
+    return returncode, time_module.time() - start_time
+
+
+def run_download(config, source_url, output_file, total_duration, on_progress=None, session=None,
+                 playlist=None, on_retry=None):
+    """Download ``source_url`` with the engine selected in ``config``.
+
+    A failed ffmpeg stream copy is restarted under the configured retry
+    policy; the segment engines retry individual segments instead. With a
+    ``sink`` configured the output is streamed there (see :func:`stream_download`).
+    """
+    if config.get("sink"):
+        return stream_download(config, source_url, output_file, total_duration, on_progress, session, playlist,
+                               on_retry)
+    if config.get("engine") == "async":
+        return run_coroutine(async_run_download(
+            config, source_url, output_file, total_duration, on_progress, playlist=playlist, on_retry=on_retry,
+        ))
+    if config.get("engine") == "native":
+        throttle = bandwidth_share(config)
+        try:
+            return run_native(
+                config["ffmpeg"], source_url, output_file, total_duration, on_progress,
+                session=session, workers=config["segment_workers"], resume=config.get("resume", False),
+                playlist=playlist, throttle=throttle, hosts=config.get("hosts"),
+                retry=retry_policy(config), on_retry=on_retry, adaptive=config.get("adaptive", True),
+                selection=playlist_selection(config), clip=config.get("clip"),
+            )
+        finally:
+            if throttle:
+                throttle.release()
+
+    retry = retry_policy(config)
+    selection = playlist_selection(config)
+    if playlist is None and any(selection.values()) and urlparse(source_url).path.endswith(".m3u8"):
+        # Resolve the renditions here so ffmpeg only reads the ones we want.
+        playlist = retry.call(
+            lambda attempt: fetch_media_playlist(session or requests, source_url, selection), on_retry)
+    total_elapsed = 0.0
+    for attempt in range(retry.retries + 1):
+        stderr_tail = []
+        returncode, elapsed = run_ffmpeg(
+            config["ffmpeg"], source_url, output_file, total_duration, on_progress,
+            playlist=playlist, audio_only=config.get("audio_only", False), clip=config.get("clip"),
+            stderr_tail=stderr_tail,
+        )
+        total_elapsed += elapsed
+        if returncode == 0 or attempt == retry.retries:
+            break
+        error = FFmpegError(returncode, stderr_tail)
+        if not is_retryable(error):
+            # 403/404, unsupported input, bad output path: another run fails the same way.
+            break
+        delay = retry.delay(attempt)
+        if on_retry:
+            on_retry(attempt, error, delay)
+        time_module.sleep(delay)
+    return returncode, total_elapsed
+
+
+def download_video(config, source_url, output_file, total_duration, session=None, playlist=None,
+                   on_retry=None):
+    """Download video with a rich live progress panel (progress lines when headless)."""
+    total_time_str = format_time_short(total_duration) if total_duration > 0 else "?"
+    if headless():
+        progress = ProgressLines("download", config.get("progress_interval", 10))
+        returncode, elapsed = run_download(
+            config, source_url, output_file, total_duration, progress, session, playlist, on_retry,
+        )
+        if returncode == 0:
+            progress({
+                "pct": 100.0, "elapsed": format_time_short(elapsed), "speed": "---", "eta": "00:00",
+                "current_time": total_time_str, "total_time": total_time_str,
+                "dl_speed": "streamed" if config.get("sink") else average_rate(output_file, elapsed),
+            }, final=True)
+        return returncode
+
+    panel = make_progress_panel(0, "00:00", "--.-x", "--:--", "00:00", total_time_str)
+
+    with Live(panel, console=console, refresh_per_second=4, transient=True) as live:
+        def on_progress(stats):
+            live.update(make_progress_panel(
+                stats["pct"], stats["elapsed"], stats["speed"], stats["eta"],
+                stats["current_time"], stats["total_time"], dl_speed=stats["dl_speed"]
+            ))
+
+        returncode, elapsed = run_download(
+            config, source_url, output_file, total_duration, on_progress, session, playlist, on_retry,
+        )
+
+        panel = make_progress_panel(
+            100, format_time_short(elapsed), "---", "00:00",
+            total_time_str, total_time_str, finished=True,
+            dl_speed="streamed" if config.get("sink") else average_rate(output_file, elapsed),
+        )
+        live.update(panel)
+        time_module.sleep(1)
+
+    return returncode
+
+
+# ── Headless output ───────────────────────────────────────────────────────────
+
+_MARKUP_RE = re.compile(r"\[[a-z#/@][^\[\]]*\]")
+_TREE_CHARS = " \u2502\u251c\u2514\u2500"
+
+
+def strip_markup(text):
+    """Drop rich markup tags, keeping the text."""
+    return _MARKUP_RE.sub("", text)
+
+
+class PlainConsole:
+    """Console for ``--headless`` runs: plain lines or JSON events, without rich.
+
+    Strings are printed with their markup removed and the step-tree
+    decoration trimmed; blank spacer lines are dropped. Anything else (a
+    panel or table from a command without a headless layout) is rendered
+    without colour by a rich console, imported only then.
+    """
+
+    def __init__(self, json_events=False):
+        self.json_events = json_events
+        self.stderr = False
+        self.lock = threading.Lock()
+        self._rich = None
+
+    def print(self, *objects, **kwargs):
+        if all(isinstance(o, str) for o in objects):
+            text = strip_markup(" ".join(objects)).strip(_TREE_CHARS)
+        else:
+            if self._rich is None:
+                self._rich = import_module("rich.console").Console(color_system=None, width=100)
+            with self._rich.capture() as capture:
+                self._rich.print(*objects)
+            text = capture.get().rstrip()
+        if text:
+            self.event("log", text, message=text)
+
+    def event(self, kind, text, **fields):
+        """Print ``text``, or ``fields`` as one JSON object with ``--progress-format json``."""
+        if self.json_events:
+            text = json.dumps(dict(event=kind, time=datetime.now().isoformat(timespec="seconds"), **fields))
+        with self.lock:
+            print(text, file=sys.stderr if self.stderr else sys.stdout, flush=True)
+
+    @contextmanager
+    def status(self, *args, **kwargs):
+        yield
+
+    def clear(self):
+        pass
+
+
+def enable_headless(json_events=False):
+    """Replace the rich console with a :class:`PlainConsole`."""
+    global console
+    console = PlainConsole(json_events)
+
+
+def headless():
+    """True once :func:`enable_headless` has replaced the rich console."""
+    return isinstance(console, PlainConsole)
+
+
+class ProgressLines:
+    """Headless ``on_progress`` callback printing at most one line per ``interval`` seconds."""
+
+    def __init__(self, name, interval=10.0):
+        self.name = name
+        self.interval = interval
+        self.next_at = 0.0
+
+    def __call__(self, stats, final=False):
+        now = time_module.monotonic()
+        if not final and now < self.next_at:
+            return
+        self.next_at = now + self.interval
+        console.event(
+            "progress",
+            f"{self.name}  {stats['pct']:5.1f}%  {stats['current_time']}/{stats['total_time']}  "
+            f"{stats['speed']}  {stats['dl_speed']}  elapsed {stats['elapsed']}  eta {stats['eta']}",
+            name=self.name, pct=round(stats["pct"], 1), position=stats["current_time"],
+            total=stats["total_time"], speed=stats["speed"], rate=stats["dl_speed"],
+            elapsed=stats["elapsed"], eta=stats["eta"], done=final,
+        )
+
+
+class BatchLines:
+    """Headless stand-in for the batch dashboard.
+
+    Prints each job as it finishes and, every ``interval`` seconds, one line
+    summarising the jobs still in progress.
+    """
+
+    def __init__(self, jobs, interval=10.0):
+        self.jobs = jobs
+        self.interval = interval
+        self.reported = set()
+        self.next_at = time_module.monotonic() + interval
+        self.start_time = time_module.time()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.update(time_module.time() - self.start_time)
+
+    def update(self, elapsed):
+        for index, job in enumerate(self.jobs):
+            if job["status"] not in ("done", "failed") or index in self.reported:
+                continue
+            self.reported.add(index)
+            if job["status"] == "done":
+                result = "already saved" if job["skipped"] else "done"
+            else:
+                result = f"failed: {job['error']}"
+            label = job["meeting_id"] if job["name"] == job["meeting_id"] else f"{job['meeting_id']}  {job['name']}"
+            console.event("job", f"{label}  {result}",
+                          meeting_id=job["meeting_id"], name=job["name"], status=job["status"],
+                          error=job["error"], size=job["size"], skipped=job["skipped"])
+
+        now = time_module.monotonic()
+        if now < self.next_at or len(self.reported) == len(self.jobs):
+            return
+        self.next_at = now + self.interval
+        active = [job for job in self.jobs if job["status"] not in ("queued", "done", "failed")]
+        console.event(
+            "batch",
+            f"{len(self.reported)}/{len(self.jobs)} finished  elapsed {format_time_short(elapsed)}" + "".join(
+                f"  |  {job['meeting_id']} {job['status']} {job['pct']:.0f}% {job['dl_speed']}" for job in active),
+            finished=len(self.reported), total=len(self.jobs), elapsed=round(elapsed, 1),
+            active=[{"meeting_id": job["meeting_id"], "status": job["status"], "pct": round(job["pct"], 1),
+                     "rate": job["dl_speed"], "eta": job["eta"]} for job in active],
+        )
+
+
+# ── Step indicators ───────────────────────────────────────────────────────────
+
+
+def step(number, total, msg, style="green"):
+    console.print(f"  [{style}]\u2502[/{style}]")
+    console.print(f"  [{style}]\u251c\u2500[/{style}] [{style}]Step {number}/{total}[/{style}] {msg}")
+
+
+def step_done(msg):
+    console.print(f"  [green]\u2502[/green]  [green]\u2714[/green] {msg}")
+
+
+def step_warn(msg):
+    console.print(f"  [yellow]\u2502[/yellow]  [yellow]\u26a0[/yellow] {msg}")
+
+
+# ── Configuration helpers ─────────────────────────────────────────────────────
+
+
+def extract_meeting_id(url):
+    """Extract the meeting ID from a TLDV meeting URL."""
+    if url.startswith("http"):
+        return url.rstrip("/").split("/")[-1]
+    return url.strip()
+
+
+def find_ffmpeg():
+    """Locate ffmpeg and ffprobe on the system."""
+    ffmpeg_path = shutil.which("ffmpeg")
+    if not ffmpeg_path:
+        common_paths = []
+        if sys.platform == "win32":
+            common_paths = [
+                os.path.expandvars(r"%LOCALAPPDATA%\Programs\ffmpeg\bin\ffmpeg.exe"),
+                os.path.expandvars(r"%ProgramFiles%\ffmpeg\bin\ffmpeg.exe"),
+                os.path.expandvars(r"%ProgramFiles(x86)%\ffmpeg\bin\ffmpeg.exe"),
+            ]
+        else:
+            common_paths = [
+                "/usr/local/bin/ffmpeg",
+                "/usr/bin/ffmpeg",
+                "/opt/homebrew/bin/ffmpeg",
+            ]
+        for path in common_paths:
+            if os.path.isfile(path):
+                ffmpeg_path = path
+                break
+
+    if not ffmpeg_path:
+        return None, None
+
+    ffprobe_path = shutil.which("ffprobe")
+    if not ffprobe_path:
+        ffmpeg_dir = os.path.dirname(ffmpeg_path)
+        ext = ".exe" if sys.platform == "win32" else ""
+        candidate = os.path.join(ffmpeg_dir, f"ffprobe{ext}")
+        ffprobe_path = candidate if os.path.isfile(candidate) else None
+
+    return ffmpeg_path, ffprobe_path
+
+
+# ── Banner & UI ───────────────────────────────────────────────────────────────
+
+
+def show_banner():
+    """Display the application banner."""
+    console.clear()
+    console.print()
+    for line in _LOGO:
+        console.print(f"  [bold cyan]{line}[/bold cyan]")
+    console.print()
+    console.print(f"  [dim]Video Downloader v{VERSION}[/dim]")
+    console.print(f"  [dim]     By[/dim] [bold cyan]Aliza Ali[/bold cyan]")
+    console.print()
+    console.print(Rule(style="cyan"))
+    console.print()
+
+
+def show_error(title, message, detail=""):
+    """Print a red error panel."""
+    if headless():
+        console.event("error", f"{title}: {message}" + (f" ({detail})" if detail else ""),
+                      title=title, message=message, detail=detail)
+        return
+    body = f"[bold red]{message}[/bold red]"
+    if detail:
+        body += f"\n\n[dim]{detail}[/dim]"
+    console.print()
+    console.print(Panel(
+        body,
+        border_style="red", box=box.HEAVY,
+        title=f"[bold red] {title} [/bold red]", title_align="left",
+    ))
+
+
+def show_complete(config, files):
+    """Print the success panel listing ``(type_markup, path)`` output files."""
+    if headless():
+        saved = [{"type": strip_markup(kind), "path": path, "size": os.path.getsize(path)} for kind, path in files]
+        console.event("complete", "\n".join(f"saved  {f['type']}  {f['path']}" for f in saved), files=saved)
+        return
+    files_table = Table(box=None, show_header=True, show_edge=False, padding=(0, 2), expand=True)
+    files_table.add_column("Type", style="dim", width=12, header_style="dim bold")
+    files_table.add_column("File", style="bold white", header_style="dim bold")
+    files_table.add_column("Size", style="dim", justify="right", header_style="dim bold")
+
+    for kind, path in files:
+        size = os.path.getsize(path)
+        size_str = f"{size / (1024 * 1024):.1f} MB" if size >= 1024 * 1024 else f"{size / 1024:.0f} KB"
+        files_table.add_row(kind, os.path.basename(path), size_str)
+
+    console.print()
+    console.print(Panel(
+        Group(
+            Text(""),
+            Text.from_markup("  [bold green]\u2714 All tasks completed successfully![/bold green]"),
+            Text(""),
+            files_table,
+            Text(""),
+        ),
+        border_style="green", box=box.HEAVY,
+        title="[bold green] Download Complete [/bold green]",
+        title_align="left",
+        subtitle=f"[dim]Files saved to {os.path.abspath(config['output_dir'])}[/dim]",
+        subtitle_align="right",
+        padding=(0, 1),
+    ))
+    console.print()
+
+
+def format_bitrate(bits_per_second):
+    """Human-readable bitrate for a playlist ``BANDWIDTH`` value."""
+    if bits_per_second >= 1000000:
+        return f"{bits_per_second / 1000000:.1f} Mb/s"
+    return f"{bits_per_second / 1000:.0f} kb/s"
+
+
+def show_variants(meeting, master, selection):
+    """Print the variants and audio renditions of ``master``, marking what would be fetched."""
+    parts = [Text("")]
+    if not master or not master["variants"]:
+        parts.append(Text.from_markup("  [dim]Single rendition \u2014 nothing to choose from.[/dim]"))
+    else:
+        _, primary_uri, audio_uri = plan_media_playlists(master, selection)
+        chosen = {primary_uri, audio_uri}
+        mark = "[bold green]\u25b6[/bold green]"
+
+        variants = Table(box=box.SIMPLE_HEAD, show_edge=False, padding=(0, 1), expand=True)
+        variants.add_column("", width=1)
+        variants.add_column("#", style="dim", justify="right", header_style="dim bold")
+        variants.add_column("Resolution", style="bold white", header_style="dim bold")
+        variants.add_column("Bandwidth", justify="right", header_style="dim bold")
+        variants.add_column("Codecs", style="dim", header_style="dim bold")
+        variants.add_column("Audio", style="dim", header_style="dim bold")
+        for variant in master["variants"]:
+            variants.add_row(
+                mark if variant["uri"] in chosen else "",
+                str(variant["index"]),
+                variant.get("RESOLUTION") or ("audio only" if is_audio_variant(variant) else "?"),
+                format_bitrate(variant_bandwidth(variant)),
+                variant.get("CODECS", ""),
+                variant.get("AUDIO", "muxed"),
+            )
+        parts.append(variants)
+
+        audio = [r for r in master["renditions"] if r.get("TYPE") == "AUDIO"]
+        if audio:
+            renditions = Table(box=box.SIMPLE_HEAD, show_edge=False, padding=(0, 1), expand=True)
+            renditions.add_column("", width=1)
+            renditions.add_column("Group", style="bold white", header_style="dim bold")
+            renditions.add_column("Name", header_style="dim bold")
+            renditions.add_column("Language", style="dim", header_style="dim bold")
+            renditions.add_column("Default", style="dim", header_style="dim bold")
+            for rendition in audio:
+                renditions.add_row(
+                    mark if rendition.get("uri") in chosen else "",
+                    rendition.get("GROUP-ID", ""),
+                    rendition.get("NAME", ""),
+                    rendition.get("LANGUAGE", ""),
+                    "yes" if rendition.get("DEFAULT") == "YES" else "",
+                )
+            parts.append(renditions)
+    parts.append(Text(""))
+
+    console.print(Panel(
+        Group(*parts),
+        border_style="bright_blue", box=box.HEAVY,
+        title=f"[bold bright_blue] {meeting['name']} [/bold bright_blue]",
+        title_align="left",
+        subtitle=f"[dim]{meeting['meeting_id']}[/dim]",
+        subtitle_align="right",
+        padding=(0, 1),
+    ))
+    console.print()
+
+
+# ── Transcript export ─────────────────────────────────────────────────────────
+
+TRANSCRIPT_SUFFIXES = {
+    "txt": "_transcript.txt",
+    "srt": ".srt",
+    "vtt": ".vtt",
+    "jsonl": "_transcript.jsonl",
+}
+
+
+def timestamp_seconds(value):
+    """Convert a transcript ``{"seconds", "nanos"}`` timestamp to float seconds."""
+    if isinstance(value, dict):
+        return int(value.get("seconds") or 0) + int(value.get("nanos") or 0) / 1e9
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def iter_transcript_cues(transcript_data):
+    """Yield ``(start, end, speaker, text)`` for each transcript segment.
+
+    Cue ends come from the last word's ``endTime``; when it is missing the
+    next segment's start is used, so only one cue is ever held back.
+    """
+    pending = None
+    for segment in transcript_data:
+        if not segment:
+            continue
+        first_word = segment[0]
+        last_word = segment[-1]
+        start = timestamp_seconds(first_word.get("startTime"))
+        end = timestamp_seconds(last_word.get("endTime")) if last_word.get("endTime") else None
+        speaker = first_word.get("speaker", "Unknown")
+        text = " ".join(word.get("word", "") for word in segment)
+
+        if pending:
+            if pending[1] is None:
+                pending = (pending[0], max(start, pending[0]), pending[2], pending[3])
+            yield pending
+        pending = (start, end, speaker, text)
+
+    if pending:
+        if pending[1] is None:
+            pending = (pending[0], pending[0] + 1.0, pending[2], pending[3])
+        yield pending
+
+
+def clip_cues(cues, start, end=None):
+    """Keep the cues overlapping ``[start, end)``, re-timed to the clip's timeline."""
+    for cue_start, cue_end, speaker, text in cues:
+        if cue_end <= start or (end is not None and cue_start >= end):
+            continue
+        cue_end = cue_end if end is None else min(cue_end, end)
+        yield max(cue_start, start) - start, cue_end - start, speaker, text
+
+
+def _cue_clock(seconds, separator):
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+
+def _format_txt(index, start, end, speaker, text, meeting_id):
+    return f"[{format_time_short(start)}] {speaker}: {text}\n"
+
+
+def _format_srt(index, start, end, speaker, text, meeting_id):
+    return f"{index}\n{_cue_clock(start, ',')} --> {_cue_clock(end, ',')}\n{speaker}: {text}\n\n"
+
+
+def _vtt_escape(value):
+    return value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _format_vtt(index, start, end, speaker, text, meeting_id):
+    # A voice annotation ends at the first newline, and a blank line ends the cue.
+    speaker = _vtt_escape(" ".join(speaker.split()))
+    text = "\n".join(line for line in _vtt_escape(text).splitlines() if line.strip())
+    return f"{_cue_clock(start, '.')} --> {_cue_clock(end, '.')}\n<v {speaker}>{text}\n\n"
+
+
+def _format_jsonl(index, start, end, speaker, text, meeting_id):
+    record = {"meeting_id": meeting_id, "index": index, "start": round(start, 3),
+              "end": round(end, 3), "speaker": speaker, "text": text}
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+_TRANSCRIPT_WRITERS = {
+    "txt": ("", _format_txt),
+    "srt": ("", _format_srt),
+    "vtt": ("WEBVTT\n\n", _format_vtt),
+    "jsonl": ("", _format_jsonl),
+}
+
+
+def export_transcript(transcript_data, outputs, meeting_id=None, clip=None):
+    """Stream transcript cues to every requested format in a single pass.
+
+    ``outputs`` maps a format name (``txt``, ``srt``, ``vtt``, ``jsonl``) to
+    its output path. With a ``(start, end)`` clip only the matching slice is
+    written, timed from the start of the clip. Returns the number of cues written.
+    """
+    files = []
+    try:
+        for fmt, path in outputs.items():
+            header, formatter = _TRANSCRIPT_WRITERS[fmt]
+            f = open(path, "w", encoding="utf-8", newline="\n")
+            files.append((f, formatter))
+            if header:
+                f.write(header)
+
+        cues = iter_transcript_cues(transcript_data)
+        if clip:
+            cues = clip_cues(cues, *clip)
+        count = 0
+        for count, (start, end, speaker, text) in enumerate(cues, 1):
+            for f, formatter in files:
+                f.write(formatter(count, start, end, speaker, text, meeting_id))
+        return count
+    finally:
+        for f, _ in files:
+            f.close()
+
+
+# ── Metadata cache ────────────────────────────────────────────────────────────
+
+
+def default_cache_dir():
+    """Per-user cache directory for watch-page responses."""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(base, "tldv", "cache")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "tldv")
+
+
+class MetadataCache:
+    """On-disk cache of watch-page responses keyed by meeting ID and token.
+
+    Each entry stores the response body, the fetch time and any HTTP
+    validators. Entries older than ``ttl`` seconds are stale and revalidated;
+    once the cache grows past ``max_bytes`` the least recently used entries
+    are evicted. Responses carry signed URLs, so the cache is private to the
+    user (a ``0700`` directory of ``0600`` files) and one token never reads
+    another token's entries.
+    """
+
+    def __init__(self, directory, ttl=3600, max_bytes=50 * 1024 * 1024):
+        self.directory = os.path.join(directory, "watch-page")
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        for path in (directory, self.directory):
+            os.makedirs(path, mode=0o700, exist_ok=True)
+        try:
+            os.chmod(self.directory, 0o700)
+        except OSError:
+            pass
+
+    def _path(self, meeting_id, token):
+        safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", meeting_id)
+        account = hashlib.sha256((token or "").encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.directory, f"{account}-{safe_id}.json")
+
+    def get(self, meeting_id, token):
+        """Return the entry cached for ``meeting_id`` under ``token``, or None."""
+        path = self._path(meeting_id, token)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)  # mtime doubles as the LRU access time
+        except OSError:
+            pass
+        return entry
+
+    def is_fresh(self, entry):
+        return time_module.time() - entry.get("fetched_at", 0) < self.ttl
+
+    def put(self, meeting_id, token, body, etag=None, last_modified=None):
+        """Store a response body and evict old entries if over budget."""
+        entry = {
+            "meeting_id": meeting_id,
+            "fetched_at": time_module.time(),
+            "etag": etag,
+            "last_modified": last_modified,
+            "body": body,
+        }
+        path = self._path(meeting_id, token)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        self.evict()
+        return entry
+
+    def touch(self, meeting_id, token, entry):
+        """Mark a revalidated (304) entry as freshly fetched."""
+        return self.put(meeting_id, token, entry["body"], entry.get("etag"), entry.get("last_modified"))
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits ``max_bytes``."""
+        files = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+
+        for _, size, name in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            total -= size
+
+
+# ── Meeting pipeline ──────────────────────────────────────────────────────────
+
+# Point the tool at another gateway (e.g. the offline stand-in in bench.py).
+API_BASE = os.environ.get("TLDV_API_BASE", "https://gw.tldv.io").rstrip("/")
+WATCH_PAGE_URL = API_BASE + "/v1/meetings/{meeting_id}/watch-page"
+
+
+class MeetingError(Exception):
+    """A meeting could not be fetched, saved or downloaded."""
+
+    def __init__(self, title, message, detail=""):
+        super().__init__(message)
+        self.title = title
+        self.message = message
+        self.detail = detail
+
+
+def make_session(pool_size=10):
+    """Create a requests session whose connection pool fits ``pool_size`` workers."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def auth_error():
+    """The error raised when the gateway rejects the bearer token."""
+    return MeetingError(
+        "Auth Error (401)", "Authentication failed!",
+        "Your token may be expired or invalid.\n"
+        "Get a fresh token from your browser developer tools (F12 → Network tab).",
+    )
+
+
+def watch_page_request(meeting_id, token, cache=None, refresh=False):
+    """Plan a watch-page fetch.
+
+    Returns ``(entry, headers)``: ``headers`` is None when the fresh cache
+    ``entry`` can be used as-is, otherwise the request headers to send,
+    including any ETag or Last-Modified validators.
+    """
+    entry = cache.get(meeting_id, token) if cache else None
+    if entry and not refresh and cache.is_fresh(entry):
+        return entry, None
+
+    headers = {"Authorization": token}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return entry, headers
+
+
+def watch_page_result(meeting_id, token, data, entry=None, cache=None):
+    """Turn a watch-page response into ``(body, from_cache)`` and update the cache."""
+    if data.status_code == 304 and entry:
+        cache.touch(meeting_id, token, entry)
+        return entry["body"], True
+    if data.status_code == 401:
+        raise auth_error()
+    if data.status_code == 404:
+        raise MeetingError(
+            "Not Found (404)", "Meeting not found!",
+            f"Meeting ID: {meeting_id}\n"
+            "Check that the URL is correct and you have access to this meeting.",
+        )
+    if data.status_code == 200 and cache:
+        cache.put(meeting_id, token, data.text, data.headers.get("ETag"), data.headers.get("Last-Modified"))
+    return data.text, False
+
+
+def fetch_watch_page(meeting_id, token, session=None, cache=None, refresh=False, retry=None, on_retry=None):
+    """Fetch the raw watch-page body for a meeting.
+
+    A fresh ``cache`` entry is returned without any network call unless
+    ``refresh`` is set; stale entries are revalidated with their ETag or
+    Last-Modified validators. Network errors, 429 and 5xx responses are
+    retried under ``retry``. Returns a ``(body, from_cache)`` tuple.
+    """
+    entry, headers = watch_page_request(meeting_id, token, cache, refresh)
+    if headers is None:
+        return entry["body"], True
+
+    http = session or requests
+
+    def attempt_fetch(attempt):
+        data = http.get(WATCH_PAGE_URL.format(meeting_id=meeting_id), headers=headers, timeout=(10, 60))
+        if data.status_code in RETRY_STATUSES:
+            data.raise_for_status()
+        return data
+
+    data = (retry or RetryPolicy(0)).call(attempt_fetch, on_retry)
+    return watch_page_result(meeting_id, token, data, entry, cache)
+
+
+def build_filename(name, created_at):
+    """Return the ``<date>_<name>`` file stem and the parsed creation date."""
+    date = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+    normalised_date = date.strftime("%Y-%m-%d-%H-%M-%S")
+    safe_name = re.sub(r'[<>:"/\\|?*]', '-', name)
+    return f"{normalised_date}_{safe_name}", date
+
+
+def media_extension(config):
+    """Output file extension: ``.ts`` when streaming MPEG-TS, ``.m4a`` with ``--audio-only``, else ``.mp4``."""
+    if config.get("sink") and config.get("stream_format") == "ts":
+        return ".ts"
+    return ".m4a" if config.get("audio_only") else ".mp4"
+
+
+def revalidate_cache(config):
+    """Whether a fresh cached watch-page response must still be revalidated.
+
+    Its video source is a signed URL that may have expired, so the cache is
+    only used as-is when no media download follows (transcript-only and
+    dry runs).
+    """
+    return config.get("refresh", False) or config.get("video", True)
+
+
+def prepare_meeting(meeting_id, config, session=None, on_retry=None):
+    """Fetch metadata for a meeting and resolve its output paths."""
+    raw, from_cache = fetch_watch_page(
+        meeting_id, config["token"], session, config.get("cache"), revalidate_cache(config),
+        retry_policy(config), on_retry,
+    )
+    return build_meeting(meeting_id, raw, from_cache, config)
+
+
+def build_meeting(meeting_id, raw, from_cache, config):
+    """Parse a watch-page body into the meeting dict used by the pipeline."""
+    try:
+        response = json.loads(raw)
+    except ValueError as e:
+        raise MeetingError("Error", str(e), raw[:300])
+
+    meeting = response.get("meeting", {})
+    name = meeting.get("name", "No name")
+    created_at = meeting.get("createdAt", datetime.now().isoformat())
+    source = response.get("video", {}).get("source", None)
+
+    if not source and config.get("video", True):
+        raise MeetingError(
+            "Error", "No video source found!",
+            "The meeting may still be processing or the video is unavailable.",
+        )
+
+    filename, date = build_filename(name, created_at)
+    filename += clip_suffix(config.get("clip"))
+    output_dir = config["output_dir"]
+    return {
+        "meeting_id": meeting_id,
+        "name": name,
+        "date": date,
+        "source": source,
+        "filename": filename,
+        "raw": raw,
+        "from_cache": from_cache,
+        "response": response,
+        "output_file": os.path.join(output_dir, filename + media_extension(config)),
+        "json_file": os.path.join(output_dir, f"{filename}.json"),
+        "transcript_files": [],
+        "clip": config.get("clip"),
+    }
+
+
+def save_meeting_files(meeting, config, metrics=None):
+    """Write the metadata JSON and transcript exports for a prepared meeting."""
+    with open(meeting["json_file"], "w") as f:
+        f.write(meeting["raw"])
+
+    transcript_data = meeting["response"].get("video", {}).get("transcript", {}).get("data", [])
+    if transcript_data:
+        outputs = {
+            fmt: os.path.join(config["output_dir"], meeting["filename"] + TRANSCRIPT_SUFFIXES[fmt])
+            for fmt in config.get("transcript_formats", ["txt"])
+        }
+        timed(metrics, "transcript", export_transcript, transcript_data, outputs, meeting["meeting_id"],
+              meeting.get("clip"))
+        meeting["transcript_files"] = list(outputs.values())
+    return meeting["transcript_files"]
+
+
+def list_variants(meeting_ids, config):
+    """Show the renditions behind each meeting's video source; returns the failure count."""
+    failures = 0
+    session = make_session()
+    try:
+        for meeting_id in meeting_ids:
+            try:
+                meeting = prepare_meeting(meeting_id, config, session)
+                source = meeting["source"]
+                master = fetch_playlist(session, source) if urlparse(source).path.endswith(".m3u8") else None
+            except MeetingError as e:
+                show_error(e.title, e.message, e.detail)
+                failures += 1
+                continue
+            except Exception as e:
+                show_error("Error", str(e) or type(e).__name__)
+                failures += 1
+                continue
+            show_variants(meeting, master, playlist_selection(config))
+    finally:
+        session.close()
+    return failures
+
+
+# ── Run metrics ───────────────────────────────────────────────────────────────
+
+_metrics_lock = threading.Lock()
+_metrics_warned = set()
+
+
+def new_metrics(meeting_id):
+    """Empty per-meeting metrics record; phase timings are in seconds."""
+    return {
+        "meeting_id": meeting_id,
+        "name": None,
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "finished_at": None,
+        "status": "running",
+        "error": None,
+        "metadata_source": None,
+        "duration_source": None,
+        "phases": {},
+        "bytes": 0,
+        "video_duration": 0.0,
+        "speed_factor": None,
+        "retries": 0,
+    }
+
+
+def timed(metrics, phase, func, *args, **kwargs):
+    """Call ``func`` and add its wall time to ``metrics["phases"][phase]``."""
+    if metrics is None:
+        return func(*args, **kwargs)
+    start = time_module.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        phases = metrics["phases"]
+        phases[phase] = round(phases.get(phase, 0.0) + time_module.perf_counter() - start, 6)
+
+
+def retry_counter(metrics):
+    """An ``on_retry`` callback counting retries into ``metrics``."""
+    def on_retry(attempt, error, delay):
+        with _metrics_lock:
+            metrics["retries"] += 1
+    return on_retry
+
+
+def finish_metrics(metrics, meeting=None, error=None):
+    """Fill in the outcome, output size and speed factor of a finished meeting."""
+    metrics["finished_at"] = datetime.now().isoformat(timespec="seconds")
+    metrics["status"] = "failed" if error else "done"
+    metrics["error"] = error
+    if not meeting:
+        return metrics
+
+    metrics["name"] = meeting["name"]
+    metrics["metadata_source"] = "cache" if meeting["from_cache"] else "network"
+    metrics["duration_source"] = meeting.get("duration_source")
+    metrics["video_duration"] = clip_length(meeting.get("clip"), meeting.get("duration") or 0.0)
+    download_time = metrics["phases"].get("download")
+    if download_time and not error and os.path.exists(meeting["output_file"]):
+        metrics["bytes"] = os.path.getsize(meeting["output_file"])
+        if metrics["video_duration"]:
+            # Seconds of video fetched per second of wall time, like ffmpeg's speed=.
+            metrics["speed_factor"] = round(metrics["video_duration"] / download_time, 3)
+    return metrics
+
+
+def record_metrics(config, metrics):
+    """Append one meeting's record to the ``--metrics-file`` JSON Lines file."""
+    if not config.get("metrics_file"):
+        return
+    with _metrics_lock:
+        try:
+            with open(config["metrics_file"], "a", encoding="utf-8") as f:
+                f.write(json.dumps(metrics, default=str) + "\n")
+        except OSError as e:
+            # Metrics are best effort: never fail or stall a download over them.
+            if config["metrics_file"] not in _metrics_warned:
+                _metrics_warned.add(config["metrics_file"])
+                step_warn(f"Could not write metrics file: {e}")
+
+
+def write_metrics_textfile(path, records, elapsed):
+    """Write run totals in Prometheus text format for node_exporter's textfile collector."""
+    statuses = {"done": 0, "failed": 0}
+    phases = {}
+    for record in records:
+        statuses[record["status"]] = statuses.get(record["status"], 0) + 1
+        for phase, seconds in record["phases"].items():
+            phases[phase] = phases.get(phase, 0.0) + seconds
+    video_seconds = sum(record["video_duration"] for record in records if record["bytes"])
+    download_seconds = sum(record["phases"].get("download", 0.0) for record in records if record["bytes"])
+
+    metrics = [
+        ("tldv_meetings", "Meetings processed in the last run, by result.",
+         [(f'{{status="{status}"}}', count) for status, count in sorted(statuses.items())]),
+        ("tldv_phase_seconds", "Wall time per phase, summed over the meetings of the last run.",
+         [(f'{{phase="{phase}"}}', seconds) for phase, seconds in sorted(phases.items())]),
+        ("tldv_download_bytes", "Bytes of video written in the last run.",
+         [("", sum(record["bytes"] for record in records))]),
+        ("tldv_video_seconds", "Seconds of video downloaded in the last run.", [("", video_seconds)]),
+        ("tldv_speed_factor", "Seconds of video downloaded per second of download time in the last run.",
+         [("", video_seconds / download_seconds if download_seconds else 0)]),
+        ("tldv_retries", "Requests retried in the last run.", [("", sum(record["retries"] for record in records))]),
+        ("tldv_run_seconds", "Wall time of the last run.", [("", elapsed)]),
+        ("tldv_last_run_timestamp_seconds", "Unix time the last run finished.", [("", time_module.time())]),
+    ]
+    lines = []
+    for name, help_text, samples in metrics:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(f"{name}{labels} {round(value, 6)}" for labels, value in samples)
+
+    # node_exporter may read at any moment, so never expose a half-written file.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+
+
+def publish_run_metrics(config, records, elapsed):
+    """Write the Prometheus textfile for a finished run, if one was requested."""
+    if config.get("metrics_textfile") and records:
+        try:
+            write_metrics_textfile(config["metrics_textfile"], records, elapsed)
+        except OSError as e:
+            step_warn(f"Could not write metrics textfile: {e}")
+
+
+# ── Integrity checks ──────────────────────────────────────────────────────────
+
+SAMPLE_BLOCKS = 16
+SAMPLE_BLOCK_SIZE = 64 * 1024
+DURATION_TOLERANCE = 2.0
+CLIP_SUFFIX_RE = re.compile(r"_clip-(\d+)-(\d{2})-(\d{2})-(?:(\d+)-(\d{2})-(\d{2})|end)$")
+
+
+def integrity_path(output_file):
+    return output_file + ".integrity"
+
+
+def find_box(f, start, end, box_type):
+    """``(payload_start, payload_end)`` of the first ``box_type`` box in ``[start, end)`` of an MP4 file."""
+    offset = start
+    while offset + 8 <= end:
+        f.seek(offset)
+        header = f.read(16)
+        if len(header) < 8:
+            return None
+        size, kind = struct.unpack(">I4s", header[:8])
+        header_size = 8
+        if size == 1 and len(header) == 16:
+            size, header_size = struct.unpack(">Q", header[8:])[0], 16
+        elif size == 0:
+            size = end - offset
+        if size < header_size:
+            return None
+        if kind == box_type:
+            return offset + header_size, min(offset + size, end)
+        offset += size
+    return None
+
+
+def mp4_duration(path):
+    """Duration in seconds from an MP4's ``moov/mvhd`` box, or None without one.
+
+    Only box headers are read, so this is instant where ffprobe would open
+    and probe the streams. ffmpeg writes ``moov`` last, so a file without it
+    is an interrupted download.
+    """
+    try:
+        with open(path, "rb") as f:
+            moov = find_box(f, 0, os.fstat(f.fileno()).st_size, b"moov")
+            mvhd = find_box(f, moov[0], moov[1], b"mvhd") if moov else None
+            if not mvhd:
+                return None
+            f.seek(mvhd[0])
+            data = f.read(32)
+    except OSError:
+        return None
+    if data[:1] == b"\x01" and len(data) >= 32:
+        timescale, duration = struct.unpack(">IQ", data[20:32])
+    elif len(data) >= 20:
+        timescale, duration = struct.unpack(">II", data[12:20])
+    else:
+        return None
+    return duration / timescale if timescale else None
+
+
+def sample_checksum(path, size=None):
+    """SHA-256 over the size and ``SAMPLE_BLOCKS`` evenly spaced blocks, first and last included.
+
+    About 1 MiB is read whatever the file size, which catches truncated and
+    overwritten files without hashing gigabytes.
+    """
+    size = os.path.getsize(path) if size is None else size
+    digest = hashlib.sha256(str(size).encode())
+    with open(path, "rb") as f:
+        if size <= SAMPLE_BLOCKS * SAMPLE_BLOCK_SIZE:
+            digest.update(f.read())
+        else:
+            stride = (size - SAMPLE_BLOCK_SIZE) // (SAMPLE_BLOCKS - 1)
+            for i in range(SAMPLE_BLOCKS):
+                f.seek(i * stride)
+                digest.update(f.read(SAMPLE_BLOCK_SIZE))
+    return digest.hexdigest()
+
+
+def checksum_path(output_file):
+    return output_file + ".sha256"
+
+
+def full_checksum(path):
+    """SHA-256 of the whole file, as written by ``--post checksum`` and checked by ``verify --full``."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_integrity(path):
+    try:
+        with open(integrity_path(path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_integrity(path, meeting_id):
+    """Record size, duration and sampled checksum of a finished download in its ``.integrity`` sidecar."""
+    size = os.path.getsize(path)
+    record = {"meeting_id": meeting_id, "size": size, "duration": mp4_duration(path),
+              "sample": sample_checksum(path, size), "written_at": time_module.time()}
+    with open(integrity_path(path), "w") as f:
+        json.dump(record, f)
+
+
+def refresh_integrity(path):
+    """Rewrite an existing sidecar after ``path`` was changed in place (e.g. by faststart)."""
+    record = load_integrity(path)
+    if record:
+        write_integrity(path, record.get("meeting_id"))
+
+
+def record_output(config, meeting):
+    """Write the integrity sidecar for a meeting that was just downloaded.
+
+    The video itself is fine without one (it is reported as unverified
+    later), so a failed write is only a warning.
+    """
+    if not config.get("sink") and os.path.exists(meeting["output_file"]):
+        try:
+            write_integrity(meeting["output_file"], meeting["meeting_id"])
+        except OSError as e:
+            step_warn(f"Could not write integrity sidecar for "
+                      f"[bold]{os.path.basename(meeting['output_file'])}[/bold]: {e}")
+
+
+def metadata_fingerprint(response):
+    """Watch-page fields that identify a recording; signed URL parameters and the like are left out."""
+    meeting = response.get("meeting") or {}
+    source = (response.get("video") or {}).get("source") or ""
+    return [meeting.get("id"), meeting.get("createdAt"), urlparse(source).path, metadata_duration(response)]
+
+
+def check_output(path, expected=0, full=False):
+    """Check a saved video without decoding it.
+
+    The ``moov`` index must be present, and size, duration and sampled
+    checksum must match the ``.integrity`` sidecar; without one the duration
+    is compared to ``expected``. ``full`` also hashes the whole file against
+    a ``.sha256`` sidecar if there is one. Returns ``(status, detail)`` with
+    status ``ok``, ``unverified`` (nothing to compare against),
+    ``incomplete`` or ``changed``.
+    """
+    size = os.path.getsize(path)
+    duration = mp4_duration(path)
+    if duration is None:
+        return "incomplete", "no MP4 index (moov box); the download did not finish"
+    record = load_integrity(path)
+    status = "ok"
+    if record:
+        if record.get("size") != size:
+            return "changed", f"size is {size} bytes, expected {record.get('size')}"
+        if record.get("duration") is not None and abs(duration - record["duration"]) > DURATION_TOLERANCE:
+            return "changed", f"duration is {format_duration(duration)}, expected {format_duration(record['duration'])}"
+        if sample_checksum(path, size) != record.get("sample"):
+            return "changed", "sampled checksum differs"
+    elif not expected:
+        status = "unverified"
+    if expected and abs(duration - expected) > max(DURATION_TOLERANCE, expected * 0.01):
+        return "changed", f"duration is {format_duration(duration)}, expected {format_duration(expected)}"
+    if full and os.path.exists(checksum_path(path)):
+        with open(checksum_path(path)) as f:
+            stored = f.read().split()
+        if not stored or stored[0].lower() != full_checksum(path):
+            return "changed", "SHA-256 differs from the .sha256 sidecar"
+        status = "ok"
+    return status, "" if status == "ok" else "no .integrity sidecar or duration to compare with"
+
+
+def find_existing(meeting, config):
+    """The complete earlier download of ``meeting``, or None if it has to be downloaded.
+
+    The saved metadata JSON must describe the same recording and the video
+    must pass :func:`check_output`. Older downloads without a sidecar get one.
+    Missing transcript formats are exported; nothing else is rewritten.
+    """
+    output_file = meeting["output_file"]
+    if config.get("force") or config["dry_run"] or not config["video"] or config.get("sink"):
+        return None
+    if not os.path.exists(output_file) or not os.path.exists(meeting["json_file"]):
+        return None
+    try:
+        with open(meeting["json_file"]) as f:
+            stored = json.load(f)
+        if metadata_fingerprint(stored) != metadata_fingerprint(meeting["response"]):
+            return None
+        status, _ = check_output(output_file, clip_length(meeting["clip"], meeting.get("duration") or 0))
+    except (OSError, ValueError, AttributeError):
+        return None
+    if status != "ok":
+        return None
+    if not os.path.exists(integrity_path(output_file)):
+        write_integrity(output_file, meeting["meeting_id"])
+
+    transcript_files = [
+        os.path.join(config["output_dir"], meeting["filename"] + TRANSCRIPT_SUFFIXES[fmt])
+        for fmt in config.get("transcript_formats", ["txt"])
+    ]
+    if all(os.path.exists(path) for path in transcript_files):
+        meeting["transcript_files"] = transcript_files
+    else:
+        save_meeting_files(meeting, config)
+    return output_file
+
+
+def saved_clip(stem):
+    """The ``(start, end)`` clip encoded in a file stem by :func:`clip_suffix`, or None."""
+    match = CLIP_SUFFIX_RE.search(stem)
+    if not match:
+        return None
+    values = [int(value) if value else None for value in match.groups()]
+    start = values[0] * 3600 + values[1] * 60 + values[2]
+    end = values[3] * 3600 + values[4] * 60 + values[5] if values[3] is not None else None
+    return start, end
+
+
+def verify_meeting(json_file, full=False):
+    """Check the videos saved next to one metadata JSON file; returns one result dict per file."""
+    stem = json_file[:-len(".json")]
+    try:
+        with open(json_file) as f:
+            response = json.load(f)
+        expected = clip_length(saved_clip(stem), metadata_duration(response))
+    except (OSError, ValueError, AttributeError):
+        expected = 0
+    results = []
+    for path in (stem + ".mp4", stem + ".m4a"):
+        if not os.path.exists(path):
+            continue
+        try:
+            status, detail = check_output(path, expected, full)
+        except OSError as e:
+            status, detail = "incomplete", str(e)
+        results.append({"file": path, "status": status, "detail": detail, "size": os.path.getsize(path)})
+    return results
+
+
+def cmd_verify(args):
+    """Check every saved video under ``--output-dir`` in parallel."""
+    if not os.path.isdir(args.output_dir):
+        show_error("Error", f"No such directory: {args.output_dir}")
+        sys.exit(1)
+    console.print()
+    start_time = time_module.time()
+    json_files = list(transcript_json_files(args.output_dir))
+    with console.status(f"  [dim]Verifying {len(json_files)} meetings...[/dim]", spinner="dots"):
+        with ThreadPoolExecutor(max_workers=max(1, args.workers), thread_name_prefix="tldv-verify") as pool:
+            results = [result for found in pool.map(lambda path: verify_meeting(path, args.full), json_files)
+                       for result in found]
+    elapsed = time_module.time() - start_time
+
+    counts = {status: 0 for status in ("ok", "unverified", "incomplete", "changed")}
+    for result in results:
+        counts[result["status"]] += 1
+    problems = [result for result in results if result["status"] in ("incomplete", "changed")]
+    total_bytes = sum(result["size"] for result in results)
+
+    if headless():
+        for result in results:
+            if result["status"] != "ok":
+                console.event("verify", f"{result['status']}  {result['file']}  {result['detail']}", **result)
+        console.event(
+            "summary", f"{len(results)} files ({total_bytes / (1024 * 1024):.1f} MB) in {elapsed:.1f}s: "
+                       + ", ".join(f"{count} {status}" for status, count in counts.items()),
+            files=len(results), bytes=total_bytes, elapsed=round(elapsed, 1), **counts,
+        )
+    else:
+        step_done(f"{len(results)} files ({total_bytes / (1024 * 1024):.1f} MB) checked in {elapsed:.1f}s  "
+                  f"[dim]({len(json_files)} meetings)[/dim]")
+        step_done(f"[bold green]{counts['ok']}[/bold green] ok  [bold yellow]{counts['unverified']}[/bold yellow] "
+                  f"unverified  [bold red]{len(problems)}[/bold red] incomplete or changed")
+        shown = [result for result in results if result["status"] != "ok"]
+        if shown:
+            table = Table(box=None, show_header=True, show_edge=False, padding=(0, 2), expand=True)
+            table.add_column("File", style="bold white", header_style="dim bold")
+            table.add_column("Status", header_style="dim bold")
+            table.add_column("Detail", style="dim", header_style="dim bold")
+            for result in shown:
+                style = "yellow" if result["status"] == "unverified" else "red"
+                table.add_row(os.path.basename(result["file"]), f"[{style}]{result['status']}[/{style}]",
+                              result["detail"])
+            console.print()
+            console.print(table)
+        console.print()
+    if problems:
+        sys.exit(1)
+
+
+# ── Post-processing ───────────────────────────────────────────────────────────
+
+
+def available_cpus():
+    """Cores this process may run on (its CPU affinity where the OS reports it)."""
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return os.cpu_count() or 1
+
+
+def run_post_ffmpeg(command):
+    result = subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, universal_newlines=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg exited with code {result.returncode}: {result.stderr.strip()[-300:]}")
+
+
+def post_faststart(ffmpeg_path, path, duration=0):
+    """Rewrite an MP4/M4A with its index up front, so playback can start while it loads."""
+    root, ext = os.path.splitext(path)
+    if ext.lower() not in (".mp4", ".m4a"):
+        return None
+    tmp_path = f"{root}.faststart{ext}"
+    run_post_ffmpeg([ffmpeg_path, "-v", "error", "-i", path, "-map", "0", "-c", "copy",
+                     "-movflags", "+faststart", "-y", tmp_path])
+    os.replace(tmp_path, path)
+    refresh_integrity(path)
+    return path
+
+
+def post_audio(ffmpeg_path, path, duration=0):
+    """Copy the audio track out into ``<name>.m4a``."""
+    root, ext = os.path.splitext(path)
+    if ext.lower() == ".m4a":
+        return None
+    output = root + ".m4a"
+    run_post_ffmpeg([ffmpeg_path, "-v", "error", "-i", path, "-map", "0:a:0", "-vn", "-c:a", "copy", "-y", output])
+    return output
+
+
+def post_thumbs(ffmpeg_path, path, duration=0, columns=4, rows=4):
+    """Contact sheet of keyframes spread over the video, as ``<name>_thumbs.jpg``."""
+    root, ext = os.path.splitext(path)
+    if ext.lower() == ".m4a":
+        return None
+    output = root + "_thumbs.jpg"
+    # Only keyframes are decoded; fps= picks evenly spaced ones from them.
+    rate = f"{columns * rows / duration:.6f}" if duration > 0 else "1/60"
+    run_post_ffmpeg([ffmpeg_path, "-v", "error", "-skip_frame", "nokey", "-i", path,
+                     "-vf", f"fps={rate},scale=320:-2,tile={columns}x{rows}", "-frames:v", "1", "-y", output])
+    return output
+
+
+def post_checksum(ffmpeg_path, path, duration=0):
+    """Write a ``sha256sum``-compatible ``<file>.sha256`` sidecar."""
+    output = checksum_path(path)
+    with open(output, "w") as f:
+        f.write(f"{full_checksum(path)}  {os.path.basename(path)}\n")
+    return output
+
+
+# Task name -> worker function taking ``(ffmpeg_path, path, duration)``.
+POST_TASKS = {
+    "faststart": post_faststart,
+    "audio": post_audio,
+    "thumbs": post_thumbs,
+    "checksum": post_checksum,
+}
+
+POST_LABELS = {"faststart": "Faststart", "audio": "Audio", "thumbs": "Thumbnails", "checksum": "Checksum"}
+
+
+def run_post_task(task, ffmpeg_path, path, duration):
+    """Run one post task in a pool process and describe the outcome."""
+    # Ctrl+C reaches the whole process group; only the parent should act on it.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    start = time_module.perf_counter()
+    try:
+        output, error = POST_TASKS[task](ffmpeg_path, path, duration), None
+    except Exception as e:
+        output, error = None, str(e) or type(e).__name__
+    return {"task": task, "file": path, "output": output, "error": error,
+            "seconds": round(time_module.perf_counter() - start, 3)}
+
+
+class PostProcessor:
+    """Runs the ``--post`` tasks of finished downloads on a process pool.
+
+    :meth:`submit` returns at once, so the next download starts while the
+    tasks run; the pool is sized to the available cores. It uses the spawn
+    start method because files are submitted from download worker threads,
+    and forking a multi-threaded process can deadlock the child. ``faststart``
+    rewrites the file, so it runs first and the other tasks of that file run
+    in parallel after it.
+    """
+
+    def __init__(self, tasks, ffmpeg_path, workers=0):
+        self.tasks = tasks
+        self.ffmpeg_path = ffmpeg_path
+        self.workers = workers or available_cpus()
+        self.lock = threading.Lock()
+        self.idle = threading.Condition(self.lock)
+        self.pool = self._new_pool()
+        self.active = 0
+        self.results = []
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def submit(self, path, duration=0, on_done=None):
+        """Queue the tasks for ``path``.
+
+        With ``on_done``, ``on_done(results)`` is called once they finish and
+        the results are not kept; otherwise they are returned by :meth:`close`.
+        """
+        thread = threading.Thread(target=self._run, args=(path, duration, on_done), name="tldv-post", daemon=True)
+        with self.lock:
+            if self.pool is None:
+                self.pool = self._new_pool()
+            self.active += 1
+        try:
+            thread.start()
+        except BaseException:
+            with self.lock:
+                self.active -= 1
+                self.idle.notify_all()
+            raise
+
+    def _run(self, path, duration, on_done):
+        try:
+            stages = [[task] for task in self.tasks if task == "faststart"]
+            stages.append([task for task in self.tasks if task != "faststart"])
+            results = []
+            for stage in stages:
+                futures = [(task, self.pool.submit(run_post_task, task, self.ffmpeg_path, path, duration))
+                           for task in stage]
+                for task, future in futures:
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        results.append({"task": task, "file": path, "output": None,
+                                        "error": str(e) or type(e).__name__, "seconds": 0.0})
+            if on_done:
+                on_done(results)
+            else:
+                with self.lock:
+                    self.results.extend(results)
+        finally:
+            with self.lock:
+                self.active -= 1
+                self.idle.notify_all()
+
+    def close(self):
+        """Wait for every submitted task, stop the pool and return the results not yet reported."""
+        with self.idle:
+            while self.active:
+                self.idle.wait()
+            if self.pool is not None:
+                self.pool.shutdown()
+                self.pool = None
+            results, self.results = self.results, []
+            return results
+
+
+def submit_post(config, meeting, on_done=None):
+    """Hand a finished download to the ``--post`` pipeline, if one is configured.
+
+    Like a failed task, a failure to queue the tasks is only a warning.
+    """
+    post = config.get("post")
+    if post and os.path.exists(meeting["output_file"]):
+        try:
+            post.submit(meeting["output_file"], clip_length(meeting["clip"], meeting.get("duration") or 0), on_done)
+        except Exception as e:
+            step_warn(f"Post-processing could not start for "
+                      f"[bold]{os.path.basename(meeting['output_file'])}[/bold]: {e}")
+
+
+def finish_post(config):
+    """Wait for outstanding ``--post`` tasks, report failures and return the results."""
+    post = config.get("post")
+    if not post:
+        return []
+    with console.status("  [dim]Finishing post-processing...[/dim]", spinner="dots"):
+        results = post.close()
+    failed = [result for result in results if result["error"]]
+    for result in failed:
+        step_warn(f"{POST_LABELS[result['task']]} failed for "
+                  f"[bold]{os.path.basename(result['file'])}[/bold]: {result['error']}")
+    if results:
+        step_done(f"Post-processing  \u2192  {len(results) - len(failed)}/{len(results)} tasks done")
+    return results
+
+
+def post_files(results, output_file):
+    """``(type_markup, path)`` rows for files the post tasks created next to ``output_file``."""
+    return [(f"[bold green]{POST_LABELS[result['task']]}[/bold green]", result["output"])
+            for result in results
+            if result["file"] == output_file and result["output"] and result["output"] != output_file]
+
+
+# ── Batch mode ────────────────────────────────────────────────────────────────
+
+_BATCH_STATUS_STYLES = {
+    "queued": "dim",
+    "fetching": "cyan",
+    "probing": "cyan",
+    "saving": "cyan",
+    "waiting": "yellow",
+    "downloading": "bold blue",
+    "done": "bold green",
+    "failed": "bold red",
+}
+
+
+def make_batch_panel(jobs, elapsed, show_share=False):
+    """Build the combined dashboard for a batch run.
+
+    ``show_share`` adds each job's current share of the ``--max-rate`` budget.
+    """
+    done = sum(1 for job in jobs if job["status"] == "done")
+    failed = sum(1 for job in jobs if job["status"] == "failed")
+    active = sum(1 for job in jobs if job["status"] not in ("queued", "done", "failed"))
+
+    table = Table(box=None, show_header=True, show_edge=False, padding=(0, 1), collapse_padding=True, expand=True)
+    table.add_column("Meeting", style="white", no_wrap=True, min_width=12, max_width=20, header_style="dim")
+    table.add_column("Status", justify="left", no_wrap=True, max_width=12, header_style="dim")
+    table.add_column("Progress", no_wrap=True, min_width=17, header_style="dim")
+    table.add_column("Speed", style="bold magenta", justify="right", header_style="dim")
+    table.add_column("Download", style="bold cyan", justify="right", no_wrap=True, header_style="dim")
+    table.add_column("ETA", style="bold green", justify="right", min_width=5, header_style="dim")
+    if show_share:
+        table.add_column("Share", style="bold yellow", justify="right", header_style="dim")
+
+    for job in jobs:
+        style = _BATCH_STATUS_STYLES.get(job["status"], "white")
+        pct = min(job["pct"], 100.0)
+        filled = int(pct / 100 * 10)
+        if job["status"] == "done":
+            bar = "[green]" + "\u2588" * 10 + "[/green]"
+        else:
+            bar = "[blue]" + "\u2588" * filled + "[/blue][dim]" + "\u2591" * (10 - filled) + "[/dim]"
+        status = job["error"] if job["status"] == "failed" else job["status"]
+        row = [job["name"], f"[{style}]{status}[/{style}]",
+               f"{bar} {pct:5.1f}%", job["speed"], job["dl_speed"], job["eta"]]
+        if show_share:
+            row.append(job["share"] if job["status"] == "downloading" else "--")
+        table.add_row(*row)
+
+    summary = (
+        f"  [bold green]{done}[/bold green] done  "
+        f"[bold blue]{active}[/bold blue] active  "
+        f"[bold red]{failed}[/bold red] failed  "
+        f"[dim]of {len(jobs)}  \u2502  elapsed {format_time_short(elapsed)}[/dim]"
+    )
+
+    return Panel(
+        Group(Text(""), Text.from_markup(summary), Text(""), table, Text("")),
+        border_style="blue", box=box.HEAVY,
+        title="[bold blue] Batch Download [/bold blue]",
+        title_align="left", padding=(0, 1),
+    )
+
+
+class BatchDashboard:
+    """The live batch panel, redrawn by :meth:`update`."""
+
+    def __init__(self, jobs, show_share=False, auto_refresh=True):
+        self.jobs = jobs
+        self.show_share = show_share
+        self.auto_refresh = auto_refresh
+        self.live = Live(make_batch_panel(jobs, 0, show_share), console=console, refresh_per_second=4,
+                         auto_refresh=auto_refresh)
+
+    def __enter__(self):
+        self.live.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self.live.__exit__(*exc)
+
+    def update(self, elapsed):
+        self.live.update(make_batch_panel(self.jobs, elapsed, self.show_share), refresh=not self.auto_refresh)
+
+
+def batch_display(jobs, config, auto_refresh=True):
+    """The batch dashboard, or :class:`BatchLines` when headless."""
+    if headless():
+        return BatchLines(jobs, config.get("progress_interval", 10))
+    return BatchDashboard(jobs, bool(config.get("bandwidth")), auto_refresh)
+
+
+def new_job(meeting_id):
+    """Fresh dashboard state for one batch job."""
+    return {
+        "meeting_id": meeting_id, "name": meeting_id, "status": "queued",
+        "pct": 0.0, "speed": "--", "dl_speed": "--", "eta": "--:--", "share": "--",
+        "error": None, "meeting": None, "size": 0, "skipped": False, "metrics": new_metrics(meeting_id),
+    }
+
+
+def run_batch(meeting_ids, config, on_finished=None):
+    """Download many meetings through bounded prepare and download worker pools.
+
+    Metadata fetches and duration probes run on one pool while ``ffmpeg``
+    downloads run on another, so the next meetings are already prepared when a
+    download slot frees up. ``on_finished(job)`` is called from the worker
+    thread as each job succeeds or fails. Returns the list of job dicts.
+    """
+    if config.get("engine") == "async":
+        return run_batch_async(meeting_ids, config, on_finished)
+
+    workers = config["workers"]
+    session = make_session(workers * max(2, config["segment_workers"]))
+    jobs = [new_job(meeting_id) for meeting_id in meeting_ids]
+
+    prepare_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tldv-prepare")
+    download_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tldv-download")
+    finished = threading.Semaphore(0)
+
+    def finish(job):
+        try:
+            record_metrics(config, finish_metrics(job["metrics"], job["meeting"], job["error"]))
+            if on_finished:
+                try:
+                    on_finished(job)
+                except Exception:
+                    pass
+        finally:
+            finished.release()
+
+    def fail(job, error):
+        job["error"] = error
+        job["status"] = "failed"
+        finish(job)
+
+    def download_job(job):
+        meeting = job["meeting"]
+        job["status"] = "downloading"
+
+        def on_progress(stats):
+            job.update(pct=stats["pct"], speed=stats["speed"], dl_speed=stats["dl_speed"], eta=stats["eta"],
+                       share=stats.get("share", "--"))
+
+        # Whatever happens, the job must be finished or the batch loop waits forever.
+        try:
+            return_code, elapsed = timed(
+                job["metrics"], "download", run_download, config, meeting["source"], meeting["output_file"],
+                clip_length(meeting["clip"], meeting["duration"]), on_progress, session, meeting.get("playlist"),
+                retry_counter(job["metrics"]),
+            )
+            if return_code != 0 or not output_ready(config, meeting["output_file"]):
+                job.update(status="failed", error=f"ffmpeg exited with code {return_code}")
+            elif config.get("sink"):
+                job.update(status="done", pct=100.0, speed="---", eta="00:00", dl_speed="streamed")
+            else:
+                job.update(
+                    status="done", pct=100.0, speed="---", eta="00:00",
+                    dl_speed=average_rate(meeting["output_file"], elapsed),
+                    size=os.path.getsize(meeting["output_file"]),
+                )
+                record_output(config, meeting)
+                submit_post(config, meeting)
+        except Exception as e:
+            job.update(status="failed", error=str(e) or type(e).__name__)
+        finally:
+            finish(job)
+
+    def prepare_job(job):
+        metrics = job["metrics"]
+        try:
+            job["status"] = "fetching"
+            on_retry = retry_counter(metrics)
+            meeting = timed(metrics, "metadata", prepare_meeting, job["meeting_id"], config, session, on_retry)
+            job["name"] = meeting["name"]
+            job["meeting"] = meeting
+            meeting["duration"], meeting["duration_source"] = timed(
+                metrics, "duration", resolve_duration, meeting, config, session, on_retry)
+            existing = find_existing(meeting, config)
+            probe = None
+            if config["video"] and not meeting["duration"] and not existing:
+                probe = start_duration_probe(config["ffprobe"], meeting["source"], metrics)
+            if not config["dry_run"] and not existing:
+                job["status"] = "saving"
+                save_meeting_files(meeting, config, metrics)
+            if probe:
+                job["status"] = "probing"
+                meeting["duration"] = probe.result()
+                meeting["duration_source"] = "ffprobe"
+        except MeetingError as e:
+            fail(job, e.message)
+            return
+        except Exception as e:
+            fail(job, str(e))
+            return
+        if existing:
+            job.update(status="done", pct=100.0, speed="---", eta="00:00", dl_speed="skipped", skipped=True,
+                       size=os.path.getsize(existing))
+            finish(job)
+            return
+        if not config["video"]:
+            job.update(status="done", pct=100.0, speed="---", eta="00:00")
+            finish(job)
+            return
+        job["status"] = "waiting"
+        download_pool.submit(download_job, job)
+
+    start_time = time_module.time()
+    for job in jobs:
+        prepare_pool.submit(prepare_job, job)
+
+    remaining = len(jobs)
+    with batch_display(jobs, config) as display:
+        while remaining:
+            if finished.acquire(timeout=0.25):
+                remaining -= 1
+            display.update(time_module.time() - start_time)
+
+    prepare_pool.shutdown()
+    download_pool.shutdown()
+    session.close()
+    return jobs
+
+
+def show_batch_summary(jobs, config, elapsed):
+    """Print the final results table for a batch run."""
+    if headless():
+        failed = sum(1 for job in jobs if job["status"] != "done")
+        skipped = sum(1 for job in jobs if job["skipped"])
+        total_bytes = sum(job["size"] for job in jobs if job["status"] == "done" and not job["skipped"])
+        console.event(
+            "summary", f"{len(jobs) - failed}/{len(jobs)} meetings downloaded, {skipped} already saved, "
+                       f"{failed} failed, {total_bytes / (1024 * 1024):.1f} MB in {format_duration(elapsed)}",
+            ok=len(jobs) - failed, skipped=skipped, failed=failed, bytes=total_bytes, elapsed=round(elapsed, 1),
+        )
+        return failed
+    table = Table(box=None, show_header=True, show_edge=False, padding=(0, 2), expand=True)
+    table.add_column("Meeting", style="bold white", header_style="dim bold")
+    table.add_column("Result", header_style="dim bold")
+    table.add_column("Size", style="dim", justify="right", header_style="dim bold")
+
+    failed = 0
+    skipped = 0
+    total_bytes = 0
+    for job in jobs:
+        if job["skipped"]:
+            skipped += 1
+            table.add_row(job["name"], "[green]\u2714 already saved[/green]", f"{job['size'] / (1024 * 1024):.1f} MB")
+        elif job["status"] == "done":
+            total_bytes += job["size"]
+            if config.get("sink"):
+                table.add_row(job["name"], "[green]\u2714 streamed[/green]", "")
+            else:
+                table.add_row(job["name"], "[green]\u2714 saved[/green]", f"{job['size'] / (1024 * 1024):.1f} MB")
+        else:
+            failed += 1
+            table.add_row(job["name"], f"[red]\u2718 {job['error']}[/red]", "")
+
+    ok = len(jobs) - failed
+    headline = (
+        f"  [bold green]\u2714 {ok}/{len(jobs)} meetings downloaded[/bold green]"
+        + (f"  [green]{skipped} already saved[/green]" if skipped else "")
+        + f"  [dim]{total_bytes / (1024 * 1024):.1f} MB in {format_duration(elapsed)}[/dim]"
+    )
+    border = "green" if not failed else "yellow"
+
+    console.print()
+    console.print(Panel(
+        Group(Text(""), Text.from_markup(headline), Text(""), table, Text("")),
+        border_style=border, box=box.HEAVY,
+        title=f"[bold {border}] Batch Complete [/bold {border}]",
+        title_align="left",
+        subtitle=f"[dim]Files saved to {os.path.abspath(config['output_dir'])}[/dim]",
+        subtitle_align="right",
+        padding=(0, 1),
+    ))
+    console.print()
+    return failed
+
+
+# ── asyncio engine ────────────────────────────────────────────────────────────
+
+
+def run_coroutine(coro):
+    """Run ``coro`` to completion on a private event loop."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class AsyncResponse:
+    """Just enough of ``requests.Response`` for the shared response helpers."""
+
+    def __init__(self, url, status_code, headers, content=b""):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", "replace")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+class AsyncHTTPClient:
+    """Minimal asyncio HTTP/1.1 client with per-host keep-alive connections.
+
+    Covers what the downloader needs and nothing more: GET requests,
+    Content-Length, chunked and close-delimited bodies, redirects, and
+    streaming 2xx bodies to a callback instead of buffering them.
+    """
+
+    def __init__(self, limit_per_host=16, timeout=60):
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self._idle = {}
+        self._slots = {}
+        self._ssl = None
+
+    async def get(self, url, headers=None, on_response=None, max_redirects=5, throttle=None):
+        """GET ``url`` and return an :class:`AsyncResponse`.
+
+        ``on_response(status, headers)`` may return a callable; the body is
+        then streamed to it chunk by chunk rather than kept in memory. Both
+        run on the loop's executor, since they open and write files. Reads
+        are paced by the ``throttle`` :class:`BandwidthShare`, if any.
+        """
+        for _ in range(max_redirects + 1):
+            response = await self._get_once(url, headers or {}, on_response, throttle)
+            if response.status_code in (301, 302, 303, 307, 308) and "Location" in response.headers:
+                url = urljoin(url, response.headers["Location"])
+                continue
+            return response
+        raise requests.TooManyRedirects(f"Exceeded {max_redirects} redirects for {url}")
+
+    async def close(self):
+        for connections in self._idle.values():
+            for _, writer in connections:
+                writer.close()
+        self._idle.clear()
+
+    def _read(self, awaitable):
+        return asyncio.wait_for(awaitable, self.timeout)
+
+    async def _open(self, key):
+        idle = self._idle.get(key)
+        while idle:
+            reader, writer = idle.pop()
+            if not reader.at_eof() and not writer.transport.is_closing():
+                return reader, writer, True
+            writer.close()
+
+        scheme, host, port = key
+        ssl_context = None
+        if scheme == "https":
+            if self._ssl is None:
+                self._ssl = ssl.create_default_context()
+            ssl_context = self._ssl
+        reader, writer = await self._read(asyncio.open_connection(host, port, ssl=ssl_context))
+        return reader, writer, False
+
+    async def _get_once(self, url, headers, on_response, throttle=None):
+        parts = urlparse(url)
+        https = parts.scheme == "https"
+        key = (parts.scheme, parts.hostname, parts.port or (443 if https else 80))
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        request_headers = {
+            "Host": parts.netloc,
+            "User-Agent": f"tldv-downloader/{VERSION}",
+            "Accept-Encoding": "identity",
+            "Connection": "keep-alive",
+        }
+        request_headers.update(headers)
+        request = f"GET {target} HTTP/1.1\r\n" + "".join(
+            f"{name}: {value}\r\n" for name, value in request_headers.items()
+        ) + "\r\n"
+
+        if key not in self._slots:
+            self._slots[key] = asyncio.Semaphore(self.limit_per_host)
+
+        async with self._slots[key]:
+            for attempt in range(2):
+                reader, writer, reused = await self._open(key)
+                try:
+                    writer.write(request.encode("latin-1"))
+                    await writer.drain()
+                    status_line = await self._read(reader.readline())
+                    if not status_line:
+                        raise ConnectionResetError("connection closed by peer")
+                    break
+                except (OSError, asyncio.IncompleteReadError):
+                    writer.close()
+                    # A pooled keep-alive connection may have been closed by the server.
+                    if reused and attempt == 0:
+                        continue
+                    raise
+
+            try:
+                return await self._read_response(url, reader, writer, key, status_line, on_response, throttle)
+            except BaseException:
+                writer.close()
+                raise
+
+    async def _read_response(self, url, reader, writer, key, status_line, on_response, throttle=None):
+        version, status, _ = (status_line.decode("latin-1").rstrip("\r\n").split(" ", 2) + [""])[:3]
+        status = int(status)
+        headers = CaseInsensitiveDict()
+        while True:
+            line = await self._read(reader.readline())
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip()] = value.strip()
+
+        loop = asyncio.get_event_loop()
+        sink = None
+        if on_response and 200 <= status < 300:
+            sink = await loop.run_in_executor(None, on_response, status, headers)
+        body = bytearray()
+
+        async def deliver(chunk):
+            if sink:
+                await loop.run_in_executor(None, sink, chunk)
+            else:
+                body.extend(chunk)
+            if throttle:
+                delay = throttle.reserve(len(chunk))
+                if delay:
+                    await asyncio.sleep(delay)
+
+        reusable = version == "HTTP/1.1" and headers.get("Connection", "").lower() != "close"
+
+        if status in (204, 304) or 100 <= status < 200:
+            pass
+        elif headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while True:
+                line = await self._read(reader.readline())
+                if not line.endswith(b"\n"):
+                    # EOF instead of a size line: the body was cut off, not finished.
+                    raise asyncio.IncompleteReadError(line, None)
+                try:
+                    size = int(line.split(b";")[0].strip(), 16)
+                except ValueError:
+                    raise requests.exceptions.ChunkedEncodingError(f"Invalid chunk size line {line[:40]!r}")
+                if size == 0:
+                    while True:
+                        line = await self._read(reader.readline())
+                        if line in (b"\r\n", b"\n"):
+                            break
+                        if not line:
+                            reusable = False
+                            break
+                    break
+                while size:
+                    chunk = await self._read(reader.read(min(size, 65536)))
+                    if not chunk:
+                        raise asyncio.IncompleteReadError(b"", size)
+                    await deliver(chunk)
+                    size -= len(chunk)
+                if await self._read(reader.readexactly(2)) != b"\r\n":
+                    raise requests.exceptions.ChunkedEncodingError("Chunk not followed by CRLF")
+        elif "Content-Length" in headers:
+            remaining = int(headers["Content-Length"])
+            while remaining:
+                chunk = await self._read(reader.read(min(remaining, 65536)))
+                if not chunk:
+                    raise asyncio.IncompleteReadError(b"", remaining)
+                await deliver(chunk)
+                remaining -= len(chunk)
+        else:
+            reusable = False
+            while True:
+                chunk = await self._read(reader.read(65536))
+                if not chunk:
+                    break
+                await deliver(chunk)
+
+        if reusable:
+            self._idle.setdefault(key, []).append((reader, writer))
+        else:
+            writer.close()
+        return AsyncResponse(url, status, headers, bytes(body))
+
+
+async def async_fetch_watch_page(client, meeting_id, token, cache=None, refresh=False, retry=None,
+                                 on_retry=None):
+    """asyncio counterpart of :func:`fetch_watch_page`; the cache is read and written on the executor."""
+    loop = asyncio.get_event_loop()
+    entry, headers = await loop.run_in_executor(None, watch_page_request, meeting_id, token, cache, refresh)
+    if headers is None:
+        return entry["body"], True
+
+    async def attempt_fetch(attempt):
+        data = await client.get(WATCH_PAGE_URL.format(meeting_id=meeting_id), headers)
+        if data.status_code in RETRY_STATUSES:
+            data.raise_for_status()
+        return data
+
+    data = await (retry or RetryPolicy(0)).acall(attempt_fetch, on_retry)
+    return await loop.run_in_executor(None, watch_page_result, meeting_id, token, data, entry, cache)
+
+
+async def async_fetch_playlist(client, url):
+    """asyncio counterpart of :func:`fetch_playlist`."""
+    response = await client.get(url)
+    response.raise_for_status()
+    return parse_m3u8(response.text, response.url)
+
+
+async def async_fetch_media_playlist(client, source_url, selection=None):
+    """asyncio counterpart of :func:`fetch_media_playlist`."""
+    selection = selection or {}
+    playlist = await async_fetch_playlist(client, source_url)
+    variant = audio = None
+    if playlist["variants"]:
+        variant, primary_uri, audio_uri = plan_media_playlists(playlist, selection)
+        playlist = await async_fetch_playlist(client, primary_uri)
+        audio = await async_fetch_playlist(client, audio_uri) if audio_uri else None
+    return combine_playlists(playlist, audio, variant, selection.get("audio_only"))
+
+
+async def async_resolve_duration(meeting, config, client, on_retry=None):
+    """asyncio counterpart of :func:`resolve_duration`."""
+    duration = metadata_duration(meeting["response"])
+    if duration:
+        return duration, "metadata"
+    source = meeting.get("source")
+    if not config["video"] or not source or not urlparse(source).path.endswith(".m3u8"):
+        return 0, None
+    try:
+        playlist = await retry_policy(config).acall(
+            lambda attempt: async_fetch_media_playlist(client, source, playlist_selection(config)), on_retry)
+    except Exception:
+        return 0, None
+    meeting["playlist"] = playlist
+    return sum(s["duration"] for s in playlist["segments"]), "playlist"
+
+
+async def async_get_duration(ffprobe_path, source_url):
+    """asyncio counterpart of :func:`get_duration`."""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            ffprobe_path, "-v", "quiet", "-print_format", "json", "-show_format", source_url,
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        try:
+            stdout, _ = await asyncio.wait_for(process.communicate(), 30)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            return 0
+        info = json.loads(stdout.decode("utf-8", "replace"))
+        return float(info.get("format", {}).get("duration", 0))
+    except Exception:
+        return 0
+
+
+async def async_fetch_segment_in_place(client, segment, store, on_bytes=None, resume=False, throttle=None):
+    """asyncio counterpart of :func:`fetch_segment_in_place`.
+
+    The event loop hands over each chunk it has read, which is written at
+    its offset as is on the executor (see :meth:`AsyncHTTPClient.get`).
+    """
+    key = segment["key"]
+    size = store.size(key)
+    have = store.written.get(key, 0) if resume and size is not None else 0
+    if size is not None and have >= size:
+        return size
+
+    path = store.path(segment)
+    state = {"size": None, "position": 0, "file": None}
+
+    def on_response(status, response_headers):
+        start = have if status == 206 else 0
+        state["size"] = in_place_size(response_headers, start, (segment["byterange"] or (0, None))[1])
+        if state["size"] is None:
+            # Unknown length: stage the segment in a file of its own.
+            f = state["file"] = open(path + ".part", "wb")
+
+            def save(chunk):
+                f.write(chunk)
+                state["position"] += len(chunk)
+                if on_bytes:
+                    on_bytes(len(chunk))
+            return save
+        store.reserve(key, state["size"])
+        state["position"] = start
+
+        def write(chunk):
+            store.write(key, state["position"], chunk)
+            state["position"] += len(chunk)
+            if on_bytes:
+                on_bytes(len(chunk))
+        return write
+
+    try:
+        response = await client.get(segment["uri"], segment_range(segment, have, size), on_response,
+                                    throttle=throttle)
+    finally:
+        if state["file"]:
+            await asyncio.get_event_loop().run_in_executor(None, state["file"].close)
+    response.raise_for_status()
+    if state["file"]:
+        os.replace(path + ".part", path)
+        return state["position"]
+    if state["position"] < state["size"]:
+        raise asyncio.IncompleteReadError(b"", state["size"] - state["position"])
+    return state["size"]
+
+
+async def async_fetch_segment(client, segment, path, on_bytes=None, resume=False, throttle=None, store=None):
+    """asyncio counterpart of :func:`fetch_segment`."""
+    if store is not None and store.in_place:
+        return await async_fetch_segment_in_place(client, segment, store, on_bytes, resume, throttle)
+    part_path = path + ".part"
+    have = os.path.getsize(part_path) if resume and os.path.exists(part_path) else 0
+    start, length = segment["byterange"] or (0, None)
+    headers = {}
+    if length is not None:
+        if have >= length:
+            os.replace(part_path, path)
+            return length
+        headers["Range"] = f"bytes={start + have}-{start + length - 1}"
+    elif have:
+        headers["Range"] = f"bytes={have}-"
+
+    state = {"file": None, "size": 0}
+
+    def on_response(status, response_headers):
+        resumed = have and status == 206
+        state["size"] = have if resumed else 0
+        f = state["file"] = open(part_path, "ab" if resumed else "wb")
+
+        def write(chunk):
+            f.write(chunk)
+            state["size"] += len(chunk)
+            if on_bytes:
+                on_bytes(len(chunk))
+        return write
+
+    try:
+        response = await client.get(segment["uri"], headers, on_response, throttle=throttle)
+    finally:
+        if state["file"]:
+            await asyncio.get_event_loop().run_in_executor(None, state["file"].close)
+
+    if response.status_code == 416 and have:
+        # The partial file already holds the whole resource.
+        os.replace(part_path, path)
+        return have
+    response.raise_for_status()
+    os.replace(part_path, path)
+    return state["size"]
+
+
+async def async_run_ffmpeg(ffmpeg_path, source_url, output_file, total_duration, on_progress=None,
+                           audio_only=False, clip=None, stderr_tail=None):
+    """asyncio counterpart of :func:`run_ffmpeg`."""
+    start_time = time_module.time()
+    process = await asyncio.create_subprocess_exec(
+        *ffmpeg_copy_command(ffmpeg_path, source_url, output_file, audio_only=audio_only, clip=clip),
+        stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL if stderr_tail is None else subprocess.PIPE,
+    )
+
+    async def read_stderr():
+        async for line in process.stderr:
+            stderr_tail.append(line.decode("utf-8", "replace").strip())
+            del stderr_tail[:-FFMPEG_STDERR_LINES]
+
+    stderr_reader = asyncio.ensure_future(read_stderr()) if stderr_tail is not None else None
+    parser = ProgressParser()
+    handle = make_ffmpeg_reporter(total_duration, on_progress, start_time=start_time)
+    while True:
+        chunk = await process.stdout.read(65536)
+        if not chunk:
+            break
+        handle(parser.feed(chunk))
+    if stderr_reader:
+        await stderr_reader
+    returncode = await process.wait()
+    return returncode, time_module.time() - start_time
+
+
+async def async_run_native(ffmpeg_path, source_url, output_file, total_duration, on_progress=None,
+                           client=None, workers=8, resume=False, playlist=None, throttle=None,
+                           host_limit=0, retry=None, on_retry=None, adaptive=True, selection=None,
+                           clip=None):
+    """asyncio counterpart of :func:`run_native`.
+
+    Segments are fetched as tasks on the event loop, bounded by
+    :class:`AdaptiveConcurrency`, and the remux runs through
+    :func:`asyncio.create_subprocess_exec`. Manifest checkpoints and the
+    staging directory set-up and clean-up run on the executor.
+    """
+    loop = asyncio.get_event_loop()
+    own_client = client is None
+    if own_client:
+        client = AsyncHTTPClient(limit_per_host=host_limit or workers)
+    retry = retry or RetryPolicy(0)
+    start_time = time_module.time()
+
+    try:
+        if playlist is None:
+            playlist = await retry.acall(
+                lambda attempt: async_fetch_media_playlist(client, source_url, selection), on_retry)
+        if clip:
+            playlist = clip_playlist(playlist, *clip)
+        store, completed = await loop.run_in_executor(None, prepare_parts_dir, output_file, playlist, resume)
+        progress = SegmentProgress(output_file, playlist, completed, on_progress, throttle=throttle,
+                                   extents=store.extents)
+
+        concurrency = AdaptiveConcurrency(workers, adaptive=adaptive)
+
+        def on_segment_retry(attempt, error, delay):
+            concurrency.failure()
+            if on_retry:
+                on_retry(attempt, error, delay)
+
+        async def fetch(segment):
+            started = time_module.monotonic()
+            size = await retry.acall(lambda attempt: async_fetch_segment(
+                client, segment, store.path(segment), progress.add_bytes, resume or attempt > 0, throttle, store,
+            ), on_segment_retry)
+            concurrency.success(size, time_module.monotonic() - started)
+            return size
+
+        try:
+            for track in playlist_tracks(playlist):
+                init = track["init"]
+                if init and init["key"] not in completed:
+                    completed[init["key"]] = await fetch(init)
+
+            progress.report(final=True)
+
+            pending = progress.pending()[::-1]
+            in_flight = {}
+            try:
+                while pending or in_flight:
+                    while pending and len(in_flight) < concurrency.limit:
+                        segment = pending.pop()
+                        in_flight[asyncio.ensure_future(fetch(segment))] = segment
+                    done, _ = await asyncio.wait(list(in_flight), return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        segment = in_flight.pop(task)
+                        try:
+                            size = task.result()
+                        except Exception as e:
+                            raise MeetingError("Download Error", f"Segment {segment['index']} failed: {e}")
+                        await loop.run_in_executor(None, progress.segment_done, segment, size)
+            except BaseException:
+                for task in in_flight:
+                    task.cancel()
+                await asyncio.gather(*in_flight, return_exceptions=True)
+                raise
+            finally:
+                await loop.run_in_executor(None, progress.checkpoint)
+                if throttle:
+                    throttle.release()
+        finally:
+            store.close()
+
+        local_playlists = await loop.run_in_executor(
+            None, write_local_playlists, playlist, store.parts_dir, store.extents)
+        process = await asyncio.create_subprocess_exec(
+            *remux_command(ffmpeg_path, local_playlists, output_file, playlist["audio_only"],
+                           clip_seeks(playlist, clip), clip_length(clip)),
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        returncode = await process.wait()
+        if returncode == 0:
+            await loop.run_in_executor(None, cleanup_parts, output_file)
+    finally:
+        if own_client:
+            await client.close()
+
+    return returncode, time_module.time() - start_time
+
+
+async def async_run_download(config, source_url, output_file, total_duration, on_progress=None,
+                             client=None, playlist=None, on_retry=None):
+    """Download on the event loop: segments for HLS sources, ffmpeg otherwise."""
+    retry = retry_policy(config)
+    if playlist is None and not urlparse(source_url).path.endswith(".m3u8"):
+        total_elapsed = 0.0
+        for attempt in range(retry.retries + 1):
+            stderr_tail = []
+            returncode, elapsed = await async_run_ffmpeg(
+                config["ffmpeg"], source_url, output_file, total_duration, on_progress,
+                config.get("audio_only", False), config.get("clip"), stderr_tail,
+            )
+            total_elapsed += elapsed
+            if returncode == 0 or attempt == retry.retries:
+                break
+            error = FFmpegError(returncode, stderr_tail)
+            if not is_retryable(error):
+                break
+            delay = retry.delay(attempt)
+            if on_retry:
+                on_retry(attempt, error, delay)
+            await asyncio.sleep(delay)
+        return returncode, total_elapsed
+    throttle = bandwidth_share(config)
+    try:
+        return await async_run_native(
+            config["ffmpeg"], source_url, output_file, total_duration, on_progress,
+            client=client, workers=config["segment_workers"], resume=config.get("resume", False),
+            playlist=playlist, throttle=throttle, host_limit=config.get("max_host_connections", 0),
+            retry=retry, on_retry=on_retry, adaptive=config.get("adaptive", True),
+            selection=playlist_selection(config), clip=config.get("clip"),
+        )
+    finally:
+        if throttle:
+            throttle.release()
+
+
+def run_batch_async(meeting_ids, config, on_finished=None):
+    """Run a batch on one asyncio event loop instead of thread pools.
+
+    Up to ``4 * workers`` metadata fetches and ``workers`` downloads are in
+    flight at once, all sharing one pooled HTTP client; the dashboard is
+    refreshed from the same loop. Returns the list of job dicts.
+    """
+    jobs = [new_job(meeting_id) for meeting_id in meeting_ids]
+    with batch_display(jobs, config, auto_refresh=False) as display:
+        run_coroutine(_batch_async(jobs, config, on_finished, display))
+    return jobs
+
+
+async def atimed(metrics, phase, awaitable):
+    """asyncio counterpart of :func:`timed`."""
+    start = time_module.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        phases = metrics["phases"]
+        phases[phase] = round(phases.get(phase, 0.0) + time_module.perf_counter() - start, 6)
+
+
+async def _batch_async(jobs, config, on_finished, display):
+    workers = config["workers"]
+    client = AsyncHTTPClient(
+        limit_per_host=config.get("max_host_connections") or workers * max(2, config["segment_workers"]))
+    metadata_slots = asyncio.Semaphore(max(workers * 4, 16))
+    download_slots = asyncio.Semaphore(workers)
+    loop = asyncio.get_event_loop()
+    start_time = time_module.time()
+
+    async def run_job(job):
+        metrics = job["metrics"]
+        try:
+            async with metadata_slots:
+                job["status"] = "fetching"
+                on_retry = retry_counter(metrics)
+                raw, from_cache = await atimed(metrics, "metadata", async_fetch_watch_page(
+                    client, job["meeting_id"], config["token"],
+                    config.get("cache"), revalidate_cache(config), retry_policy(config), on_retry,
+                ))
+                meeting = build_meeting(job["meeting_id"], raw, from_cache, config)
+                job["name"] = meeting["name"]
+                job["meeting"] = meeting
+                meeting["duration"], meeting["duration_source"] = await atimed(
+                    metrics, "duration", async_resolve_duration(meeting, config, client, on_retry))
+                existing = await loop.run_in_executor(None, find_existing, meeting, config)
+                probe = None
+                if config["video"] and not meeting["duration"] and not existing:
+                    probe = asyncio.ensure_future(atimed(
+                        metrics, "probe", async_get_duration(config["ffprobe"], meeting["source"])))
+                if not config["dry_run"] and not existing:
+                    job["status"] = "saving"
+                    await loop.run_in_executor(None, save_meeting_files, meeting, config, metrics)
+                if probe:
+                    job["status"] = "probing"
+                    meeting["duration"] = await probe
+                    meeting["duration_source"] = "ffprobe"
+
+            if existing:
+                job.update(status="done", pct=100.0, speed="---", eta="00:00", dl_speed="skipped", skipped=True,
+                           size=os.path.getsize(existing))
+            elif not config["video"]:
+                job.update(status="done", pct=100.0, speed="---", eta="00:00")
+            else:
+                job["status"] = "waiting"
+                async with download_slots:
+                    job["status"] = "downloading"
+
+                    def on_progress(stats):
+                        job.update(pct=stats["pct"], speed=stats["speed"], dl_speed=stats["dl_speed"],
+                                   eta=stats["eta"], share=stats.get("share", "--"))
+
+                    return_code, elapsed = await atimed(metrics, "download", async_run_download(
+                        config, meeting["source"], meeting["output_file"],
+                        clip_length(meeting["clip"], meeting["duration"]), on_progress, client,
+                        meeting.get("playlist"), on_retry,
+                    ))
+                if return_code != 0 or not output_ready(config, meeting["output_file"]):
+                    raise MeetingError("Error", f"ffmpeg exited with code {return_code}")
+                job.update(
+                    status="done", pct=100.0, speed="---", eta="00:00",
+                    dl_speed=average_rate(meeting["output_file"], elapsed),
+                    size=os.path.getsize(meeting["output_file"]),
+                )
+                await loop.run_in_executor(None, record_output, config, meeting)
+                submit_post(config, meeting)
+        except MeetingError as e:
+            job.update(status="failed", error=e.message)
+        except Exception as e:
+            job.update(status="failed", error=str(e) or type(e).__name__)
+
+        # The metrics file and the sync index are written on the executor, off the loop.
+        await loop.run_in_executor(None, finish_job, job)
+
+    def finish_job(job):
+        record_metrics(config, finish_metrics(job["metrics"], job["meeting"], job["error"]))
+        if on_finished:
+            try:
+                on_finished(job)
+            except Exception:
+                pass
+
+    async def refresh():
+        while True:
+            display.update(time_module.time() - start_time)
+            await asyncio.sleep(0.25)
+
+    refresher = asyncio.ensure_future(refresh())
+    try:
+        await asyncio.gather(*(run_job(job) for job in jobs))
+    finally:
+        refresher.cancel()
+        display.update(time_module.time() - start_time)
+        await client.close()
+
+
+# ── Workspace sync ────────────────────────────────────────────────────────────
+
+MEETINGS_LIST_URL = API_BASE + "/v1/meetings"
+SYNC_PAGE_SIZE = 50
+
+
+class SyncIndex:
+    """Local SQLite index of every meeting seen by ``sync`` and its state.
+
+    ``state`` is ``new`` until a download finishes, then ``complete`` (video
+    saved), ``transcript`` (metadata and transcript only) or ``failed``.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS meetings (
+                id TEXT PRIMARY KEY,
+                created_at TEXT,
+                name TEXT,
+                video_path TEXT,
+                json_path TEXT,
+                transcript_paths TEXT,
+                state TEXT NOT NULL DEFAULT 'new',
+                error TEXT,
+                updated_at REAL
+            )"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS meetings_state ON meetings (state)")
+        self.conn.commit()
+
+    def known_ids(self, meeting_ids):
+        """Return the subset of ``meeting_ids`` already in the index."""
+        meeting_ids = list(meeting_ids)
+        if not meeting_ids:
+            return set()
+        marks = ",".join("?" * len(meeting_ids))
+        with self.lock:
+            rows = self.conn.execute(f"SELECT id FROM meetings WHERE id IN ({marks})", meeting_ids)
+            return {row[0] for row in rows}
+
+    def add_listed(self, rows):
+        """Insert or refresh listed meetings without touching their state or paths."""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                """INSERT INTO meetings (id, created_at, name, video_path, json_path, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(id) DO UPDATE SET
+                       created_at = excluded.created_at,
+                       name = excluded.name""",
+                rows,
+            )
+
+    def pending_ids(self, video=True):
+        """Meeting IDs that still need work, newest first.
+
+        Completed meetings whose video file has since disappeared are
+        included again.
+        """
+        done_states = ("complete",) if video else ("complete", "transcript")
+        pending = []
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, state, video_path, json_path FROM meetings ORDER BY created_at DESC"
+            ).fetchall()
+        for meeting_id, state, video_path, json_path in rows:
+            if state not in done_states:
+                pending.append(meeting_id)
+            elif not os.path.exists(video_path if state == "complete" else json_path):
+                pending.append(meeting_id)
+        return pending
+
+    def record_job(self, job, video=True):
+        """Store the outcome of a batch job."""
+        meeting = job.get("meeting") or {}
+        if job["status"] == "done":
+            state = "complete" if video else "transcript"
+        else:
+            state = "failed"
+        with self.lock, self.conn:
+            self.conn.execute(
+                """UPDATE meetings SET state = ?, error = ?, updated_at = ?,
+                       video_path = COALESCE(?, video_path),
+                       json_path = COALESCE(?, json_path),
+                       transcript_paths = COALESCE(?, transcript_paths)
+                   WHERE id = ?""",
+                (
+                    state, job["error"], time_module.time(),
+                    meeting.get("output_file"), meeting.get("json_file"),
+                    json.dumps(meeting["transcript_files"]) if meeting.get("transcript_files") else None,
+                    job["meeting_id"],
+                ),
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+def fetch_meeting_page(session, token, page, limit=SYNC_PAGE_SIZE):
+    """Fetch one page of the account's meeting list."""
+    data = session.get(
+        MEETINGS_LIST_URL, params={"page": page, "limit": limit},
+        headers={"Authorization": token}, timeout=30,
+    )
+    if data.status_code == 401:
+        raise auth_error()
+    data.raise_for_status()
+    body = data.json()
+    if isinstance(body, list):
+        return body
+    for key in ("results", "meetings", "data", "items"):
+        if isinstance(body.get(key), list):
+            return body[key]
+    return []
+
+
+def sync_listing(index, session, config, full=False, max_pages=0):
+    """Page through the meeting list and record it in ``index``.
+
+    The list is newest first, so unless ``full`` is set paging stops at the
+    first page whose meetings are all already indexed. Returns
+    ``(listed, new)`` counts.
+    """
+    listed = new = 0
+    page = 1
+    while not max_pages or page <= max_pages:
+        items = fetch_meeting_page(session, config["token"], page)
+        rows = []
+        for item in items:
+            meeting_id = item.get("id") or item.get("_id")
+            if not meeting_id:
+                continue
+            name = item.get("name", "No name")
+            created_at = item.get("createdAt", datetime.now().isoformat())
+            filename, _ = build_filename(name, created_at)
+            filename += clip_suffix(config.get("clip"))
+            rows.append((
+                meeting_id, created_at, name,
+                os.path.join(config["output_dir"], filename + media_extension(config)),
+                os.path.join(config["output_dir"], f"{filename}.json"),
+                time_module.time(),
+            ))
+
+        known = index.known_ids(row[0] for row in rows)
+        index.add_listed(rows)
+        listed += len(rows)
+        new += len(rows) - len(known)
+
+        if len(items) < SYNC_PAGE_SIZE or (not full and len(known) == len(rows)):
+            break
+        page += 1
+    return listed, new
+
+
+def cmd_sync(args):
+    """Mirror the account's meetings, downloading only new or incomplete ones."""
+    config = get_config(args)
+    index_path = args.index_db or os.path.join(config["output_dir"], ".tldv-index.sqlite")
+    index = SyncIndex(index_path)
+    console.print()
+
+    try:
+        step(1, 2, "[bold]Listing meetings...[/bold]", "cyan")
+        with console.status("  [dim]Paging through the meeting list...[/dim]", spinner="dots"):
+            with make_session() as session:
+                listed, new = sync_listing(index, session, config, args.full, args.max_pages)
+        step_done(f"{listed} meetings listed, [bold]{new}[/bold] new  [dim]({index_path})[/dim]")
+
+        pending = index.pending_ids(config["video"])
+        step(2, 2, f"[bold]Syncing {len(pending)} new or incomplete meetings...[/bold]", "cyan")
+        if not pending or config["dry_run"]:
+            if pending:
+                step_warn("Dry run: nothing downloaded")
+            else:
+                step_done("Everything is up to date")
+            console.print()
+            return
+
+        console.print()
+        start_time = time_module.time()
+        jobs = run_batch(pending, config, on_finished=lambda job: index.record_job(job, config["video"]))
+        finish_post(config)
+        elapsed = time_module.time() - start_time
+        publish_run_metrics(config, [job["metrics"] for job in jobs], elapsed)
+        if show_batch_summary(jobs, config, elapsed):
+            sys.exit(1)
+
+    except MeetingError as e:
+        show_error(e.title, e.message, e.detail)
+        sys.exit(1)
+    except requests.RequestException as e:
+        show_error("Error", "Could not list meetings", str(e))
+        sys.exit(1)
+    finally:
+        index.close()
+
+
+# ── Transcript search ─────────────────────────────────────────────────────────
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Lower-case word tokens of ``text``."""
+    return _WORD_RE.findall(text.lower())
+
+
+class SearchIndex:
+    """Inverted index over the transcripts in saved watch-page JSON files.
+
+    Every transcript cue is stored once with its meeting, speaker and start
+    time, and ``postings`` maps each distinct term to the cues containing it.
+    Files are only re-read when their size or modification time changes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE NOT NULL,
+                mtime_ns INTEGER,
+                size INTEGER,
+                meeting_id TEXT,
+                name TEXT,
+                created_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS cues (
+                id INTEGER PRIMARY KEY,
+                document_id INTEGER NOT NULL,
+                start REAL,
+                speaker TEXT,
+                text TEXT
+            );
+            CREATE INDEX IF NOT EXISTS cues_document ON cues (document_id);
+            CREATE TABLE IF NOT EXISTS terms (
+                id INTEGER PRIMARY KEY,
+                term TEXT UNIQUE NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term_id INTEGER NOT NULL,
+                cue_id INTEGER NOT NULL,
+                PRIMARY KEY (term_id, cue_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_cue ON postings (cue_id);"""
+        )
+        self.conn.commit()
+
+    def update(self, paths):
+        """Index new or changed ``paths`` and drop documents whose file is gone.
+
+        Unchanged files cost one ``stat``. Returns ``(indexed, removed)``.
+        """
+        known = {
+            path: (document_id, mtime_ns, size)
+            for document_id, path, mtime_ns, size in self.conn.execute(
+                "SELECT id, path, mtime_ns, size FROM documents")
+        }
+        term_ids = {}
+        indexed = 0
+        with self.conn:
+            for path in paths:
+                path = os.path.abspath(path)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entry = known.pop(path, None)
+                if entry and entry[1:] == (st.st_mtime_ns, st.st_size):
+                    continue
+                if entry:
+                    self._remove(entry[0])
+                self._add(path, st, term_ids)
+                indexed += 1
+            for document_id, _, _ in known.values():
+                self._remove(document_id)
+        return indexed, len(known)
+
+    def _add(self, path, st, term_ids):
+        try:
+            with open(path, encoding="utf-8") as f:
+                response = json.load(f)
+        except (OSError, ValueError):
+            response = None
+        meeting = response.get("meeting") if isinstance(response, dict) else None
+        if not isinstance(meeting, dict):
+            # Not a watch-page response; remember it so it is not re-read.
+            self.conn.execute(
+                "INSERT INTO documents (path, mtime_ns, size) VALUES (?, ?, ?)", (path, st.st_mtime_ns, st.st_size))
+            return
+        meeting_id = meeting.get("id") or meeting.get("_id") or os.path.splitext(os.path.basename(path))[0]
+        document_id = self.conn.execute(
+            """INSERT INTO documents (path, mtime_ns, size, meeting_id, name, created_at)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (path, st.st_mtime_ns, st.st_size, meeting_id, meeting.get("name", "No name"), meeting.get("createdAt")),
+        ).lastrowid
+        transcript_data = ((response.get("video") or {}).get("transcript") or {}).get("data") or []
+        # Cue ids are assigned here so each file takes two batched inserts.
+        cue_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM cues").fetchone()[0]
+        cues, postings = [], []
+        for start, _, speaker, text in iter_transcript_cues(transcript_data):
+            cue_id += 1
+            cues.append((cue_id, document_id, start, speaker, text))
+            postings.extend((self._term_id(term, term_ids), cue_id) for term in set(tokenize(text)))
+        self.conn.executemany("INSERT INTO cues (id, document_id, start, speaker, text) VALUES (?, ?, ?, ?, ?)", cues)
+        self.conn.executemany("INSERT INTO postings (term_id, cue_id) VALUES (?, ?)", postings)
+
+    def _term_id(self, term, cache):
+        term_id = cache.get(term)
+        if term_id is None:
+            row = self.conn.execute("SELECT id FROM terms WHERE term = ?", (term,)).fetchone()
+            term_id = row[0] if row else self.conn.execute("INSERT INTO terms (term) VALUES (?)", (term,)).lastrowid
+            cache[term] = term_id
+        return term_id
+
+    def _remove(self, document_id):
+        self.conn.execute(
+            "DELETE FROM postings WHERE cue_id IN (SELECT id FROM cues WHERE document_id = ?)", (document_id,))
+        self.conn.execute("DELETE FROM cues WHERE document_id = ?", (document_id,))
+        self.conn.execute("DELETE FROM documents WHERE id = ?", (document_id,))
+
+    def search(self, query, speaker=None, limit=20):
+        """Cues containing every word of ``query``, newest meeting first.
+
+        A word ending in ``*`` matches as a prefix, and text in double quotes
+        must also appear as a phrase. Returns
+        ``(meeting_id, name, created_at, start, speaker, text)`` tuples.
+        """
+        phrases = [phrase.lower() for phrase in re.findall(r'"([^"]+)"', query)]
+        words = re.findall(r"\w+\*?", query.lower())
+        if not words:
+            return []
+        subqueries, params = [], []
+        for word in dict.fromkeys(words):
+            if word.endswith("*"):
+                subqueries.append("SELECT cue_id FROM postings JOIN terms ON terms.id = term_id "
+                                  "WHERE term >= ? AND term < ?")
+                params += [word[:-1], word[:-1] + "\uffff"]
+            else:
+                subqueries.append("SELECT cue_id FROM postings JOIN terms ON terms.id = term_id WHERE term = ?")
+                params.append(word)
+        sql = (
+            "SELECT d.meeting_id, d.name, d.created_at, c.start, c.speaker, c.text "
+            "FROM cues c JOIN documents d ON d.id = c.document_id "
+            f"WHERE c.id IN ({' INTERSECT '.join(subqueries)})"
+        )
+        if speaker:
+            sql += " AND c.speaker LIKE ?"
+            params.append(f"%{speaker}%")
+        sql += " ORDER BY d.created_at DESC, c.start"
+
+        results = []
+        seen = set()
+        for row in self.conn.execute(sql, params):
+            text = row[5].lower()
+            # Clips save the same meeting's metadata again under another name.
+            key = (row[0], row[3], text)
+            if key in seen or any(phrase not in text for phrase in phrases):
+                continue
+            seen.add(key)
+            results.append(row)
+            if len(results) >= limit:
+                break
+        return results
+
+    def stats(self):
+        """``(meetings, cues, terms)`` counts."""
+        return tuple(
+            self.conn.execute(sql).fetchone()[0] for sql in (
+                "SELECT COUNT(*) FROM documents WHERE meeting_id IS NOT NULL",
+                "SELECT COUNT(*) FROM cues",
+                "SELECT COUNT(*) FROM terms",
+            )
+        )
+
+    def close(self):
+        self.conn.close()
+
+
+def transcript_json_files(root):
+    """Saved watch-page JSON files under ``root``, skipping hidden and staging directories."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".") and not d.endswith(".parts")]
+        for filename in filenames:
+            if filename.endswith(".json") and not filename.endswith(".manifest.json"):
+                yield os.path.join(dirpath, filename)
+
+
+def search_index_path(args):
+    return args.index_db or os.path.join(args.output_dir, ".tldv-search.sqlite")
+
+
+def cmd_index(args):
+    """Build or incrementally update the transcript search index."""
+    if not os.path.isdir(args.output_dir):
+        show_error("Error", f"No such directory: {args.output_dir}")
+        sys.exit(1)
+    index_path = search_index_path(args)
+    index = SearchIndex(index_path)
+    console.print()
+    try:
+        start_time = time_module.time()
+        with console.status("  [dim]Indexing transcripts...[/dim]", spinner="dots"):
+            indexed, removed = index.update(transcript_json_files(args.output_dir))
+        meetings, cues, terms = index.stats()
+        step_done(f"{indexed} files indexed, {removed} removed in "
+                  f"{time_module.time() - start_time:.1f}s  [dim]({index_path})[/dim]")
+        step_done(f"[bold]{meetings}[/bold] meetings, {cues} transcript cues, {terms} distinct words")
+        console.print()
+    finally:
+        index.close()
+
+
+def cmd_search(args):
+    """Print transcript cues matching a query from the search index."""
+    index_path = search_index_path(args)
+    if not os.path.exists(index_path):
+        show_error("Error", f"No search index at {index_path}",
+                   f"Build it first: python tldv.py index -o {args.output_dir}")
+        sys.exit(1)
+    index = SearchIndex(index_path)
+    query = " ".join(args.query)
+    try:
+        start_time = time_module.perf_counter()
+        results = index.search(query, args.speaker, args.limit)
+        elapsed_ms = (time_module.perf_counter() - start_time) * 1000
+    finally:
+        index.close()
+
+    console.print()
+    if not results:
+        step_warn(f"No matches for [bold]{query}[/bold]  [dim]({elapsed_ms:.1f} ms)[/dim]")
+        console.print()
+        return
+
+    table = Table(box=box.SIMPLE_HEAD, show_edge=False, padding=(0, 1), expand=True)
+    table.add_column("Date", style="dim", no_wrap=True, header_style="dim bold")
+    table.add_column("Meeting", style="bold white", header_style="dim bold", ratio=1)
+    table.add_column("Time", style="cyan", justify="right", no_wrap=True, header_style="dim bold")
+    table.add_column("Speaker", style="magenta", header_style="dim bold")
+    table.add_column("Text", header_style="dim bold", ratio=3)
+    words = [word.rstrip("*") for word in re.findall(r"\w+\*?", query.lower())]
+    for meeting_id, name, created_at, start, speaker, text in results:
+        line = Text(text)
+        line.highlight_words(words, style="bold yellow", case_sensitive=False)
+        table.add_row((created_at or "")[:10], f"{name}\n[dim]{meeting_id}[/dim]", format_time_short(start),
+                      speaker, line)
+    console.print(table)
+    console.print(f"  [dim]{len(results)} matches in {elapsed_ms:.1f} ms[/dim]")
+    console.print()
+
+
+# ── Service mode ──────────────────────────────────────────────────────────────
+
+SERVICE_PORT = 8765
+
+
+class JobQueue:
+    """Persistent FIFO of service jobs in SQLite.
+
+    ``state`` moves from ``queued`` to ``running`` to ``done`` or ``failed``;
+    queued jobs can be ``cancelled``. Jobs left ``running`` by a previous
+    process are queued again when the queue is opened.
+    """
+
+    COLUMNS = ("id", "meeting_id", "options", "state", "name", "output_file", "files", "error",
+               "attempts", "created_at", "started_at", "finished_at")
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                meeting_id TEXT NOT NULL,
+                options TEXT NOT NULL DEFAULT '{}',
+                state TEXT NOT NULL DEFAULT 'queued',
+                name TEXT,
+                output_file TEXT,
+                files TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL,
+                started_at REAL,
+                finished_at REAL
+            )"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id)")
+        self.conn.execute("UPDATE jobs SET state = 'queued' WHERE state = 'running'")
+        self.conn.commit()
+
+    def _job(self, row):
+        job = dict(zip(self.COLUMNS, row))
+        job["options"] = json.loads(job["options"])
+        job["files"] = json.loads(job["files"]) if job["files"] else []
+        return job
+
+    def submit(self, meeting_id, options):
+        with self.lock, self.conn:
+            job_id = self.conn.execute(
+                "INSERT INTO jobs (meeting_id, options, created_at) VALUES (?, ?, ?)",
+                (meeting_id, json.dumps(options), time_module.time()),
+            ).lastrowid
+        return self.get(job_id)
+
+    def claim(self):
+        """Mark the oldest queued job ``running`` and return it, or None."""
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT id FROM jobs WHERE state = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                self.wakeup.clear()
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET state = 'running', attempts = attempts + 1, started_at = ?, error = NULL "
+                "WHERE id = ?", (time_module.time(), row[0]))
+        return self.get(row[0])
+
+    def update(self, job_id, **fields):
+        """Set columns of a job; ``files`` is stored as JSON."""
+        if "files" in fields:
+            fields["files"] = json.dumps(fields["files"])
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self.lock, self.conn:
+            self.conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", list(fields.values()) + [job_id])
+
+    def cancel(self, job_id):
+        """Cancel a queued job; returns False if it has already started."""
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET state = 'cancelled', finished_at = ? WHERE id = ? AND state = 'queued'",
+                (time_module.time(), job_id))
+        return cursor.rowcount > 0
+
+    def get(self, job_id):
+        with self.lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def list(self, state=None, limit=100):
+        """Most recent jobs first, optionally only those in ``state``."""
+        sql = f"SELECT {', '.join(self.COLUMNS)} FROM jobs"
+        params = []
+        if state:
+            sql += " WHERE state = ?"
+            params.append(state)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [self._job(row) for row in rows]
+
+    def counts(self):
+        with self.lock:
+            return dict(self.conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+    def close(self):
+        self.conn.close()
+
+
+def job_overrides(options):
+    """Validate the per-job ``options`` of an API request into config overrides.
+
+    Accepts ``audio_only``, ``max_height``, ``bitrate``, ``start``, ``end``,
+    ``transcript_only`` and ``force``; raises ``ValueError`` for anything else.
+    """
+    unknown = set(options) - {"audio_only", "max_height", "bitrate", "start", "end", "transcript_only", "force"}
+    if unknown:
+        raise ValueError(f"unknown option(s): {', '.join(sorted(unknown))}")
+    overrides = {}
+    try:
+        if "audio_only" in options:
+            overrides["audio_only"] = bool(options["audio_only"])
+        if "max_height" in options:
+            overrides["max_height"] = int(options["max_height"]) or None
+        if "bitrate" in options:
+            overrides["max_bitrate"] = parse_bitrate(str(options["bitrate"])) or None
+        if options.get("transcript_only"):
+            overrides["video"] = False
+        if "force" in options:
+            overrides["force"] = bool(options["force"])
+        if "start" in options or "end" in options:
+            start = parse_clock(str(options["start"])) if options.get("start") is not None else 0.0
+            end = parse_clock(str(options["end"])) if options.get("end") is not None else None
+            if end is not None and end <= start:
+                raise ValueError("end must be later than start")
+            overrides["clip"] = (start, end)
+    except argparse.ArgumentTypeError as e:
+        raise ValueError(str(e))
+    return overrides
+
+
+class DownloadService:
+    """Worker threads that drain a :class:`JobQueue` through the meeting pipeline.
+
+    All jobs share one HTTP session, so connections (and TLS sessions) to the
+    API and the CDN are reused. Live progress is kept in memory and merged
+    into job dicts by :meth:`job`.
+    """
+
+    def __init__(self, config, queue):
+        self.config = config
+        self.queue = queue
+        self.session = make_session(config["workers"] * max(2, config["segment_workers"]))
+        self.progress = {}
+        self.stopping = threading.Event()
+        self.threads = []
+
+    def start(self):
+        for number in range(self.config["workers"]):
+            thread = threading.Thread(target=self.worker, name=f"tldv-service-{number}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        self.stopping.set()
+        self.queue.wakeup.set()
+
+    def job(self, job_id):
+        job = self.queue.get(job_id)
+        if job:
+            self.attach_progress(job)
+        return job
+
+    def attach_progress(self, job):
+        """Add the live progress of a running job to its queue record."""
+        # One lookup: a worker may drop the entry at any moment.
+        progress = self.progress.get(job["id"])
+        if progress is not None:
+            job["progress"] = dict(progress)
+
+    def worker(self):
+        while not self.stopping.is_set():
+            job = self.queue.claim()
+            if job is None:
+                self.queue.wakeup.wait(1.0)
+                continue
+            try:
+                self.run_job(job)
+            except Exception as e:
+                # Never lose a worker to one bad job.
+                self.fail_job(job, str(e) or type(e).__name__)
+
+    def fail_job(self, job, error):
+        """Mark a job failed after :meth:`run_job` raised."""
+        self.progress.pop(job["id"], None)
+        try:
+            self.queue.update(job["id"], state="failed", error=error, finished_at=time_module.time())
+        except Exception:
+            pass
+        log_job(job, f"[red]failed:[/red] {error}")
+
+    def run_job(self, job):
+        """Fetch metadata, save files and download one meeting, as ``main`` does."""
+        job_id = job["id"]
+        config = dict(self.config)
+        progress = self.progress[job_id] = {"phase": "metadata", "pct": 0.0, "speed": "--.-x",
+                                            "dl_speed": "--", "eta": "--:--"}
+        metrics = new_metrics(job["meeting_id"])
+        on_retry = retry_counter(metrics)
+        meeting = None
+        existing = None
+        error = None
+        log_job(job, "started")
+
+        try:
+            config.update(job_overrides(job["options"]))
+            meeting = timed(metrics, "metadata", prepare_meeting, job["meeting_id"], config, self.session, on_retry)
+            self.queue.update(job_id, name=meeting["name"],
+                              output_file=meeting["output_file"] if config["video"] else meeting["json_file"])
+            progress["phase"] = "duration"
+            meeting["duration"], meeting["duration_source"] = timed(
+                metrics, "duration", resolve_duration, meeting, config, self.session, on_retry)
+            existing = find_existing(meeting, config)
+            if existing:
+                files = [existing, meeting["json_file"]] + meeting["transcript_files"]
+            else:
+                progress["phase"] = "saving"
+                files = [meeting["json_file"]] + save_meeting_files(meeting, config, metrics)
+
+            if config["video"] and not existing:
+                if not meeting["duration"]:
+                    meeting["duration"] = timed(metrics, "probe", get_duration, config["ffprobe"], meeting["source"])
+                    meeting["duration_source"] = "ffprobe"
+                progress["phase"] = "downloading"
+                returncode, _ = timed(
+                    metrics, "download", run_download, config, meeting["source"], meeting["output_file"],
+                    clip_length(meeting["clip"], meeting["duration"]), progress.update, self.session,
+                    meeting.get("playlist"), on_retry,
+                )
+                if returncode != 0 or not output_ready(config, meeting["output_file"]):
+                    raise MeetingError("Error", f"ffmpeg exited with code {returncode}")
+                files.insert(0, config.get("sink") or meeting["output_file"])
+        except MeetingError as e:
+            error = e.message
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        finally:
+            del self.progress[job_id]
+
+        if error and self.stopping.is_set():
+            # Interrupted by shutdown: leave it running so the next start queues it again.
+            return
+        record_metrics(config, finish_metrics(metrics, meeting, error))
+        if error:
+            self.queue.update(job_id, state="failed", error=error, finished_at=time_module.time())
+            log_job(job, f"[red]failed:[/red] {error}")
+        elif existing:
+            self.queue.update(job_id, state="done", files=files, finished_at=time_module.time())
+            log_job(job, "[green]already saved[/green]")
+        else:
+            self.queue.update(job_id, state="done", files=files, finished_at=time_module.time())
+            log_job(job, "[green]done[/green]")
+            if config["video"]:
+                record_output(config, meeting)
+                submit_post(config, meeting, lambda results: self.post_done(job, files, results))
+
+    def post_done(self, job, files, results):
+        """Add the files the ``--post`` tasks created to a finished job."""
+        failed = [result["task"] for result in results if result["error"]]
+        outputs = [path for _, path in post_files(results, files[0])]
+        self.queue.update(job["id"], files=files + outputs)
+        if failed:
+            log_job(job, f"[yellow]post-processing failed:[/yellow] {', '.join(failed)}")
+        else:
+            log_job(job, f"post-processing done ({len(results)} tasks)")
+
+
+def log_job(job, message):
+    stamp = datetime.now().strftime("%H:%M:%S")
+    console.print(f"  [dim]{stamp}[/dim]  job [bold]#{job['id']}[/bold] {job['meeting_id']}  {message}")
+
+
+class ServiceHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """JSON API of ``serve``: ``/health``, ``/jobs`` and ``/jobs/<id>``."""
+
+    server_version = "tldv-serve"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def route(self):
+        """``(path parts, query dict)`` of the request."""
+        url = urlparse(self.path)
+        return [part for part in url.path.split("/") if part], dict(parse_qsl(url.query))
+
+    def job_id(self, parts):
+        if len(parts) == 2 and parts[0] == "jobs" and parts[1].isdigit():
+            return int(parts[1])
+        return None
+
+    def do_GET(self):
+        service = self.server.service
+        parts, query = self.route()
+        if parts == ["health"]:
+            counts = service.queue.counts()
+            return self.send_json(200, {"status": "ok", "workers": sum(thread.is_alive() for thread in service.threads), "jobs": counts})
+        if parts == ["jobs"]:
+            try:
+                limit = int(query.get("limit", 100))
+            except ValueError:
+                return self.send_json(400, {"error": "limit must be a number"})
+            jobs = service.queue.list(query.get("state"), limit)
+            for job in jobs:
+                service.attach_progress(job)
+            return self.send_json(200, {"jobs": jobs})
+        job_id = self.job_id(parts)
+        job = service.job(job_id) if job_id is not None else None
+        if job is None:
+            return self.send_json(404, {"error": "not found"})
+        return self.send_json(200, job)
+
+    def do_POST(self):
+        service = self.server.service
+        parts, _ = self.route()
+        if parts != ["jobs"]:
+            return self.send_json(404, {"error": "not found"})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            meetings = body.get("meetings") or [body["meeting"]]
+            options = body.get("options") or {}
+            if not isinstance(meetings, list) or not isinstance(options, dict):
+                raise ValueError("'meetings' must be a list and 'options' an object")
+            job_overrides(options)
+        except KeyError:
+            return self.send_json(400, {"error": "give 'meeting' or 'meetings'"})
+        except (ValueError, AttributeError) as e:
+            return self.send_json(400, {"error": str(e) or "invalid request body"})
+        jobs = [service.queue.submit(extract_meeting_id(str(meeting)), options) for meeting in meetings]
+        for job in jobs:
+            log_job(job, "[dim]queued[/dim]")
+        service.queue.wakeup.set()
+        return self.send_json(202, {"jobs": jobs})
+
+    def do_DELETE(self):
+        service = self.server.service
+        job_id = self.job_id(self.route()[0])
+        job = service.queue.get(job_id) if job_id is not None else None
+        if job is None:
+            return self.send_json(404, {"error": "not found"})
+        if not service.queue.cancel(job_id):
+            return self.send_json(409, {"error": f"job is {job['state']}"})
+        return self.send_json(200, service.queue.get(job_id))
+
+
+def cmd_serve(args):
+    """Run the HTTP API and download workers until interrupted."""
+    config = get_config(args)
+    queue_path = args.queue_db or os.path.join(config["output_dir"], ".tldv-queue.sqlite")
+    job_queue = JobQueue(queue_path)
+    service = DownloadService(config, job_queue)
+    try:
+        server = ServiceHTTPServer((args.host, args.port), ServiceHandler)
+    except OSError as e:
+        show_error("Error", f"Cannot listen on {args.host}:{args.port}", str(e))
+        sys.exit(1)
+    server.service = service
+    service.start()
+
+    counts = job_queue.counts()
+    console.print()
+    console.print(Panel(
+        f"[bold]http://{args.host}:{server.server_address[1]}[/bold]\n"
+        f"[dim]{config['workers']} workers, {config['engine']} engine, "
+        f"{counts.get('queued', 0)} queued jobs  ({queue_path})[/dim]",
+        border_style="bright_blue", box=box.HEAVY,
+        title="[bold bright_blue] Service Running [/bold bright_blue]",
+        title_align="left", padding=(0, 1),
+    ))
+    console.print()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        service.stop()
+        console.print("\n  [dim]Stopping; unfinished jobs resume on the next start.[/dim]")
+    finally:
+        service.stop()
+        server.server_close()
+        if config.get("post"):
+            config["post"].close()
+
+
+# ── CLI argument parsing ──────────────────────────────────────────────────────
+
+
+def add_download_args(parser, defaults=True):
+    """Options shared by single/batch downloads and the ``sync`` and ``serve`` commands.
+
+    Subcommands pass ``defaults=False``: their copies of the options then have
+    no default, so a value given before the command name is kept rather than
+    reset.
+    """
+    if not defaults:
+        add_argument = parser.add_argument
+
+        def add_without_default(*names, **kwargs):
+            return add_argument(*names, **{**kwargs, "default": argparse.SUPPRESS})
+
+        parser = SimpleNamespace(add_argument=add_without_default)
+    parser.add_argument("-t", "--token", help="Authorization token (Bearer token from browser dev tools)")
+    parser.add_argument("-o", "--output-dir", default=".", help="Directory to save files (default: current directory)")
+    parser.add_argument("-j", "--workers", type=int, default=3, help="Concurrent meetings in batch mode (default: 3)")
+    parser.add_argument("--engine", choices=["ffmpeg", "native", "async"], default="ffmpeg",
+                        help="ffmpeg: let ffmpeg pull the stream; native: fetch HLS segments in parallel, then remux; "
+                             "async: like native, but metadata, segments and ffmpeg all run on one asyncio event loop")
+    parser.add_argument("--segment-workers", type=int, default=16,
+                        help="Maximum parallel segment downloads per meeting with --engine native/async; "
+                             "the actual number adapts to the network (default: 16)")
+    parser.add_argument("--fixed-concurrency", action="store_true",
+                        help="Always run --segment-workers parallel segment downloads instead of adapting")
+    parser.add_argument("--retries", type=int, default=4,
+                        help="Retries for failed requests and ffmpeg runs, with jittered exponential backoff (default: 4)")
+    parser.add_argument("--max-rate", type=parse_rate, default=0, metavar="RATE",
+                        help="Cap total download speed in bytes/s, e.g. 500K or 20M, shared fairly between "
+                             "active downloads (implies --engine native)")
+    parser.add_argument("--max-host-connections", type=int, default=0, metavar="N",
+                        help="Maximum concurrent segment connections per host across all downloads (0: no limit)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Keep a segment manifest next to the output and only fetch what is missing (implies --engine native)")
+    parser.add_argument("--sink", metavar="TARGET",
+                        help="Stream the video to TARGET instead of saving it: '-' for stdout, file:PATH, or an "
+                             "http(s):// URL to PUT to; {filename} is replaced by the output file name "
+                             "(uses --engine ffmpeg)")
+    parser.add_argument("--stream-format", choices=sorted(STREAM_FORMATS), default="mp4",
+                        help="Container for --sink: fragmented mp4 or MPEG-TS (default: mp4)")
+    parser.add_argument("--audio-only", action="store_true",
+                        help="Download only the audio track, as .m4a (uses a separate audio rendition when there is one)")
+    parser.add_argument("--max-height", type=int, default=0, metavar="PIXELS",
+                        help="Pick the best HLS variant no taller than PIXELS, e.g. 720")
+    parser.add_argument("--bitrate", type=parse_bitrate, default=0, metavar="RATE",
+                        help="Pick the best HLS variant of at most RATE bits/s, e.g. 2.5M or 800k")
+    parser.add_argument("--start", type=parse_clock, metavar="TIME",
+                        help="Download only from TIME (HH:MM:SS, MM:SS or seconds); only the needed segments are fetched")
+    parser.add_argument("--end", type=parse_clock, metavar="TIME", help="Download only up to TIME")
+    parser.add_argument("--around", type=parse_clock, metavar="TIME",
+                        help="Download a clip centred on TIME, --pad seconds either side")
+    parser.add_argument("--pad", type=float, default=60, metavar="SECONDS",
+                        help="Seconds before and after --around to include (default: 60)")
+    parser.add_argument("--transcript-formats", type=parse_transcript_formats, default=["txt"],
+                        help="Comma-separated transcript exports: txt, srt, vtt, jsonl (default: txt)")
+    parser.add_argument("--transcript-only", action="store_true",
+                        help="Save metadata and transcript but skip probing and downloading the video")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Only fetch and show meeting metadata; write nothing")
+    parser.add_argument("--cache-dir", default=default_cache_dir(),
+                        help=f"Directory for cached watch-page responses (default: {default_cache_dir()})")
+    parser.add_argument("--cache-ttl", type=float, default=3600,
+                        help="Seconds before a cached watch-page response is revalidated (default: 3600)")
+    parser.add_argument("--cache-max-mb", type=float, default=50,
+                        help="Maximum metadata cache size before LRU eviction (default: 50)")
+    parser.add_argument("--no-cache", action="store_true", help="Neither read nor write the metadata cache")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Ignore cached metadata and fetch it again (the cache is still updated)")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="Append one JSON record of phase timings per meeting to PATH (JSON Lines)")
+    parser.add_argument("--metrics-textfile", metavar="PATH",
+                        help="Write run totals in Prometheus text format to PATH (node_exporter textfile collector)")
+    parser.add_argument("--force", action="store_true",
+                        help="Download again even when a complete, unchanged copy is already saved")
+    parser.add_argument("--post", type=parse_post_tasks, default=[], metavar="TASKS",
+                        help="Comma-separated tasks to run on each finished download, on a process pool: "
+                             f"{', '.join(POST_TASKS)}")
+    parser.add_argument("--post-workers", type=int, default=0, metavar="N",
+                        help="Processes for --post tasks (default: 0, one per available core)")
+    parser.add_argument("--headless", action="store_true",
+                        help="No banner, panels or live display: print plain progress lines, for cron and CI")
+    parser.add_argument("--progress-format", choices=["lines", "json"], default="lines",
+                        help="With --headless, print text lines or one JSON event per line (default: lines)")
+    parser.add_argument("--progress-interval", type=float, default=10, metavar="SECONDS",
+                        help="With --headless, seconds between progress lines (default: 10)")
+    parser.add_argument("--ffmpeg", help="Path to ffmpeg binary (auto-detected if omitted)")
+    parser.add_argument("--ffprobe", help="Path to ffprobe binary (auto-detected if omitted)")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="TLDV Video Downloader by Aliza Ali — download meeting recordings with transcripts.",
+        epilog="Example: python tldv.py --url https://tldv.io/app/meetings/abc123 --token 'Bearer eyJ...'",
+    )
+    parser.add_argument("-u", "--url", action="append", help="TLDV meeting URL (repeat for batch downloads)")
+    parser.add_argument("--urls-file", help="File with one meeting URL or ID per line (batch mode)")
+    parser.add_argument("--list-variants", action="store_true",
+                        help="Show the renditions available for each meeting, marking the selected ones, and exit")
+    add_download_args(parser)
+
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    sync_parser = commands.add_parser(
+        "sync", help="Mirror every meeting the account can see, downloading only new or incomplete ones",
+        description="Page through the meeting list, record it in a local SQLite index and "
+                    "download only meetings that are new or incomplete.",
+    )
+    add_download_args(sync_parser, defaults=False)
+    sync_parser.add_argument("--index-db", help="SQLite index path (default: <output-dir>/.tldv-index.sqlite)")
+    sync_parser.add_argument("--full", action="store_true",
+                             help="List every page instead of stopping at the first fully archived page")
+    sync_parser.add_argument("--max-pages", type=int, default=0, help="Stop listing after this many pages (0: no limit)")
+
+    serve_parser = commands.add_parser(
+        "serve", help="Run a local HTTP API that queues and downloads meetings",
+        description="Accept meeting IDs over HTTP, keep them in a persistent job queue and download them "
+                    "with long-lived workers and shared connection pools.",
+    )
+    add_download_args(serve_parser, defaults=False)
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    serve_parser.add_argument("--port", type=int, default=SERVICE_PORT,
+                              help=f"Port to listen on (default: {SERVICE_PORT})")
+    serve_parser.add_argument("--queue-db", help="SQLite job queue path (default: <output-dir>/.tldv-queue.sqlite)")
+
+    index_parser = commands.add_parser(
+        "index", help="Build or update the full-text search index of saved transcripts",
+        description="Index the transcripts in the metadata JSON files under --output-dir. "
+                    "Only new or changed files are read.",
+    )
+    verify_parser = commands.add_parser(
+        "verify", help="Check saved videos for truncation or changes without decoding them",
+        description="Check every video saved under --output-dir in parallel: the MP4 index must be present, "
+                    "and size, duration and a sampled checksum must match what was recorded at download time.",
+    )
+    verify_parser.add_argument("-o", "--output-dir", default=".",
+                               help="Directory holding downloaded meetings (default: current directory)")
+    verify_parser.add_argument("-j", "--workers", type=int, default=8,
+                               help="Files checked in parallel (default: 8)")
+    verify_parser.add_argument("--full", action="store_true",
+                               help="Also hash whole files against .sha256 sidecars written by --post checksum")
+    verify_parser.add_argument("--headless", action="store_true", help="Plain output lines for cron and CI")
+    verify_parser.add_argument("--progress-format", choices=("lines", "json"), default="lines",
+                               help="With --headless: lines (default) or json, one event per line")
+    search_parser = commands.add_parser(
+        "search", help="Search saved transcripts by word, phrase or speaker",
+        description="Find transcript lines containing every query word, using the index built by 'index'.",
+    )
+    search_parser.add_argument("query", nargs="+",
+                               help='Words to find; end a word with * to match a prefix, quote a "phrase"')
+    search_parser.add_argument("--speaker", help="Only lines spoken by a speaker whose name contains this")
+    search_parser.add_argument("-n", "--limit", type=int, default=20, help="Maximum matches to show (default: 20)")
+    for command_parser in (index_parser, search_parser):
+        command_parser.add_argument("-o", "--output-dir", default=".",
+                                    help="Directory holding downloaded meetings (default: current directory)")
+        command_parser.add_argument("--index-db",
+                                    help="SQLite search index path (default: <output-dir>/.tldv-search.sqlite)")
+
+    return parser.parse_args()
+
+
+def parse_rate(value):
+    """argparse type for ``--max-rate``: bytes per second with an optional K/M/G suffix."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kmg]?)i?b?(?:/s)?\s*", value, re.IGNORECASE)
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid rate: {value!r} (use e.g. 500K, 20M or 1G)")
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** " kmg".index(unit.lower() or " "))
+
+
+def parse_clock(value):
+    """argparse type for clip times: ``HH:MM:SS``, ``MM:SS`` or seconds, with optional fractions."""
+    parts = value.strip().split(":")
+    try:
+        if len(parts) > 3 or not all(parts):
+            raise ValueError(value)
+        seconds = 0.0
+        for part in parts:
+            seconds = seconds * 60 + float(part)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid time: {value!r} (use HH:MM:SS, MM:SS or seconds)")
+    if seconds < 0:
+        raise argparse.ArgumentTypeError(f"invalid time: {value!r} (must not be negative)")
+    return seconds
+
+
+def parse_bitrate(value):
+    """argparse type for ``--bitrate``: bits per second with an optional k/M/G suffix."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kmg]?)(?:bps|b/s|bit/s)?\s*", value, re.IGNORECASE)
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid bitrate: {value!r} (use e.g. 800k or 2.5M)")
+    number, unit = match.groups()
+    return int(float(number) * 1000 ** " kmg".index(unit.lower() or " "))
+
+
+def parse_transcript_formats(value):
+    """argparse type for ``--transcript-formats``."""
+    formats = [fmt.strip().lower() for fmt in value.split(",") if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in TRANSCRIPT_SUFFIXES]
+    if unknown or not formats:
+        raise argparse.ArgumentTypeError(
+            f"unknown transcript format(s): {', '.join(unknown) or value!r} "
+            f"(choose from {', '.join(TRANSCRIPT_SUFFIXES)})"
+        )
+    return list(dict.fromkeys(formats))
+
+
+def parse_post_tasks(value):
+    """argparse type for ``--post``."""
+    tasks = [task.strip().lower() for task in value.split(",") if task.strip()]
+    unknown = [task for task in tasks if task not in POST_TASKS]
+    if unknown or not tasks:
+        raise argparse.ArgumentTypeError(
+            f"unknown post task(s): {', '.join(unknown) or value!r} (choose from {', '.join(POST_TASKS)})"
+        )
+    return [task for task in POST_TASKS if task in tasks]
+
+
+def read_urls_file(path):
+    """Read meeting URLs from a file, skipping blank lines and ``#`` comments."""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def get_config(args):
+    """Build config from CLI args → env vars → interactive prompts."""
+
+    # ── Meeting URLs ──────────────────────────────────────────────────────
+    urls = list(args.url or [])
+    if args.urls_file:
+        urls.extend(read_urls_file(args.urls_file))
+    if not urls and os.environ.get("TLDV_URL"):
+        urls.append(os.environ["TLDV_URL"])
+    if not urls and args.command is None and headless():
+        show_error("Error", "No meeting URL given", "Pass --url or --urls-file, or set TLDV_URL.")
+        sys.exit(1)
+    if not urls and args.command is None:
+        console.print("  [bold cyan]Enter meeting details[/bold cyan]")
+        console.print()
+        urls.append(Prompt.ask("  [cyan]Meeting URL[/cyan]"))
+
+    # ── Auth token ────────────────────────────────────────────────────────
+    token = args.token or os.environ.get("TLDV_TOKEN")
+    if not token and headless():
+        show_error("Error", "No token given", "Pass --token or set TLDV_TOKEN.")
+        sys.exit(1)
+    if not token:
+        console.print()
+        token = Prompt.ask("  [cyan]Bearer token[/cyan]")
+
+    token = token.strip()
+    if not token.lower().startswith("bearer "):
+        token = f"Bearer {token}"
+
+    # ── FFmpeg / FFprobe ──────────────────────────────────────────────────
+    ffmpeg_path = args.ffmpeg or os.environ.get("FFMPEG_PATH")
+    ffprobe_path = args.ffprobe or os.environ.get("FFPROBE_PATH")
+
+    if not ffmpeg_path:
+        ffmpeg_path, auto_ffprobe = find_ffmpeg()
+        if not ffprobe_path:
+            ffprobe_path = auto_ffprobe
+
+    if not ffmpeg_path and not (args.dry_run or args.transcript_only or args.list_variants):
+        console.print()
+        console.print(Panel(
+            "[bold red]FFmpeg not found![/bold red]\n\n"
+            "Install FFmpeg and make sure it's on your PATH:\n"
+            "  [cyan]Windows:[/cyan]  winget install ffmpeg\n"
+            "  [cyan]macOS:[/cyan]    brew install ffmpeg\n"
+            "  [cyan]Linux:[/cyan]    sudo apt install ffmpeg\n\n"
+            "Or provide the path with [bold]--ffmpeg /path/to/ffmpeg[/bold]",
+            border_style="red",
+            box=box.HEAVY,
+            title="[bold red] Missing Dependency [/bold red]",
+            title_align="left",
+        ))
+        sys.exit(1)
+
+    if not ffprobe_path:
+        ffprobe_path = ffmpeg_path
+
+    # ── Output directory ──────────────────────────────────────────────────
+    output_dir = args.output_dir
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+
+    # ── Engine ────────────────────────────────────────────────────────────
+    engine = args.engine
+    if args.sink:
+        # Only ffmpeg can write the remuxed stream to a pipe as it goes.
+        engine = "ffmpeg"
+    elif (args.resume or args.max_rate) and args.engine == "ffmpeg":
+        engine = "native"
+
+    # ── Clip range ────────────────────────────────────────────────────────
+    clip = None
+    if args.around is not None:
+        if args.start is not None or args.end is not None:
+            show_error("Error", "Use either --around or --start/--end, not both.")
+            sys.exit(1)
+        pad = max(0.0, args.pad)
+        clip = (max(0.0, args.around - pad), args.around + pad)
+    elif args.start is not None or args.end is not None:
+        clip = (args.start or 0.0, args.end)
+        if clip[1] is not None and clip[1] <= clip[0]:
+            show_error("Error", "--end must be later than --start.")
+            sys.exit(1)
+
+    # ── Streaming sink ────────────────────────────────────────────────────
+    if args.sink and args.post:
+        show_error("Error", "--post cannot be combined with --sink", "Post tasks need the downloaded file on disk.")
+        sys.exit(1)
+    if args.sink:
+        if args.resume or args.command == "sync":
+            show_error("Error", "--sink cannot be combined with --resume or sync",
+                       "Both rely on finished files in the output directory.")
+            sys.exit(1)
+        if is_stdout_sink(args.sink) and len(set(urls)) > 1:
+            show_error("Error", "Only one meeting can be streamed to stdout at a time.")
+            sys.exit(1)
+
+    # ── Metrics ───────────────────────────────────────────────────────────
+    if args.metrics_file:
+        try:
+            with open(args.metrics_file, "a", encoding="utf-8"):
+                pass
+        except OSError as e:
+            show_error("Error", f"Cannot write --metrics-file {args.metrics_file}", str(e))
+            sys.exit(1)
+
+    # ── Metadata cache ────────────────────────────────────────────────────
+    cache = None
+    if not args.no_cache:
+        cache = MetadataCache(args.cache_dir, ttl=args.cache_ttl, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+
+    return {
+        "urls": urls,
+        "token": token,
+        "ffmpeg": ffmpeg_path,
+        "ffprobe": ffprobe_path,
+        "output_dir": output_dir,
+        "workers": max(1, args.workers),
+        "engine": engine,
+        "resume": args.resume,
+        "cache": cache,
+        "refresh": args.refresh,
+        "dry_run": args.dry_run,
+        "transcript_formats": args.transcript_formats,
+        "video": not (args.transcript_only or args.dry_run),
+        "segment_workers": max(1, args.segment_workers),
+        "adaptive": not args.fixed_concurrency,
+        "retry": RetryPolicy(max(0, args.retries)),
+        "bandwidth": BandwidthScheduler(args.max_rate) if args.max_rate else None,
+        "hosts": HostLimiter(args.max_host_connections) if args.max_host_connections > 0 else None,
+        "max_host_connections": max(0, args.max_host_connections),
+        "metrics_file": args.metrics_file,
+        "metrics_textfile": args.metrics_textfile,
+        "audio_only": args.audio_only,
+        "max_height": max(0, args.max_height) or None,
+        "max_bitrate": args.bitrate or None,
+        "list_variants": args.list_variants,
+        "clip": clip,
+        "sink": args.sink,
+        "stream_format": args.stream_format,
+        "progress_interval": max(0.0, args.progress_interval),
+        "force": args.force,
+        "post": PostProcessor(args.post, ffmpeg_path, max(0, args.post_workers))
+        if args.post and not (args.transcript_only or args.dry_run) else None,
+    }
+
+
+# ── Main ──────────────────────────────────────────────────────────────────────
+
+
+def main():
+    args = parse_args()
+    if getattr(args, "headless", False):
+        enable_headless(args.progress_format == "json")
+    if is_stdout_sink(getattr(args, "sink", None)):
+        # stdout carries the video, so everything else goes to stderr.
+        console.stderr = True
+    if not headless():
+        show_banner()
+    if args.command == "sync":
+        cmd_sync(args)
+        return
+    if args.command == "serve":
+        cmd_serve(args)
+        return
+    if args.command == "index":
+        cmd_index(args)
+        return
+    if args.command == "search":
+        cmd_search(args)
+        return
+    if args.command == "verify":
+        cmd_verify(args)
+        return
+
+    config = get_config(args)
+
+    meeting_ids = list(dict.fromkeys(extract_meeting_id(url) for url in config["urls"]))
+    console.print()
+
+    if config["list_variants"]:
+        if list_variants(meeting_ids, config):
+            sys.exit(1)
+        return
+
+    if len(meeting_ids) > 1:
+        console.print(f"  [bold cyan]Batch mode:[/bold cyan] {len(meeting_ids)} meetings, "
+                      f"{config['workers']} workers")
+        console.print()
+        start_time = time_module.time()
+        jobs = run_batch(meeting_ids, config)
+        finish_post(config)
+        elapsed = time_module.time() - start_time
+        publish_run_metrics(config, [job["metrics"] for job in jobs], elapsed)
+        if show_batch_summary(jobs, config, elapsed):
+            sys.exit(1)
+        return
+
+    meeting_id = meeting_ids[0]
+    meeting = None
+    total_steps = 1 if config["dry_run"] else 3 if config["video"] else 2
+    media_kind = "Audio" if config["audio_only"] else "Video"
+    metrics = new_metrics(meeting_id)
+    error = None
+    start_time = time_module.time()
+
+    try:
+        # ── Step 1: Fetch metadata ────────────────────────────────────────
+        step(1, total_steps, "[bold]Fetching meeting metadata...[/bold]", "cyan")
+
+        with console.status("  [dim]Connecting to TLDV servers...[/dim]", spinner="dots"):
+            meeting = timed(metrics, "metadata", prepare_meeting, meeting_id, config, None, retry_counter(metrics))
+
+        output_file = meeting["output_file"]
+        display_date = meeting["date"].strftime("%b %d, %Y  %I:%M %p")
+
+        # Duration from metadata or the playlist; ffprobe only as a background fallback
+        with console.status("  [dim]Resolving video duration...[/dim]", spinner="dots"):
+            total_duration, meeting["duration_source"] = timed(
+                metrics, "duration", resolve_duration, meeting, config, None, retry_counter(metrics))
+        meeting["duration"] = total_duration
+        existing = find_existing(meeting, config)
+        probe = None
+        if config["video"] and not total_duration and not existing:
+            probe = start_duration_probe(config["ffprobe"], meeting["source"], metrics)
+
+        if meeting["from_cache"]:
+            step_done("Metadata loaded from cache")
+        else:
+            step_done("Metadata fetched successfully")
+
+        # ── Meeting info card ─────────────────────────────────────────────
+        duration_str = format_duration(total_duration) if total_duration > 0 else "Unknown"
+
+        if headless():
+            console.event(
+                "meeting", f"{meeting['name']}  {display_date}  {duration_str}  \u2192 {os.path.basename(output_file)}",
+                meeting_id=meeting_id, name=meeting["name"], date=meeting["date"].isoformat(),
+                duration=total_duration, clip=meeting["clip"], output_file=output_file,
+            )
+        else:
+            info_table = Table(box=None, show_header=False, show_edge=False, padding=(0, 1))
+            info_table.add_column("Key", style="dim cyan", width=14)
+            info_table.add_column("Value", style="white")
+            info_table.add_row("  Meeting", f"[bold bright_white]{meeting['name']}[/bold bright_white]")
+            info_table.add_row("  Date", display_date)
+            if total_duration > 0:
+                info_table.add_row("  Duration", f"[bold]{duration_str}[/bold]")
+            else:
+                info_table.add_row("  Duration", "[dim]Probing...[/dim]" if probe else "[dim]Unknown[/dim]")
+            if meeting["clip"]:
+                start, end = meeting["clip"]
+                clip_str = f"{format_time_short(start)} \u2192 {format_time_short(end) if end is not None else 'end'}"
+                info_table.add_row("  Clip", f"[bold]{clip_str}[/bold]")
+            info_table.add_row("  Meeting ID", f"[dim]{meeting_id}[/dim]")
+            info_table.add_row("  Output", f"[dim]{os.path.basename(output_file)}[/dim]")
+
+            console.print()
+            console.print(Panel(
+                info_table,
+                border_style="bright_blue", box=box.HEAVY,
+                title="[bold bright_blue] Meeting Info [/bold bright_blue]",
+                title_align="left", padding=(1, 1),
+            ))
+
+        if config["dry_run"]:
+            console.print()
+            return
+
+        if existing:
+            step_done("Already saved and intact, skipping  [dim](--force downloads it again)[/dim]")
+            show_complete(config, [(f"[bold cyan]{media_kind}[/bold cyan]", existing),
+                                   ("[bold yellow]Metadata[/bold yellow]", meeting["json_file"])]
+                          + [("[bold magenta]Transcript[/bold magenta]", path) for path in meeting["transcript_files"]])
+            return
+
+        # ── Step 2: Save files ────────────────────────────────────────────
+        step(2, total_steps, "[bold]Saving meeting data...[/bold]", "cyan")
+
+        json_filename = meeting["json_file"]
+        transcript_files = save_meeting_files(meeting, config, metrics)
+        step_done(f"Metadata  \u2192  [bold]{os.path.basename(json_filename)}[/bold]")
+
+        for transcript_filename in transcript_files:
+            step_done(f"Transcript \u2192  [bold]{os.path.basename(transcript_filename)}[/bold]")
+        if not transcript_files:
+            step_warn("No transcript available for this meeting")
+
+        files = [("[bold yellow]Metadata[/bold yellow]", json_filename)]
+        for transcript_filename in transcript_files:
+            files.append(("[bold magenta]Transcript[/bold magenta]", transcript_filename))
+
+        if not config["video"]:
+            show_complete(config, files)
+            return
+
+        if probe:
+            with console.status("  [dim]Probing video duration...[/dim]", spinner="dots"):
+                total_duration = meeting["duration"] = probe.result()
+                meeting["duration_source"] = "ffprobe"
+            if total_duration > 0:
+                step_done(f"Duration   \u2192  [bold]{format_duration(total_duration)}[/bold]")
+            else:
+                step_warn("Could not determine the video duration")
+
+        # ── Step 3: Download video ────────────────────────────────────────
+        step(3, total_steps, f"[bold]Downloading {media_kind.lower()}...[/bold]", "cyan")
+        console.print("  [green]\u2502[/green]")
+        console.print()
+
+        return_code = timed(
+            metrics, "download", download_video,
+            config, meeting["source"], output_file, clip_length(meeting["clip"], total_duration),
+            playlist=meeting.get("playlist"),
+            on_retry=retry_counter(metrics),
+        )
+
+        if return_code == 0 and config["sink"]:
+            target = "stdout" if is_stdout_sink(config["sink"]) else config["sink"]
+            step_done(f"{media_kind}      \u2192  [bold]streamed to {target}[/bold]")
+            show_complete(config, files)
+        elif return_code == 0 and os.path.exists(output_file):
+            record_output(config, meeting)
+            submit_post(config, meeting)
+            files += post_files(finish_post(config), output_file)
+            show_complete(config, [(f"[bold cyan]{media_kind}[/bold cyan]", output_file)] + files)
+        else:
+            error = f"ffmpeg exited with code {return_code}"
+            show_error(
+                "Error", error,
+                "Try running the ffmpeg command manually to see detailed errors.",
+            )
+            sys.exit(1)
+
+    except MeetingError as e:
+        error = e.message
+        show_error(e.title, e.message, e.detail)
+        sys.exit(1)
+
+    except Exception as e:
+        error = str(e) or type(e).__name__
+        show_error("Error", str(e), meeting["raw"][:300] if meeting else "")
+        sys.exit(1)
+
+    finally:
+        record_metrics(config, finish_metrics(metrics, meeting, error))
+        publish_run_metrics(config, [metrics], time_module.time() - start_time)
 
 
 if __name__ == "__main__":